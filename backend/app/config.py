@@ -1,14 +1,52 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./flu_vaccination.db"
+    # Pool de connexions en lecture seule (requêtes de l'API)
+    read_pool_size: int = 8
+    read_pool_max_overflow: int = 8
+    # SQLite : mémoire mappée (octets) et cache de pages (Ko) par connexion
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size_kb: int = 64000
+    # Moteur des agrégations : None = SQLite, "duckdb://" = DuckDB en mémoire (paquet duckdb requis)
+    analytics_url: Optional[str] = None
     
     # CSV Data Path
     csv_data_path: str = "./data/raw"
     
+    # Sites de vaccination en pharmacie (Arrow IPC mappé en mémoire, généré par le pipeline ETL)
+    pharmacies_sites_path: str = "./data/pharmacies_sites.arrow"
+    
+    # Centroïdes des communes (Parquet généré par le pipeline ETL) pour l'analyse de couverture
+    communes_path: str = "./data/communes.parquet"
+    # Nombre de processus pour le calcul national de couverture (1 = pas de parallélisme)
+    coverage_workers: int = 1
+    # Nombre de processus pour les rééchantillonnages bootstrap (1 = pas de parallélisme)
+    bootstrap_workers: int = 1
+    
+    # Planificateur de tâches de fond : exécutions simultanées par type d'exécuteur
+    scheduler_threads: int = 2
+    scheduler_processes: int = 1
+    # Périodicité des tâches (minutes, 0 = à la demande uniquement)
+    ingest_interval_minutes: int = 0
+    maintenance_interval_minutes: int = 1440
+    # Ingestion coordonnée entre workers : durée du bail du verrou et attente entre deux vérifications
+    ingest_lock_ttl_seconds: int = 120
+    ingest_poll_seconds: float = 1.0
+    
+    # Export CSV / Parquet par flux : lignes lues et encodées par paquet
+    export_chunk_rows: int = 10000
+    
+    # Métriques Prometheus (GET /metrics)
+    metrics_enabled: bool = True
+    # Profilage : en-tête Server-Timing, journalisation des requêtes SQL lentes avec leur plan
+    server_timing: bool = True
+    sql_debug: bool = False
+    slow_query_ms: float = 50.0
+    
     # API Info
     api_title: str = "Flu Vaccination API"
     api_version: str = "1.0.0"
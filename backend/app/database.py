@@ -1,14 +1,20 @@
+from pathlib import Path
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
+from app.services import profiling
 
 settings = get_settings()
 
-# Créer le moteur SQLite
+# ============================================
+# Moteur d'écriture : ingestion, modèles de prévision, coordination
+# ============================================
+
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False, "timeout": 30}
 )
 
 # Optimisations SQLite
@@ -17,18 +23,64 @@ def set_sqlite_pragma(dbapi_conn, connection_record):
     cursor = dbapi_conn.cursor()
     cursor.execute("PRAGMA journal_mode=WAL")
     cursor.execute("PRAGMA synchronous=NORMAL")
-    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
     cursor.close()
 
-# Session locale
+# ============================================
+# Pool de lecture : requêtes de l'API
+# ============================================
+
+def read_only_url(database_url: str):
+    """
+    URL SQLite en lecture seule (mode=ro) du même fichier.
+    None si la base n'est pas un fichier SQLite (le moteur d'écriture sert alors aussi en lecture).
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    chemin = Path(url.database).resolve().as_posix()
+    return f"sqlite:///file:{chemin}?mode=ro&uri=true"
+
+_read_url = read_only_url(settings.database_url)
+
+if _read_url is None:
+    read_engine = engine
+else:
+    # Les lecteurs ne prennent jamais de verrou d'écriture : ils lisent le
+    # dernier état validé du WAL pendant que l'ingestion écrit
+    read_engine = create_engine(
+        _read_url,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.read_pool_size,
+        max_overflow=settings.read_pool_max_overflow,
+    )
+
+    @event.listens_for(read_engine, "connect")
+    def set_sqlite_read_pragma(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+# Profilage : nombre et durée des requêtes SQL de chaque requête HTTP,
+# requêtes lentes avec leur plan (SQL_DEBUG)
+for _moteur in {engine, read_engine}:
+    event.listen(_moteur, "before_cursor_execute", profiling.before_cursor_execute)
+    event.listen(_moteur, "after_cursor_execute", profiling.after_cursor_execute)
+
+# Sessions : écriture (ingestion) et lecture (routes)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Base pour les modèles
 Base = declarative_base()
 
-# Dependency pour FastAPI
+# Dependency pour FastAPI (lecture seule)
 def get_db():
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
@@ -43,4 +95,4 @@ def import_models():
     # Le noqa: F401 dit à Python "oui, cet import est volontaire même s'il n'est pas utilisé"
 
 # Importer dès que ce fichier est chargé
-import_models()
\ No newline at end of file
+import_models()
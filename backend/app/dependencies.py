@@ -0,0 +1,160 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.services.columnar import ENCODAGES, MEDIA_ARROW, arrow_stream, columnar_json
+from app.services.data_loader import is_table_ready
+
+# Délai conseillé aux clients pendant le chargement initial (secondes)
+RETRY_AFTER_SECONDS = 5
+
+
+def service_unavailable(detail: str) -> HTTPException:
+    """
+    503 avec Retry-After : données, index ou calculs pas encore disponibles
+    (chargement, ingestion ou précalcul en cours)
+    """
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+def require_tables(*tables: str):
+    """
+    Dépendance de route : 503 immédiat (avec Retry-After) tant que l'une des
+    tables n'a pas fini son chargement initial
+    """
+    def dependency():
+        en_attente = [table for table in tables if not is_table_ready(table)]
+        if en_attente:
+            raise service_unavailable(f"Chargement des données en cours: {', '.join(en_attente)}")
+    return dependency
+
+
+# ============================================
+# Projection : champs (fields=) et forme (format=) de la réponse
+# ============================================
+
+FORMATS = ("data", "chartjs", "both")
+
+
+class Projection:
+    """
+    Partie de la réponse demandée par le client :
+    - champs : champs des lignes de `data` (None = tous) ;
+    - format : data (sans chartjs), chartjs (sans data) ou both.
+    Les routes ne lisent (SELECT) et ne construisent que ce qui sert à l'une
+    des deux parties demandées.
+    """
+
+    def __init__(self, champs: Optional[List[str]] = None, format: str = "both"):
+        self.champs = champs
+        self.format = format
+
+    @property
+    def avec_data(self) -> bool:
+        return self.format != "chartjs"
+
+    @property
+    def avec_graphique(self) -> bool:
+        return self.format != "data"
+
+    @property
+    def complete(self) -> bool:
+        return self.champs is None and self.format == "both"
+
+    def colonnes(self, disponibles: Sequence[str], graphique: Sequence[str] = ()) -> List[str]:
+        """Champs à lire : ceux de data demandés, plus ceux du graphique s'il est demandé (ordre de `disponibles`)"""
+        voulus = set()
+        if self.avec_data:
+            voulus.update(disponibles if self.champs is None else self.champs)
+        if self.avec_graphique:
+            voulus.update(graphique)
+        return [c for c in disponibles if c in voulus]
+
+    def select(self, colonnes: Dict[str, Any], graphique: Sequence[str] = ()) -> list:
+        """Expressions SQL étiquetées du SELECT (champ → colonne ou expression SQLAlchemy)"""
+        return [colonnes[c].label(c) for c in self.colonnes(list(colonnes), graphique)]
+
+    def lignes(self, data: List[dict]) -> List[dict]:
+        """Lignes de data réduites aux champs demandés"""
+        if self.champs is None:
+            return data
+        return [{c: ligne[c] for c in self.champs if c in ligne} for ligne in data]
+
+    def reponse(self, contenu: dict):
+        """
+        Réponse complète : renvoyée telle quelle (validée par le response_model).
+        Réponse partielle : parties non demandées retirées puis encodée
+        directement, le modèle décrivant la réponse complète.
+        """
+        if self.complete:
+            return contenu
+        if self.avec_data:
+            contenu["data"] = self.lignes(contenu["data"])
+        else:
+            contenu.pop("data", None)
+        if not self.avec_graphique:
+            contenu.pop("chartjs", None)
+        return JSONResponse(contenu)
+
+    def reponse_colonnes(
+        self, contenu: dict, colonnes: Dict[str, Sequence], encodage: str, graphique=None, types=None
+    ) -> Response:
+        """
+        Réponse colonnaire (encodage colonnes ou arrow) : `colonnes` (champ →
+        valeurs) contient les champs sélectionnés ; data garde ceux demandés
+        et chartjs est construit par `graphique` (ChartSpec) à partir des colonnes.
+        """
+        champs = list(colonnes) if self.champs is None else self.champs
+        if encodage == "arrow":
+            if not self.avec_data:
+                raise HTTPException(status_code=400, detail="format=chartjs indisponible en Arrow (data uniquement)")
+            metadonnees = {"question": contenu["question"], "graphique": contenu["graphique"]}
+            corps = arrow_stream({c: colonnes[c] for c in champs}, types, metadonnees)
+            return Response(corps, media_type=MEDIA_ARROW, headers={"Vary": "Accept"})
+        if self.avec_data:
+            contenu["data"] = columnar_json(colonnes, champs)
+        else:
+            contenu.pop("data", None)
+        if self.avec_graphique:
+            contenu["chartjs"] = graphique.render_colonnes(colonnes)
+        else:
+            contenu.pop("chartjs", None)
+        return JSONResponse(contenu, headers={"Vary": "Accept"})
+
+
+def projection(*disponibles: str):
+    """Dépendance de route : paramètres fields= et format= validés (400 sinon)"""
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Champs de data, séparés par des virgules ({', '.join(disponibles)})"
+        ),
+        format: str = Query("both", description="Partie de la réponse: data, chartjs, both")
+    ) -> Projection:
+        if format not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Format inconnu: {format} ({', '.join(FORMATS)})")
+        champs = None
+        if fields is not None:
+            champs = list(dict.fromkeys(c.strip() for c in fields.split(",") if c.strip()))
+            inconnus = [c for c in champs if c not in disponibles]
+            if inconnus:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Champ(s) inconnu(s): {', '.join(inconnus)} ({', '.join(disponibles)})"
+                )
+        return Projection(champs or None, format)
+    return dependency
+
+
+def negocier_encodage(
+    request: Request,
+    encodage: Optional[str] = Query(
+        None, description=f"Encodage de data: lignes (défaut), colonnes, arrow ({MEDIA_ARROW})"
+    )
+) -> str:
+    """Dépendance de route : encodage demandé (paramètre, sinon en-tête Accept)"""
+    if encodage is None:
+        return "arrow" if MEDIA_ARROW in request.headers.get("accept", "") else "lignes"
+    if encodage not in ENCODAGES:
+        raise HTTPException(status_code=400, detail=f"Encodage inconnu: {encodage} ({', '.join(ENCODAGES)})")
+    return encodage
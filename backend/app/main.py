@@ -2,9 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.config import get_settings
-from app.database import engine, Base
-from app.services.data_loader import load_all_csv_data
-from app.routers import data, geographie, logistique, saisonnalite
+from app.services.scheduler import scheduler
+from app.routers import data, geographie, logistique, saisonnalite, cube, export, health, metrics
+from app.services.metrics import MetricsMiddleware
+from app.services.profiling import ProfilingMiddleware
 import logging
 
 logging.basicConfig(
@@ -17,15 +18,17 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Démarrage de l'application...")
-    print("📊 Création des tables...")
-    Base.metadata.create_all(bind=engine)
-    
-    print("📁 Chargement des données CSV...")
-    load_all_csv_data()
+    # Création des tables, chargement des données puis caches et précalculs en
+    # tâches de fond : l'application répond immédiatement (/health/live), les
+    # routes de données renvoient 503 + Retry-After tant que leurs tables chargent
+    print("⏱️  Démarrage du planificateur de tâches...")
+    await scheduler.start(immediats=["ingestion"])
     
     print("✅ Application prête !")
     yield
     
+    await scheduler.stop()
+    
     print("👋 Arrêt de l'application...")
 
 app = FastAPI(
@@ -43,10 +46,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métriques Prometheus : latence, taille et requêtes SQL de chaque requête
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router, tags=["Santé"])
+
+# Profil de chaque requête (temps SQL, phases, sérialisation) → en-tête Server-Timing
+app.add_middleware(ProfilingMiddleware, entete=settings.server_timing)
+
+# Sondes de vie / disponibilité
+app.include_router(health.router, prefix="/health", tags=["Santé"])
+
 # Routes génériques
 app.include_router(data.router, prefix="/api", tags=["Données génériques"])
 
 # Routes spécifiques par thématique
 app.include_router(geographie.router, prefix="/api/geographie", tags=["Géographie"])
 app.include_router(logistique.router, prefix="/api/logistique", tags=["Logistique"])
-app.include_router(saisonnalite.router, prefix="/api/saisonnalite", tags=["Saisonnalité"])
\ No newline at end of file
+app.include_router(saisonnalite.router, prefix="/api/saisonnalite", tags=["Saisonnalité"])
+app.include_router(cube.router, prefix="/api/cube", tags=["Cube OLAP"])
+
+# Export des tables (CSV / Parquet par flux)
+app.include_router(export.router, prefix="/api/export", tags=["Export"])
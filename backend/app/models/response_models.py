@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Any, Optional
 
 # ============================================
@@ -6,6 +6,9 @@ from typing import List, Dict, Any, Optional
 # ============================================
 
 class ChartJSDataset(BaseModel):
+    # Autres propriétés Chart.js (yAxisID, ...) transmises telles quelles
+    model_config = ConfigDict(extra="allow")
+
     label: str
     data: List[Any]
     backgroundColor: Optional[str] = None
@@ -13,12 +16,16 @@ class ChartJSDataset(BaseModel):
     borderWidth: Optional[int] = None
     fill: Optional[bool] = None
     tension: Optional[float] = None
+    showLine: Optional[bool] = None
 
 class ChartJSData(BaseModel):
     labels: List[str]
     datasets: List[ChartJSDataset]
 
 class ChartJSOptions(BaseModel):
+    # Autres options Chart.js (indexAxis, interaction, ...) transmises telles quelles
+    model_config = ConfigDict(extra="allow")
+
     responsive: bool = True
     plugins: Dict[str, Any] = {}
     scales: Optional[Dict[str, Any]] = None
@@ -31,9 +38,9 @@ class ChartJSFormat(BaseModel):
 class BaseAPIResponse(BaseModel):
     question: str
     graphique: str
-    data: List[Dict[str, Any]]
+    data: Optional[List[Dict[str, Any]]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 # ============================================
 # Modèles spécifiques par endpoint
@@ -48,9 +55,9 @@ class AccessibilitePharmaciesData(BaseModel):
 class AccessibilitePharmaciesResponse(BaseModel):
     question: str
     graphique: str
-    data: List[AccessibilitePharmaciesData]
+    data: Optional[List[AccessibilitePharmaciesData]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 class EvolutionActesAgeData(BaseModel):
     region: str
@@ -66,9 +73,9 @@ class EvolutionActesAgeData(BaseModel):
 class EvolutionActesAgeResponse(BaseModel):
     question: str
     graphique: str
-    data: List[EvolutionActesAgeData]
+    data: Optional[List[EvolutionActesAgeData]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 class EvolutionActesRegionData(BaseModel):
     region: str
@@ -81,9 +88,9 @@ class EvolutionActesRegionData(BaseModel):
 class EvolutionActesRegionResponse(BaseModel):
     question: str
     graphique: str
-    data: List[EvolutionActesRegionData]
+    data: Optional[List[EvolutionActesRegionData]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 class DonneesMeteoData(BaseModel):
     NOM_USUEL: str
@@ -98,9 +105,43 @@ class DonneesMeteoData(BaseModel):
 class DonneesMeteoResponse(BaseModel):
     question: str
     graphique: str
-    data: List[DonneesMeteoData]
+    data: Optional[List[DonneesMeteoData]] = None
+    total: int
+    chartjs: Optional[ChartJSFormat] = None
+
+class CorrelationMeteoGrippeData(BaseModel):
+    niveau: str
+    station: Optional[str] = None
+    annee: Optional[int] = None
+    meteo: str
+    grippe: str
+    decalage_mois: int
+    pearson: Optional[float] = None
+    spearman: Optional[float] = None
+    n: int
+
+class CorrelationMeteoGrippeResponse(BaseModel):
+    question: str
+    graphique: str
+    version: str
+    data: Optional[List[CorrelationMeteoGrippeData]] = None
+    total: int
+    chartjs: Optional[ChartJSFormat] = None
+
+class PrevisionGrippeData(BaseModel):
+    station: str
+    mois: str
+    prevision: float
+    bas: float
+    haut: float
+
+class PrevisionGrippeResponse(BaseModel):
+    question: str
+    graphique: str
+    version: str
+    data: Optional[List[PrevisionGrippeData]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 # ============================================
 # Admin
@@ -114,6 +155,26 @@ class AdminTablesResponse(BaseModel):
     total_tables: int
     tables: Dict[str, TableInfo]
 
+class JobStatut(BaseModel):
+    nom: str
+    description: str
+    etat: str
+    mode: str
+    groupe: Optional[str] = None
+    intervalle_s: Optional[float] = None
+    executions: int
+    echecs: int
+    dernier_debut: Optional[str] = None
+    derniere_fin: Optional[str] = None
+    duree_ms: Optional[float] = None
+    derniere_erreur: Optional[str] = None
+    resultat: Optional[str] = None
+    prochaine_execution: Optional[str] = None
+
+class AdminJobsResponse(BaseModel):
+    total: int
+    jobs: List[JobStatut]
+
 
 # ============================================
 # Évolution doses par âge
@@ -133,9 +194,9 @@ class EvolutionDosesAgeData(BaseModel):
 class EvolutionDosesAgeResponse(BaseModel):
     question: str
     graphique: str
-    data: List[EvolutionDosesAgeData]
+    data: Optional[List[EvolutionDosesAgeData]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 # ============================================
 # Évolution doses par région
@@ -152,9 +213,9 @@ class EvolutionDosesRegionData(BaseModel):
 class EvolutionDosesRegionResponse(BaseModel):
     question: str
     graphique: str
-    data: List[EvolutionDosesRegionData]
+    data: Optional[List[EvolutionDosesRegionData]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 # ============================================
 # Répartition lieu de vaccination
@@ -167,14 +228,43 @@ class RepartitionLieuVaccinationData(BaseModel):
 class RepartitionLieuVaccinationResponse(BaseModel):
     question: str
     graphique: str
-    data: List[RepartitionLieuVaccinationData]
+    data: Optional[List[RepartitionLieuVaccinationData]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 # ============================================
 # Logistique
 # ============================================
 
+class AllocationDosesData(BaseModel):
+    region: str
+    actes_historiques: int
+    actes_projetes: int
+    ratio_doses_actes_historique: Optional[float] = None
+    part_65_plus: Optional[float] = None
+    priorite: float
+    doses_allouees: int
+    couverture_pct: float
+    gaspillage_pct: float
+
+class AllocationDosesResume(BaseModel):
+    budget: int
+    doses_allouees: int
+    reserve: int
+    actes_projetes: int
+    actes_couverts: int
+    couverture_pct: float
+    couverture_min: float
+    gaspillage_max: float
+
+class AllocationDosesResponse(BaseModel):
+    question: str
+    graphique: str
+    resume: AllocationDosesResume
+    data: Optional[List[AllocationDosesData]] = None
+    total: int
+    chartjs: Optional[ChartJSFormat] = None
+
 class ActesDosesRegionData(BaseModel):
     region: str
     acte_vgp: Optional[int] = None
@@ -183,9 +273,9 @@ class ActesDosesRegionData(BaseModel):
 class ActesDosesRegionResponse(BaseModel):
     question: str
     graphique: str
-    data: List[ActesDosesRegionData]
+    data: Optional[List[ActesDosesRegionData]] = None
     total: int
-    chartjs: ChartJSFormat
+    chartjs: Optional[ChartJSFormat] = None
 
 class NombrePharmaciesPeriodeData(BaseModel):
     date: str
@@ -194,5 +284,164 @@ class NombrePharmaciesPeriodeData(BaseModel):
 
 class NombrePharmaciesPeriodeResponse(BaseModel):
     question: str
-    data: List[NombrePharmaciesPeriodeData]
-    chartjs: ChartJSFormat
\ No newline at end of file
+    data: Optional[List[NombrePharmaciesPeriodeData]] = None
+    chartjs: Optional[ChartJSFormat] = None
+
+# ============================================
+# Pharmacies proches
+# ============================================
+
+class PharmacieProcheData(BaseModel):
+    finess: str
+    titre: str
+    adresse: Optional[str] = None
+    code_postal: str
+    ville: str
+    latitude: float
+    longitude: float
+    distance_km: float
+
+class PharmaciesProchesResponse(BaseModel):
+    question: str
+    graphique: str
+    data: List[PharmacieProcheData]
+    total: int
+
+# ============================================
+# Horaires / modalités d'accueil des pharmacies
+# ============================================
+
+class PharmacieHorairesData(BaseModel):
+    finess: str
+    titre: str
+    adresse: Optional[str] = None
+    code_postal: str
+    ville: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    sans_rendez_vous: Optional[bool] = None
+    horaires: Dict[str, List[str]]
+
+class PharmaciesHorairesResponse(BaseModel):
+    question: str
+    graphique: str
+    moment: Optional[str] = None
+    data: List[PharmacieHorairesData]
+    total: int
+
+# ============================================
+# Recherche de pharmacies (autocomplétion)
+# ============================================
+
+class PharmacieRechercheData(BaseModel):
+    finess: str
+    titre: str
+    adresse: Optional[str] = None
+    code_postal: str
+    ville: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    score: float
+
+class PharmaciesRechercheResponse(BaseModel):
+    question: str
+    graphique: str
+    recherche: str
+    data: List[PharmacieRechercheData]
+    total: int
+
+# ============================================
+# Régression pauvreté / passages aux urgences
+# ============================================
+
+class IntervalleConfiance(BaseModel):
+    estimation: Optional[float] = None
+    bas: Optional[float] = None
+    haut: Optional[float] = None
+
+class RegressionPauvreteUrgences(BaseModel):
+    ordonnee_origine: IntervalleConfiance
+    pente: IntervalleConfiance
+    r2: IntervalleConfiance
+    pondere: bool
+    n_bootstrap: int
+    niveau_confiance: float
+
+class PauvreteUrgencesData(BaseModel):
+    region: str
+    population_totale: int
+    taux_pauvrete: float
+    taux_passages_100k: float
+    taux_passages_predit: Optional[float] = None
+
+class PauvreteUrgencesResponse(BaseModel):
+    question: str
+    graphique: str
+    version: str
+    regression: Optional[RegressionPauvreteUrgences] = None
+    data: Optional[List[PauvreteUrgencesData]] = None
+    total: int
+    chartjs: Optional[ChartJSFormat] = None
+
+# ============================================
+# Déserts vaccinaux
+# ============================================
+
+class DesertVaccinalData(BaseModel):
+    code_insee: str
+    nom: str
+    code_postal: str
+    dep_code: str
+    region: Optional[str] = None
+    population: int
+    distance_km: float
+    pharmacies_rayon: int
+    population_rayon: int
+    habitants_par_pharmacie: Optional[float] = None
+    score: float
+
+class DesertsVaccinauxResponse(BaseModel):
+    question: str
+    graphique: str
+    data: Optional[List[DesertVaccinalData]] = None
+    total: int
+    chartjs: Optional[ChartJSFormat] = None
+
+# ============================================
+# Cube OLAP
+# ============================================
+
+class CubeResponse(BaseModel):
+    question: str
+    graphique: str
+    version: str
+    dimensions: List[str]
+    filtres: Dict[str, List[Any]]
+    drill_down: List[str]
+    roll_up: List[str]
+    data: Optional[List[Dict[str, Any]]] = None
+    total: int
+    chartjs: Optional[ChartJSFormat] = None
+
+# ============================================
+# Santé
+# ============================================
+
+class HealthLiveResponse(BaseModel):
+    statut: str
+
+class ChargementTable(BaseModel):
+    etat: str
+    lignes: int
+    total: Optional[int] = None
+    prete: bool
+    progression_pct: float
+
+class HealthReadyResponse(BaseModel):
+    statut: str
+    version: Optional[str] = None
+    chargement: str
+    debut: Optional[str] = None
+    fin: Optional[str] = None
+    tables: Dict[str, ChargementTable]
+    taches: Dict[str, str]
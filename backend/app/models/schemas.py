@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text
 from app.database import Base
 from datetime import datetime
 
@@ -132,4 +132,26 @@ class DonneesMeteo(Base):
     mois = Column(Integer, index=True)
     taux_grippe = Column(Float)
     incidence_sg_hebdo = Column(Float)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ModelePrevision(Base):
+    """Paramètres ajustés des modèles de prévision grippe (un par station et cible)"""
+    __tablename__ = "modeles_prevision"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    station = Column(String(200), index=True)
+    cible = Column(String(50), index=True)
+    version = Column(String(20), index=True)  # Version du jeu de données ajusté
+    parametres = Column(Text)  # JSON compact (voir app.services.forecast)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class EtatIngestion(Base):
+    """Coordination de l'ingestion entre workers : verrou (avec bail) et version publiée"""
+    __tablename__ = "etat_ingestion"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(String(20))  # Dernière version entièrement chargée
+    publie_le = Column(DateTime)
+    proprietaire = Column(String(100))  # Worker qui détient le verrou (None = libre)
+    expire_le = Column(DateTime)  # Fin du bail (verrou repris si le worker a disparu)
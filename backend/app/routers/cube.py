@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, Query, HTTPException
+from typing import Optional
+from app.dependencies import require_tables, projection, Projection, service_unavailable
+from app.services.cube import get_cube, DIMENSIONS, TABLES_CUBE, RequeteCubeInvalide
+from app.services.data_loader import get_dataset_version
+from app.services.regions import normaliser_region
+from app.models.response_models import CubeResponse
+from app.services.profiling import ProfiledRoute
+from app.services import charts
+
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# ============================================
+# CUBE OLAP - région × année × âge × variable
+# ============================================
+
+def _liste(valeur: Optional[str]) -> Optional[list]:
+    """'a, b' → ['a', 'b'] (None si absent ou vide : pas de filtre)"""
+    if valeur is None:
+        return None
+    return [v.strip() for v in valeur.split(",") if v.strip()] or None
+
+
+@router.get("", response_model=CubeResponse, dependencies=[Depends(require_tables(*TABLES_CUBE.values()))])
+async def get_cube_query(
+    dimensions: Optional[str] = Query(None, description="Dimensions du résultat, séparées par des virgules (region, annee, age) ; vide = national"),
+    region: Optional[str] = Query(None, description="Régions retenues (séparées par des virgules)"),
+    annee: Optional[str] = Query(None, description="Années retenues (ex: 2023 ou 2022,2023)"),
+    age: Optional[str] = Query(None, description="Tranches d'âge retenues (65_ans_et_plus, moins_de_65_ans)"),
+    variable: Optional[str] = Query(None, description="Variables renvoyées (actes, doses)"),
+    projection: Projection = Depends(projection(*DIMENSIONS, *TABLES_CUBE))
+):
+    """
+    Requête sur le cube OLAP : slice / dice par les filtres, drill-down et
+    roll-up en ajoutant / retirant des dimensions.
+    Réponse calculée à partir des agrégats précalculés au chargement.
+    
+    Exemple : actes par tranche d'âge, toutes régions, en 2023
+    → /api/cube?dimensions=age&annee=2023&variable=actes
+    
+    Graphique: Barres groupées (une série par variable)
+    """
+    cube = get_cube()
+    if cube is None:
+        raise service_unavailable("Tables par âge (evolution_actes_age / evolution_doses_age) non disponibles")
+    
+    dims = _liste(dimensions) or []
+    filtres = {
+        "region": [normaliser_region(r) for r in _liste(region)] if _liste(region) else None,
+        "age": _liste(age),
+    }
+    if _liste(annee):
+        try:
+            filtres["annee"] = [int(a) for a in _liste(annee)]
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Année invalide: {annee}")
+    
+    try:
+        data = cube.query(dims, filtres, _liste(variable))
+    except RequeteCubeInvalide as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    gardees = [d for d in DIMENSIONS if d in dims]
+    variables = _liste(variable) or cube.variables
+    actifs = {d: v for d, v in filtres.items() if v is not None}
+    # Coupe filtrée : libellés construits d'après les filtres, pas « France »
+    selection = ", ".join(f"{d} {'/'.join(map(str, v))}" for d, v in actifs.items())
+    titre = "Par " + " × ".join(gardees) if gardees else ("Total" if actifs else "Total national")
+    if selection:
+        titre += f" ({selection})"
+    libelle_total = " · ".join("/".join(map(str, v)) for v in actifs.values()) or "France"
+    
+    # Format Chart.js (Barres groupées, une série par variable)
+    chartjs_format = None
+    if projection.avec_graphique:
+        chartjs_format = charts.CUBE.render(
+            labels=[" · ".join(str(ligne[d]) for d in gardees) or libelle_total for ligne in data],
+            datasets=[charts.CUBE.dataset(v, [ligne[v] for ligne in data]) for v in dict.fromkeys(variables)],
+            titre=titre
+        )
+    
+    return projection.reponse({
+        "question": "Quels actes et doses pour cette coupe du cube ?",
+        "graphique": "Barres groupées",
+        "version": get_dataset_version(),
+        "dimensions": gardees,
+        "filtres": actifs,
+        "drill_down": [d for d in DIMENSIONS if d not in gardees],
+        "roll_up": gardees,
+        "data": data,
+        "total": len(data),
+        "chartjs": chartjs_format
+    })
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Query, Depends
+from fastapi import APIRouter, Query, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.constants import THEMATIQUES
 from app.config import get_settings
 from typing import Optional
 from sqlalchemy import text
-from app.models.response_models import AdminTablesResponse
+from app.models.response_models import AdminTablesResponse, AdminJobsResponse, JobStatut
+from app.services.scheduler import scheduler
+from app.services.profiling import ProfiledRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 settings = get_settings()
 
 # ============================================
@@ -127,4 +129,32 @@ async def list_tables(db: Session = Depends(get_db)):
     return {
         "total_tables": len(tables),
         "tables": result
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/admin/jobs", response_model=AdminJobsResponse, tags=["Admin"])
+async def list_jobs():
+    """
+    État des tâches de fond (ingestion, préchauffage, précalculs, maintenance)
+    """
+    jobs = scheduler.statuts()
+    return {
+        "total": len(jobs),
+        "jobs": jobs
+    }
+
+
+@router.post("/admin/jobs/{nom}", response_model=JobStatut, status_code=202, tags=["Admin"])
+async def run_job(nom: str):
+    """
+    Déclenche une tâche de fond à la demande (409 si elle tourne déjà)
+    """
+    if nom not in scheduler.jobs:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Tâche inconnue: {nom}. Tâches: {', '.join(scheduler.jobs)}"
+        )
+    if scheduler.trigger(nom) is None:
+        raise HTTPException(status_code=409, detail=f"La tâche {nom} est déjà en cours")
+    return scheduler.jobs[nom].statut()
+
@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.config import get_settings
+from app.dependencies import require_tables, service_unavailable
+from app.services.export import (
+    FORMATS_EXPORT, TABLE_SITES, encode_stream, export_tables, get_export,
+    sites_export_batches, sites_schema, sql_batches,
+)
+from app.services.pharmacies import get_sites_table
+from app.services.profiling import ProfiledRoute
+
+
+router = APIRouter(route_class=ProfiledRoute)
+settings = get_settings()
+
+# ============================================
+# EXPORT - Tables complètes en CSV / Parquet (flux)
+# ============================================
+
+def filtres_export(
+    region: Optional[str] = Query(None, description="Région (tables régionales)"),
+    code_postal: Optional[str] = Query(None, description="Code postal (accessibilite_pharmacies, pharmacies_sites)"),
+    sans_rendez_vous: Optional[bool] = Query(None, description="Sites sans rendez-vous (pharmacies_sites)"),
+    type_lieu: Optional[str] = Query(None, description="Type de lieu (repartition_lieu_vaccination)"),
+    tranche_age: Optional[str] = Query(None, description="Tranche d'âge (repartition_lieu_vaccination)"),
+    date_debut: Optional[str] = Query(None, description="Date de début YYYY-MM-DD (nombre_pharmacies_periode)"),
+    date_fin: Optional[str] = Query(None, description="Date de fin YYYY-MM-DD (nombre_pharmacies_periode)"),
+    variable_pharmacie: Optional[str] = Query(None, description="Variable (nombre_pharmacies_periode)"),
+    nom_usuel: Optional[str] = Query(None, description="Station météo (donnees_meteo)"),
+    annee: Optional[int] = Query(None, description="Année (donnees_meteo)"),
+    mois: Optional[int] = Query(None, ge=1, le=12, description="Mois (donnees_meteo)")
+) -> dict:
+    """Filtres renseignés (mêmes paramètres que les routes JSON de chaque table)"""
+    filtres = {
+        "region": region, "code_postal": code_postal, "sans_rendez_vous": sans_rendez_vous,
+        "type_lieu": type_lieu, "tranche_age": tranche_age, "date_debut": date_debut,
+        "date_fin": date_fin, "variable_pharmacie": variable_pharmacie,
+        "nom_usuel": nom_usuel, "annee": annee, "mois": mois,
+    }
+    return {nom: valeur for nom, valeur in filtres.items() if valeur is not None}
+
+
+def _exporter(table: str, format: str, filtres: dict) -> StreamingResponse:
+    taille = settings.export_chunk_rows
+    if table == TABLE_SITES:
+        if get_sites_table() is None:
+            raise service_unavailable("Sites de vaccination non disponibles")
+        schema = sites_schema(format)
+        try:
+            batches = sites_export_batches(schema, filtres, taille)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif table in export_tables():
+        require_tables(table)()
+        export = get_export(table)
+        if export is None:
+            raise service_unavailable(f"Table {table} pas encore en base")
+        schema = export.schema
+        try:
+            stmt = export.statement(filtres)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        batches = sql_batches(export, stmt, taille)
+    else:
+        # Fichiers pas encore recensés : la table peut encore apparaître (503)
+        require_tables(table)()
+        raise HTTPException(
+            status_code=404,
+            detail=f"Table inconnue: {table}. Tables: {', '.join(export_tables())}"
+        )
+
+    # Taille inconnue d'avance : Transfer-Encoding chunked, un morceau par paquet de lignes
+    return StreamingResponse(
+        encode_stream(batches, schema, format),
+        media_type=FORMATS_EXPORT[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    )
+
+
+@router.get("/{table}.csv", response_class=StreamingResponse)
+async def export_csv(table: str, filtres: dict = Depends(filtres_export)):
+    """
+    Table complète (filtrée) en CSV, envoyée par paquets à mémoire constante
+
+    Exemple : /api/export/donnees_meteo.csv?annee=2023
+    """
+    return _exporter(table, "csv", filtres)
+
+
+@router.get("/{table}.parquet", response_class=StreamingResponse)
+async def export_parquet(table: str, filtres: dict = Depends(filtres_export)):
+    """
+    Table complète (filtrée) en Parquet, un row group par paquet de lignes
+
+    Exemple : /api/export/pharmacies_sites.parquet?code_postal=75012
+    """
+    return _exporter(table, "parquet", filtres)
@@ -1,93 +1,440 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import Float, case, func, type_coerce
+from app.dependencies import require_tables, projection, Projection, negocier_encodage, service_unavailable
 from app.database import get_db
+from app.services.profiling import ProfiledRoute, phase
+from app.services import charts
+from app.services.columnar import query_columns, arrow_types
 from typing import Optional
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import math
+import numpy as np
+from app.services.regions import normaliser_region
+from app.services.pharmacies import (
+    get_sites_index, get_sites_table, sites_records, sites_horaires, get_horaires_index, get_code_postal_index
+)
+from app.services.horaires import JOURS, format_horaires
+from app.services.recherche import search_sites
+from app.services.coverage import get_coverage, DEFAULT_RAYON_KM
+from app.services.analytics import (
+    get_regression_pauvrete_urgences, TABLES_PAUVRETE_URGENCES, DEFAULT_BOOTSTRAP,
+    COLONNE_PAUVRETE, COLONNE_PASSAGES, COLONNE_POPULATION
+)
+from app.services.data_loader import get_dataset_version
+from app.models.schemas import (
+    AccessibilitePharmacies, EvolutionActesAge, EvolutionDosesAge, EvolutionActesRegion,
+    EvolutionDosesRegion, RepartitionLieuVaccination
+)
 from app.models.response_models import (
+    AccessibilitePharmaciesData,
     AccessibilitePharmaciesResponse,
+    EvolutionActesAgeData,
+    EvolutionDosesAgeData,
+    EvolutionDosesRegionData,
+    EvolutionActesRegionData,
+    RepartitionLieuVaccinationData,
+    PauvreteUrgencesData,
+    DesertVaccinalData,
     EvolutionActesAgeResponse,
     EvolutionActesRegionResponse,
     EvolutionDosesAgeResponse,        # ← AJOUTER
     EvolutionDosesRegionResponse,     # ← AJOUTER
-    RepartitionLieuVaccinationResponse # ← AJOUTER
+    RepartitionLieuVaccinationResponse, # ← AJOUTER
+    PharmaciesProchesResponse,
+    PharmaciesHorairesResponse,
+    PharmaciesRechercheResponse,
+    PauvreteUrgencesResponse,
+    DesertsVaccinauxResponse
 )
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 # ============================================
 # GÉOGRAPHIE - Routes spécifiques
 # ============================================
 
-@router.get("/accessibilite-pharmacies", response_model=AccessibilitePharmaciesResponse)
+# Champ de la réponse → colonne (ou expression) SQL
+CHAMPS_ACCESSIBILITE = {
+    "nombre_pharmacies": AccessibilitePharmacies.nombre_pharmacies,
+    "population": AccessibilitePharmacies.population,
+    "code_postal": AccessibilitePharmacies.code_postal,
+    # Population par pharmacie
+    "ratio": type_coerce(case(
+        (AccessibilitePharmacies.nombre_pharmacies > 0,
+         func.round(AccessibilitePharmacies.population * 1.0 / AccessibilitePharmacies.nombre_pharmacies, 2)),
+        else_=0
+    ), Float),
+}
+
+@router.get("/accessibilite-pharmacies", response_model=AccessibilitePharmaciesResponse, dependencies=[Depends(require_tables("accessibilite_pharmacies"))])
 async def get_accessibilite_pharmacies(
     db: Session = Depends(get_db),
     code_postal: Optional[str] = Query(None, description="Filtrer par code postal"),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    projection: Projection = Depends(projection(*AccessibilitePharmaciesData.model_fields)),
+    encodage: str = Depends(negocier_encodage)
 ):
-    # ... ton code existant
     """
     Accessibilité des centres de vaccination (pharmacies uniquement) selon la population
     
     Graphique: Barème
     Format Chart.js: Gauge / Bar chart
     """
-    query = "SELECT * FROM accessibilite_pharmacies WHERE 1=1"
+    query = db.query(*projection.select(CHAMPS_ACCESSIBILITE, graphique=charts.ACCESSIBILITE_PHARMACIES.champs))
     
     if code_postal:
-        query += f" AND code_postal = '{code_postal}'"
+        query = query.filter(AccessibilitePharmacies.code_postal == code_postal)
+    
+    query = query.limit(limit)
+    resultats = query.all()
+    
+    contenu = {
+        "question": "Accessibilité des centres de vaccination (pharmacies uniquement) selon la population",
+        "graphique": "Barème",
+        "data": None,
+        "total": len(resultats),
+        "chartjs": None
+    }
+    if encodage != "lignes":
+        return projection.reponse_colonnes(
+            contenu, query_columns(query, resultats), encodage, charts.ACCESSIBILITE_PHARMACIES, arrow_types(query)
+        )
     
-    query += f" LIMIT {limit}"
+    contenu["data"] = [row._asdict() for row in resultats]
+    # Format pour Chart.js (Bar chart horizontal)
+    if projection.avec_graphique:
+        contenu["chartjs"] = charts.ACCESSIBILITE_PHARMACIES.render(contenu["data"])
+    
+    return projection.reponse(contenu)
+
+
+@router.get("/pharmacies-proches", response_model=PharmaciesProchesResponse)
+async def get_pharmacies_proches(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude du point de recherche"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude du point de recherche"),
+    k: int = Query(10, ge=1, le=100, description="Nombre maximum de pharmacies"),
+    rayon_km: Optional[float] = Query(None, gt=0, le=1000, description="Rayon maximum (km)")
+):
+    """
+    Pharmacies vaccinantes les plus proches d'un point (distance haversine)
+    
+    Index spatial en grille construit au démarrage : seules les cellules
+    autour du point sont examinées.
+    """
+    index = get_sites_index()
+    if index is None:
+        raise service_unavailable("Sites de vaccination non disponibles")
     
-    results = db.execute(text(query)).fetchall()
+    if rayon_km is not None:
+        ids, distances = index.query_radius(lat, lon, rayon_km)
+        ids, distances = ids[:k], distances[:k]
+    else:
+        ids, distances = index.query_knn(lat, lon, k)
+    
+    sites = sites_records(ids, ["finess", "titre", "adresse_voie_1", "code_postal", "ville", "latitude", "longitude"])
     
-    # Conversion en dictionnaires
     data = []
-    for row in results:
+    for site, distance in zip(sites, distances):
         data.append({
-            "nombre_pharmacies": row[1],
-            "population": row[2],
-            "code_postal": row[3],
-            "ratio": round(row[2] / row[1], 2) if row[1] > 0 else 0  # population par pharmacie
+            "finess": site["finess"],
+            "titre": site["titre"],
+            "adresse": site["adresse_voie_1"],
+            "code_postal": site["code_postal"],
+            "ville": site["ville"],
+            "latitude": site["latitude"],
+            "longitude": site["longitude"],
+            "distance_km": round(float(distance), 3)
         })
     
-    # Format pour Chart.js (Bar chart horizontal)
-    chartjs_format = {
-        "type": "bar",
-        "data": {
-            "labels": [d["code_postal"] for d in data],
-            "datasets": [{
-                "label": "Population par pharmacie",
-                "data": [d["ratio"] for d in data],
-                "backgroundColor": "rgba(54, 162, 235, 0.5)",
-                "borderColor": "rgba(54, 162, 235, 1)",
-                "borderWidth": 1
-            }]
-        },
-        "options": {
-            "indexAxis": "y",  # Horizontal bars
-            "responsive": True,
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Accessibilité des pharmacies par code postal"
-                }
-            }
-        }
+    return {
+        "question": "Pharmacies vaccinantes les plus proches",
+        "graphique": "Carte",
+        "data": data,
+        "total": len(data)
     }
+
+
+FUSEAU_HORAIRE = ZoneInfo("Europe/Paris")
+
+
+def _sites_horaires_data(ids: np.ndarray) -> list:
+    """Sites (indices) avec horaires structurés, pour les routes pharmacies/*"""
+    sites = sites_records(ids, [
+        "finess", "titre", "adresse_voie_1", "code_postal", "ville", "latitude", "longitude", "sans_rendez_vous"
+    ])
+    horaires = sites_horaires()
+    
+    data = []
+    for i, site in zip(ids.tolist(), sites):
+        data.append({
+            "finess": site["finess"],
+            "titre": site["titre"],
+            "adresse": site["adresse_voie_1"],
+            "code_postal": site["code_postal"],
+            "ville": site["ville"],
+            "latitude": None if math.isnan(site["latitude"]) else site["latitude"],
+            "longitude": None if math.isnan(site["longitude"]) else site["longitude"],
+            "sans_rendez_vous": None if site["sans_rendez_vous"] < 0 else bool(site["sans_rendez_vous"]),
+            "horaires": format_horaires(horaires[i])
+        })
+    return data
+
+
+def _filtrer_code_postal(ids: np.ndarray, code_postal: Optional[str]) -> np.ndarray:
+    if code_postal is None:
+        return ids
+    sites_cp = get_code_postal_index().get(code_postal.zfill(5), np.empty(0, dtype=np.int64))
+    return np.intersect1d(ids, sites_cp, assume_unique=True)
+
+
+@router.get("/pharmacies/ouvertes", response_model=PharmaciesHorairesResponse)
+async def get_pharmacies_ouvertes(
+    jour: Optional[str] = Query(None, description="Jour (lundi ... dimanche), par défaut aujourd'hui"),
+    heure: Optional[str] = Query(None, description="Heure HH:MM, par défaut maintenant (heure de Paris)"),
+    sans_rendez_vous: bool = Query(False, description="Uniquement les sites sans rendez-vous"),
+    code_postal: Optional[str] = Query(None, description="Filtrer par code postal"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Pharmacies vaccinantes ouvertes maintenant ou à un instant donné
     
+    Horaires extraits une fois du HTML Modalites_accueil (pipeline ETL) ;
+    index par créneau de 15 minutes construit au démarrage.
+    """
+    index = get_horaires_index()
+    if index is None:
+        raise service_unavailable("Sites de vaccination non disponibles")
+    
+    maintenant = datetime.now(FUSEAU_HORAIRE)
+    if jour is None:
+        numero_jour = maintenant.weekday()
+    elif jour.lower() in JOURS:
+        numero_jour = JOURS.index(jour.lower())
+    else:
+        raise HTTPException(status_code=400, detail=f"Jour inconnu: {jour} ({', '.join(JOURS)})")
+    
+    if heure is None:
+        minute = maintenant.hour * 60 + maintenant.minute
+    else:
+        try:
+            moment = datetime.strptime(heure, "%H:%M")
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Heure invalide: {heure} (format HH:MM)")
+        minute = moment.hour * 60 + moment.minute
+    
+    ids = index.ouverts_a(numero_jour, minute)
+    if sans_rendez_vous:
+        ids = np.intersect1d(ids, index.sans_rendez_vous(), assume_unique=True)
+    ids = _filtrer_code_postal(ids, code_postal)[:limit]
+    
+    data = _sites_horaires_data(ids)
     return {
-        "question": "Accessibilité des centres de vaccination (pharmacies uniquement) selon la population",
-        "graphique": "Barème",
+        "question": "Pharmacies vaccinantes ouvertes",
+        "graphique": "Carte",
+        "moment": f"{JOURS[numero_jour]} {minute // 60:02d}:{minute % 60:02d}",
+        "data": data,
+        "total": len(data)
+    }
+
+
+@router.get("/pharmacies/sans-rendez-vous", response_model=PharmaciesHorairesResponse)
+async def get_pharmacies_sans_rendez_vous(
+    code_postal: Optional[str] = Query(None, description="Filtrer par code postal"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Pharmacies vaccinant sans rendez-vous (modalités d'accueil)
+    """
+    index = get_horaires_index()
+    if index is None:
+        raise service_unavailable("Sites de vaccination non disponibles")
+    
+    ids = _filtrer_code_postal(index.sans_rendez_vous(), code_postal)[:limit]
+    
+    data = _sites_horaires_data(ids)
+    return {
+        "question": "Pharmacies vaccinant sans rendez-vous",
+        "graphique": "Carte",
+        "data": data,
+        "total": len(data)
+    }
+
+
+@router.get("/pharmacies/recherche", response_model=PharmaciesRechercheResponse)
+async def get_pharmacies_recherche(
+    q: str = Query(..., min_length=1, max_length=200, description="Début du nom, de la rue ou de la ville"),
+    code_postal: Optional[str] = Query(None, description="Filtrer par code postal"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Recherche de pharmacies par nom, rue ou ville (autocomplétion)
+    
+    Index FTS5 construit à l'ingestion : insensible aux accents et à la casse,
+    chaque mot est un préfixe ; résultats classés par pertinence (BM25,
+    le nom pèse plus que la ville et la rue).
+    """
+    resultats = search_sites(q, code_postal.zfill(5) if code_postal else None, limit)
+    if resultats is None or get_sites_table() is None:
+        raise service_unavailable("Index de recherche non construit")
+    
+    ids = np.array([i for i, _ in resultats], dtype=np.int64)
+    sites = sites_records(ids, ["finess", "titre", "adresse_voie_1", "code_postal", "ville", "latitude", "longitude"])
+    
+    data = []
+    for site, (_, score) in zip(sites, resultats):
+        data.append({
+            "finess": site["finess"],
+            "titre": site["titre"],
+            "adresse": site["adresse_voie_1"],
+            "code_postal": site["code_postal"],
+            "ville": site["ville"],
+            "latitude": None if math.isnan(site["latitude"]) else site["latitude"],
+            "longitude": None if math.isnan(site["longitude"]) else site["longitude"],
+            "score": round(-score, 4)
+        })
+    
+    return {
+        "question": "Recherche de pharmacies vaccinantes",
+        "graphique": "Liste",
+        "recherche": q,
+        "data": data,
+        "total": len(data)
+    }
+
+
+DESERTS_TRIS = {
+    "score": "score",
+    "distance": "distance_km",
+    "habitants_par_pharmacie": "habitants_par_pharmacie",
+}
+
+@router.get("/deserts-vaccinaux", response_model=DesertsVaccinauxResponse)
+async def get_deserts_vaccinaux(
+    rayon_km: int = Query(DEFAULT_RAYON_KM, ge=1, le=50, description="Rayon pour compter pharmacies et population (km)"),
+    region: Optional[str] = Query(None, description="Filtrer par région"),
+    min_population: int = Query(0, ge=0, description="Population minimale de la commune"),
+    tri: str = Query("score", description="Tri: score, distance, habitants_par_pharmacie"),
+    limit: int = Query(50, ge=1, le=1000),
+    projection: Projection = Depends(projection(*DesertVaccinalData.model_fields))
+):
+    """
+    Déserts vaccinaux : communes les plus éloignées d'une pharmacie vaccinante
+    
+    Score = population × distance à la pharmacie la plus proche (habitants·km).
+    Calcul national vectorisé, mis en cache par rayon.
+    
+    Graphique: Barres horizontales
+    """
+    if tri not in DESERTS_TRIS:
+        raise HTTPException(status_code=400, detail=f"Tri inconnu: {tri} ({', '.join(DESERTS_TRIS)})")
+    
+    coverage = get_coverage(rayon_km)
+    if coverage is None:
+        raise service_unavailable("Données communes / pharmacies non disponibles")
+    
+    mask = coverage["population"] >= min_population
+    if region:
+        mask &= coverage["region"] == normaliser_region(region)
+    ranked = coverage[mask].sort_values(DESERTS_TRIS[tri], ascending=False, na_position="first").head(limit)
+    
+    columns = projection.colonnes(list(DesertVaccinalData.model_fields), graphique=charts.DESERTS_VACCINAUX.champs)
+    data = ranked[columns].astype(object).where(ranked[columns].notna(), None).to_dict("records")
+    
+    chartjs_format = charts.DESERTS_VACCINAUX.render(data) if projection.avec_graphique else None
+    
+    return projection.reponse({
+        "question": "Quelles communes sont les plus éloignées d'une pharmacie vaccinante ?",
+        "graphique": "Barres horizontales",
         "data": data,
         "total": len(data),
         "chartjs": chartjs_format
-    }
+    })
+
+
+@router.get("/pauvrete-urgences", response_model=PauvreteUrgencesResponse, dependencies=[Depends(require_tables(*TABLES_PAUVRETE_URGENCES.values()))])
+async def get_pauvrete_urgences(
+    perimetre: str = Query("complet", description="Périmètre: complet, metropole, domtom"),
+    pondere: bool = Query(False, description="Pondérer les régions par leur population"),
+    n_bootstrap: int = Query(DEFAULT_BOOTSTRAP, ge=100, le=100000, description="Nombre de rééchantillonnages bootstrap"),
+    niveau_confiance: float = Query(0.95, gt=0.5, lt=1, description="Niveau des intervalles de confiance"),
+    projection: Projection = Depends(projection(*PauvreteUrgencesData.model_fields))
+):
+    """
+    Pauvreté et passages aux urgences pour grippe par région
+    
+    Régression Taux_passages_pour_100k_hab ~ Taux_pauvreté_% (éventuellement
+    pondérée par Population_totale) : coefficients, R² et intervalles de
+    confiance bootstrap (percentiles), mis en cache par version des données.
+    
+    Graphique: Nuage de points + droite de régression
+    """
+    if perimetre not in TABLES_PAUVRETE_URGENCES:
+        raise HTTPException(status_code=400, detail=f"Périmètre inconnu: {perimetre} ({', '.join(TABLES_PAUVRETE_URGENCES)})")
+    
+    resultat = get_regression_pauvrete_urgences(perimetre, pondere, n_bootstrap, niveau_confiance)
+    if resultat is None:
+        raise service_unavailable("Tableau pauvreté / urgences non disponible")
+    df, regression = resultat
+    
+    def arrondi(valeur, decimales=4):
+        return None if valeur is None or np.isnan(valeur) else round(float(valeur), decimales)
+    
+    data = []
+    for row in df.to_dict(orient="records"):
+        x = float(row[COLONNE_PAUVRETE])
+        predit = None
+        if regression is not None:
+            predit = arrondi(regression["ordonnee_origine"]["estimation"] + regression["pente"]["estimation"] * x, 2)
+        data.append({
+            "region": row["region"],
+            "population_totale": int(row[COLONNE_POPULATION]),
+            "taux_pauvrete": x,
+            "taux_passages_100k": float(row[COLONNE_PASSAGES]),
+            "taux_passages_predit": predit
+        })
+    
+    chartjs_format = None
+    if projection.avec_graphique:
+        # Format Chart.js (nuage de points + droite aux bornes observées)
+        spec = charts.PAUVRETE_URGENCES
+        datasets = [spec.dataset("regions", [{"x": d["taux_pauvrete"], "y": d["taux_passages_100k"]} for d in data])]
+        if regression is not None and data:
+            bornes = [min(d["taux_pauvrete"] for d in data), max(d["taux_pauvrete"] for d in data)]
+            datasets.append(spec.dataset("regression", [
+                {"x": x, "y": arrondi(regression["ordonnee_origine"]["estimation"] + regression["pente"]["estimation"] * x, 2)}
+                for x in bornes
+            ]))
+        chartjs_format = spec.render(data, datasets=datasets)
+    
+    return projection.reponse({
+        "question": "La pauvreté est-elle liée aux passages aux urgences pour grippe ?",
+        "graphique": "Nuage de points",
+        "version": get_dataset_version(),
+        "regression": None if regression is None else {
+            **{nom: {cle: arrondi(v) for cle, v in ic.items()} for nom, ic in regression.items()},
+            "pondere": pondere,
+            "n_bootstrap": n_bootstrap,
+            "niveau_confiance": niveau_confiance
+        },
+        "data": data,
+        "total": len(data),
+        "chartjs": chartjs_format
+    })
+
 
+# Champs des réponses par âge : attributs homonymes des modèles SQLAlchemy
+# (colonnes "<année>_65_ans_et_plus" / "<année>_moins_de_65_ans")
+ANNEES_AGE = ("2021", "2022", "2023", "2024")
+CHAMPS_ACTES_AGE = {champ: getattr(EvolutionActesAge, champ) for champ in EvolutionActesAgeData.model_fields}
+CHAMPS_DOSES_AGE = {champ: getattr(EvolutionDosesAge, champ) for champ in EvolutionDosesAgeData.model_fields}
 
-@router.get("/evolution-actes-age", response_model=EvolutionActesAgeResponse)
+@router.get("/evolution-actes-age", response_model=EvolutionActesAgeResponse, dependencies=[Depends(require_tables("evolution_actes_age"))])
 async def get_evolution_actes_age(
     db: Session = Depends(get_db),
-    region: Optional[str] = Query(None, description="Filtrer par région")
+    region: Optional[str] = Query(None, description="Filtrer par région"),
+    projection: Projection = Depends(projection(*EvolutionActesAgeData.model_fields))
 ):
     """
     Évolution des actes par âge de 2021 à 2024 selon les régions
@@ -95,97 +442,35 @@ async def get_evolution_actes_age(
     Graphique: Courbes
     Format Chart.js: Line chart avec 2 lignes (65+ et -65)
     """
-    query = "SELECT * FROM evolution_actes_age WHERE 1=1"
+    query = db.query(*projection.select(CHAMPS_ACTES_AGE, graphique=charts.EVOLUTION_ACTES_AGE.champs))
     
     if region:
-        query += f" AND region = '{region}'"
-    
-    results = db.execute(text(query)).fetchall()
-    
-    # Préparer les données pour Chart.js
-    regions_data = []
-    for row in results:
-        regions_data.append({
-            "region": row[1],
-            "2021_65_plus": row[2],
-            "2021_moins_65": row[3],
-            "2022_65_plus": row[4],
-            "2022_moins_65": row[5],
-            "2023_65_plus": row[6],
-            "2023_moins_65": row[7],
-            "2024_65_plus": row[8],
-            "2024_moins_65": row[9]
-        })
+        query = query.filter(EvolutionActesAge.region == normaliser_region(region))
     
-    # Format Chart.js (Line chart)
-    chartjs_format = {
-        "type": "line",
-        "data": {
-            "labels": ["2021", "2022", "2023", "2024"],
-            "datasets": []
-        },
-        "options": {
-            "responsive": True,
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Évolution des actes de vaccination par âge"
-                },
-                "legend": {
-                    "display": True
-                }
-            },
-            "scales": {
-                "y": {
-                    "beginAtZero": True
-                }
-            }
-        }
-    }
+    # Exécution hors phase : déjà comptée dans la mesure sql
+    lignes = query.all()
+    with phase("conversion"):
+        regions_data = [row._asdict() for row in lignes]
     
-    # Ajouter une ligne par région
-    for region_data in regions_data:
-        # Ligne pour 65+
-        chartjs_format["data"]["datasets"].append({
-            "label": f"{region_data['region']} - 65 ans et plus",
-            "data": [
-                region_data["2021_65_plus"],
-                region_data["2022_65_plus"],
-                region_data["2023_65_plus"],
-                region_data["2024_65_plus"]
-            ],
-            "borderColor": "rgba(255, 99, 132, 1)",
-            "backgroundColor": "rgba(255, 99, 132, 0.2)",
-            "tension": 0.4
-        })
-        
-        # Ligne pour moins de 65
-        chartjs_format["data"]["datasets"].append({
-            "label": f"{region_data['region']} - Moins de 65 ans",
-            "data": [
-                region_data["2021_moins_65"],
-                region_data["2022_moins_65"],
-                region_data["2023_moins_65"],
-                region_data["2024_moins_65"]
-            ],
-            "borderColor": "rgba(54, 162, 235, 1)",
-            "backgroundColor": "rgba(54, 162, 235, 0.2)",
-            "tension": 0.4
-        })
+    chartjs_format = None
+    if projection.avec_graphique:
+        with phase("graphique"):
+            chartjs_format = charts.EVOLUTION_ACTES_AGE.render(regions_data)
     
-    return {
+    return projection.reponse({
         "question": "Évolution des actes par âge de 2021 à 2024 selon les régions",
         "graphique": "Courbes",
         "data": regions_data,
         "total": len(regions_data),
         "chartjs": chartjs_format
-    }
+    })
 
 
-@router.get("/evolution-doses-age", response_model=EvolutionDosesAgeResponse)
+@router.get("/evolution-doses-age", response_model=EvolutionDosesAgeResponse, dependencies=[Depends(require_tables("evolution_doses_age"))])
 async def get_evolution_doses_age(
     db: Session = Depends(get_db),
-    region: Optional[str] = Query(None, description="Filtrer par région")
+    region: Optional[str] = Query(None, description="Filtrer par région"),
+    projection: Projection = Depends(projection(*EvolutionDosesAgeData.model_fields))
 ):
     """
     Évolution des doses par âge de 2021 à 2024 selon les régions
@@ -193,335 +478,135 @@ async def get_evolution_doses_age(
     Graphique: Courbes
     Format Chart.js: Line chart
     """
-    query = "SELECT * FROM evolution_doses_age WHERE 1=1"
+    query = db.query(*projection.select(CHAMPS_DOSES_AGE, graphique=charts.EVOLUTION_DOSES_AGE.champs))
     
     if region:
-        query += f" AND region = '{region}'"
-    
-    results = db.execute(text(query)).fetchall()
-    
-    regions_data = []
-    for row in results:
-        regions_data.append({
-            "region": row[1],
-            "2021_65_plus": row[2],
-            "2021_moins_65": row[3],
-            "2022_65_plus": row[4],
-            "2022_moins_65": row[5],
-            "2023_65_plus": row[6],
-            "2023_moins_65": row[7],
-            "2024_65_plus": row[8],
-            "2024_moins_65": row[9]
-        })
+        query = query.filter(EvolutionDosesAge.region == normaliser_region(region))
     
-    # Même format que evolution-actes-age
-    chartjs_format = {
-        "type": "line",
-        "data": {
-            "labels": ["2021", "2022", "2023", "2024"],
-            "datasets": []
-        },
-        "options": {
-            "responsive": True,
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Évolution des doses de vaccination par âge"
-                }
-            },
-            "scales": {
-                "y": {
-                    "beginAtZero": True
-                }
-            }
-        }
-    }
+    # Exécution hors phase : déjà comptée dans la mesure sql
+    lignes = query.all()
+    with phase("conversion"):
+        regions_data = [row._asdict() for row in lignes]
     
-    for region_data in regions_data:
-        chartjs_format["data"]["datasets"].append({
-            "label": f"{region_data['region']} - 65 ans et plus",
-            "data": [
-                region_data["2021_65_plus"],
-                region_data["2022_65_plus"],
-                region_data["2023_65_plus"],
-                region_data["2024_65_plus"]
-            ],
-            "borderColor": "rgba(255, 99, 132, 1)",
-            "backgroundColor": "rgba(255, 99, 132, 0.2)",
-            "tension": 0.4
-        })
-        
-        chartjs_format["data"]["datasets"].append({
-            "label": f"{region_data['region']} - Moins de 65 ans",
-            "data": [
-                region_data["2021_moins_65"],
-                region_data["2022_moins_65"],
-                region_data["2023_moins_65"],
-                region_data["2024_moins_65"]
-            ],
-            "borderColor": "rgba(54, 162, 235, 1)",
-            "backgroundColor": "rgba(54, 162, 235, 0.2)",
-            "tension": 0.4
-        })
+    chartjs_format = None
+    if projection.avec_graphique:
+        with phase("graphique"):
+            chartjs_format = charts.EVOLUTION_DOSES_AGE.render(regions_data)
     
-    return {
+    return projection.reponse({
         "question": "Évolution des doses par âge de 2021 à 2024 selon les régions",
         "graphique": "Courbes",
         "data": regions_data,
         "total": len(regions_data),
         "chartjs": chartjs_format
-    }
+    })
 
 
-@router.get("/evolution-actes-region", response_model=EvolutionActesRegionResponse)
+CHAMPS_ACTES_REGION = {
+    "region": EvolutionActesRegion.region,
+    "actes_2021": EvolutionActesRegion.Actes_2021,
+    "actes_2022": EvolutionActesRegion.Actes_2022,
+    "actes_2023": EvolutionActesRegion.Actes_2023,
+    "actes_2024": EvolutionActesRegion.Actes_2024,
+    "evolution_pct": EvolutionActesRegion.Evolution_pct,
+}
+
+@router.get("/evolution-actes-region", response_model=EvolutionActesRegionResponse, dependencies=[Depends(require_tables("evolution_actes_region"))])
 async def get_evolution_actes_region(
     db: Session = Depends(get_db),
-    region: Optional[str] = Query(None, description="Filtrer par région")
+    region: Optional[str] = Query(None, description="Filtrer par région"),
+    projection: Projection = Depends(projection(*EvolutionActesRegionData.model_fields))
 ):
     """
     Évolution actes de vaccination contre la grippe de 2021 à 2024 par région
     
     Graphique: Graph batons (Bar chart)
     """
-    from app.models.schemas import EvolutionActesRegion
-    
-    query = db.query(EvolutionActesRegion)
+    query = db.query(*projection.select(CHAMPS_ACTES_REGION, graphique=charts.EVOLUTION_ACTES_REGION.champs))
     
     if region:
-        query = query.filter(EvolutionActesRegion.region.like(f"%{region}%"))
+        query = query.filter(EvolutionActesRegion.region == normaliser_region(region))
     
-    results = query.all()
+    data = [row._asdict() for row in query.all()]
     
-    data = []
-    for row in results:
-        data.append({
-            "region": row.region,
-            "actes_2021": row.Actes_2021,  # ← Majuscule !
-            "actes_2022": row.Actes_2022,  # ← Majuscule !
-            "actes_2023": row.Actes_2023,  # ← Majuscule !
-            "actes_2024": row.Actes_2024,  # ← Majuscule !
-            "evolution_pct": row.Evolution_pct  # ← Majuscule !
-        })
+    chartjs_format = charts.EVOLUTION_ACTES_REGION.render(data) if projection.avec_graphique else None
     
-    # Le reste identique...
-    chartjs_format = {
-        "type": "bar",
-        "data": {
-            "labels": [d["region"] for d in data],
-            "datasets": [
-                {
-                    "label": "2021",
-                    "data": [d["actes_2021"] for d in data],
-                    "backgroundColor": "rgba(255, 99, 132, 0.5)"
-                },
-                {
-                    "label": "2022",
-                    "data": [d["actes_2022"] for d in data],
-                    "backgroundColor": "rgba(54, 162, 235, 0.5)"
-                },
-                {
-                    "label": "2023",
-                    "data": [d["actes_2023"] for d in data],
-                    "backgroundColor": "rgba(255, 206, 86, 0.5)"
-                },
-                {
-                    "label": "2024",
-                    "data": [d["actes_2024"] for d in data],
-                    "backgroundColor": "rgba(75, 192, 192, 0.5)"
-                }
-            ]
-        },
-        "options": {
-            "responsive": True,
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Évolution des actes de vaccination par région (2021-2024)"
-                }
-            },
-            "scales": {
-                "y": {
-                    "beginAtZero": True
-                }
-            }
-        }
-    }
-    
-    return {
+    return projection.reponse({
         "question": "Évolution actes de vaccination contre la grippe de 2021 à 2024 par région",
         "graphique": "Graph batons",
         "data": data,
         "total": len(data),
         "chartjs": chartjs_format
-    }
+    })
 
-@router.get("/evolution-doses-region", response_model=EvolutionDosesRegionResponse)
+CHAMPS_DOSES_REGION = {champ: getattr(EvolutionDosesRegion, champ) for champ in EvolutionDosesRegionData.model_fields}
+
+@router.get("/evolution-doses-region", response_model=EvolutionDosesRegionResponse, dependencies=[Depends(require_tables("evolution_doses_region"))])
 async def get_evolution_doses_region(
     db: Session = Depends(get_db),
-    region: Optional[str] = Query(None, description="Filtrer par région")
+    region: Optional[str] = Query(None, description="Filtrer par région"),
+    projection: Projection = Depends(projection(*EvolutionDosesRegionData.model_fields))
 ):
     """
     Évolution doses de vaccination contre la grippe de 2021 à 2024 par région
     
     Graphique: Graph batons (Bar chart)
     """
-    query = "SELECT * FROM evolution_doses_region WHERE 1=1"
+    query = db.query(*projection.select(CHAMPS_DOSES_REGION, graphique=charts.EVOLUTION_DOSES_REGION.champs))
     
     if region:
-        query += f" AND region = '{region}'"
-    
-    results = db.execute(text(query)).fetchall()
+        query = query.filter(EvolutionDosesRegion.region == normaliser_region(region))
     
-    data = []
-    for row in results:
-        data.append({
-            "region": row[1],
-            "doses_2021": row[2],
-            "doses_2022": row[3],
-            "doses_2023": row[4],
-            "doses_2024": row[5],
-            "evolution_pct": row[6]
-        })
+    data = [row._asdict() for row in query.all()]
     
     # Même format que evolution-actes-region
-    chartjs_format = {
-        "type": "bar",
-        "data": {
-            "labels": [d["region"] for d in data],
-            "datasets": [
-                {
-                    "label": "2021",
-                    "data": [d["doses_2021"] for d in data],
-                    "backgroundColor": "rgba(255, 99, 132, 0.5)"
-                },
-                {
-                    "label": "2022",
-                    "data": [d["doses_2022"] for d in data],
-                    "backgroundColor": "rgba(54, 162, 235, 0.5)"
-                },
-                {
-                    "label": "2023",
-                    "data": [d["doses_2023"] for d in data],
-                    "backgroundColor": "rgba(255, 206, 86, 0.5)"
-                },
-                {
-                    "label": "2024",
-                    "data": [d["doses_2024"] for d in data],
-                    "backgroundColor": "rgba(75, 192, 192, 0.5)"
-                }
-            ]
-        },
-        "options": {
-            "responsive": True,
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Évolution des doses de vaccination par région (2021-2024)"
-                }
-            },
-            "scales": {
-                "y": {
-                    "beginAtZero": True
-                }
-            }
-        }
-    }
+    chartjs_format = charts.EVOLUTION_DOSES_REGION.render(data) if projection.avec_graphique else None
     
-    return {
+    return projection.reponse({
         "question": "Évolution doses de vaccination contre la grippe de 2021 à 2024 par région",
         "graphique": "Graph batons",
         "data": data,
         "total": len(data),
         "chartjs": chartjs_format
-    }
+    })
 
 
-@router.get("/repartition-lieu-vaccination", response_model=RepartitionLieuVaccinationResponse)
+CHAMPS_REPARTITION_LIEU = {
+    champ: getattr(RepartitionLieuVaccination, champ) for champ in RepartitionLieuVaccinationData.model_fields
+}
+
+@router.get("/repartition-lieu-vaccination", response_model=RepartitionLieuVaccinationResponse, dependencies=[Depends(require_tables("repartition_lieu_vaccination"))])
 async def get_repartition_lieu_vaccination(
     db: Session = Depends(get_db),
     type_lieu: Optional[str] = Query(None, description="Filtrer par type de lieu"),
-    tranche_age: Optional[str] = Query(None, description="Filtrer par tranche d'âge")
+    tranche_age: Optional[str] = Query(None, description="Filtrer par tranche d'âge"),
+    projection: Projection = Depends(projection(*RepartitionLieuVaccinationData.model_fields))
 ):
     """
     Répartition du lieu de vaccination selon la tranche d'âge
     
     Graphique: Courbe à barres (Stacked bar chart)
     """
-    query = "SELECT * FROM repartition_lieu_vaccination WHERE 1=1"
+    query = db.query(*projection.select(CHAMPS_REPARTITION_LIEU, graphique=charts.REPARTITION_LIEU_VACCINATION.champs))
     
     if type_lieu:
-        query += f" AND type_lieu_vaccination = '{type_lieu}'"
+        query = query.filter(RepartitionLieuVaccination.type_lieu_vaccination == type_lieu)
     if tranche_age:
-        query += f" AND tranche_age = '{tranche_age}'"
-    
-    results = db.execute(text(query)).fetchall()
+        query = query.filter(RepartitionLieuVaccination.tranche_age == tranche_age)
     
-    data = []
-    for row in results:
-        data.append({
-            "type_lieu_vaccination": row[1],
-            "tranche_age": row[2]
-        })
+    data = [row._asdict() for row in query.all()]
     
-    # Regrouper par tranche d'âge
-    tranches = list(set([d["tranche_age"] for d in data]))
-    lieux = list(set([d["type_lieu_vaccination"] for d in data]))
+    chartjs_format = None
+    if projection.avec_graphique:
+        # Une barre par tranche d'âge
+        tranches = list(set([d["tranche_age"] for d in data]))
+        # TODO: Compter les occurrences par lieu et tranche d'âge (une série empilée par lieu)
+        chartjs_format = charts.REPARTITION_LIEU_VACCINATION.render(labels=tranches, datasets=[])
     
-    # Format Chart.js (Stacked bar chart)
-    chartjs_format = {
-        "type": "bar",
-        "data": {
-            "labels": tranches,
-            "datasets": []
-        },
-        "options": {
-            "responsive": True,
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Répartition du lieu de vaccination par tranche d'âge"
-                }
-            },
-            "scales": {
-                "x": {
-                    "stacked": True
-                },
-                "y": {
-                    "stacked": True,
-                    "beginAtZero": True
-                }
-            }
-        }
-    }
-@router.get("/debug-actes-region")
-async def debug_actes_region(db: Session = Depends(get_db)):
-    """Endpoint de debug pour voir les données brutes"""
-    from app.models.schemas import EvolutionActesRegion
-    
-    results = db.query(EvolutionActesRegion).all()
-    
-    debug_data = []
-    for row in results:
-        debug_data.append({
-            "region": row.region,
-            "has_Actes_2021_attr": hasattr(row, 'Actes_2021'),
-            "has_actes_2021_attr": hasattr(row, 'actes_2021'),
-            "all_attributes": [attr for attr in dir(row) if not attr.startswith('_')],
-            "try_Actes_2021": getattr(row, 'Actes_2021', 'NOT_FOUND'),
-            "try_actes_2021": getattr(row, 'actes_2021', 'NOT_FOUND'),
-        })
-    
-    return {
-        "total_rows": len(results),
-        "debug_data": debug_data[:3]  # Juste les 3 premières lignes
-    }
-    
-    # TODO: Compter les occurrences par lieu et tranche d'âge
-    
-    return {
+    return projection.reponse({
         "question": "Répartition du lieu de vaccination selon la tranche d'âge",
         "graphique": "Courbe à barres",
         "data": data,
         "total": len(data),
         "chartjs": chartjs_format
-    }
\ No newline at end of file
+    })
\ No newline at end of file
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Response
+from app.dependencies import RETRY_AFTER_SECONDS
+from app.services.data_loader import get_load_progress, get_dataset_version
+from app.services.scheduler import scheduler
+from app.models.response_models import HealthLiveResponse, HealthReadyResponse
+
+
+router = APIRouter()
+
+# ============================================
+# SANTÉ - Sondes de vie et de disponibilité
+# ============================================
+
+@router.get("/live", response_model=HealthLiveResponse)
+async def health_live():
+    """
+    Sonde de vie : le processus répond (indépendant du chargement des données)
+    """
+    return {"statut": "vivant"}
+
+
+@router.get("/ready", response_model=HealthReadyResponse)
+async def health_ready(response: Response):
+    """
+    Sonde de disponibilité : 200 une fois le chargement initial et la première
+    ingestion terminés, 503 (avec Retry-After) avant, avec la progression de chaque table
+    """
+    progression = get_load_progress()
+    tables = {}
+    for table, p in progression["tables"].items():
+        tables[table] = {
+            **p,
+            "progression_pct": 100.0 if p["prete"] else (
+                round(p["lignes"] / p["total"] * 100, 1) if p["total"] else 0.0
+            )
+        }
+    
+    # Prêt quand les tables sont chargées et que la première ingestion est finie
+    # (index de recherche, sites rechargés) ; une réingestion ne rend pas indisponible
+    ingestion = scheduler.jobs.get("ingestion")
+    pret = progression["fin"] is not None and (ingestion is None or ingestion.executions > 0)
+    if not pret:
+        response.status_code = 503
+        response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+    
+    return {
+        "statut": "pret" if pret else "chargement",
+        "version": get_dataset_version() if pret else None,
+        "chargement": progression["etat"],
+        "debut": progression["debut"],
+        "fin": progression["fin"],
+        "tables": tables,
+        "taches": {job["nom"]: job["etat"] for job in scheduler.statuts()}
+    }
@@ -1,175 +1,180 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import String, type_coerce
+from app.dependencies import require_tables, projection, Projection, service_unavailable
 from app.database import get_db
+from app.services.profiling import ProfiledRoute
+from app.services import charts
 from typing import Optional
+from app.services.regions import normaliser_region
+from app.services.allocation import get_allocation_inputs, optimize_allocation, AllocationImpossible
+import numpy as np
 
+from app.models.schemas import ActesDosesRegion, NombrePharmaciesPeriode
 from app.models.response_models import (
+    ActesDosesRegionData,
     ActesDosesRegionResponse,
+    NombrePharmaciesPeriodeData,
     NombrePharmaciesPeriodeResponse,
-    ActesDosesRegionResponse
+    AllocationDosesData,
+    AllocationDosesResponse
 )
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 # ============================================
 # LOGISTIQUE - Routes spécifiques
 # ============================================
 
-@router.get("/actes-doses-region", response_model=ActesDosesRegionResponse)
+CHAMPS_ACTES_DOSES = {champ: getattr(ActesDosesRegion, champ) for champ in ActesDosesRegionData.model_fields}
+
+@router.get("/actes-doses-region", response_model=ActesDosesRegionResponse, dependencies=[Depends(require_tables("actes_doses_region"))])
 async def get_actes_doses_region(
     db: Session = Depends(get_db),
-    region: Optional[str] = Query(None, description="Filtrer par région")
+    region: Optional[str] = Query(None, description="Filtrer par région"),
+    projection: Projection = Depends(projection(*ActesDosesRegionData.model_fields))
 ):
     """
     Comparaison actes de vaccination vs doses distribuées par région
     
     Graphique: Barres groupées
     """
-    from app.models.schemas import ActesDosesRegion
-    
-    query = db.query(ActesDosesRegion)
+    query = db.query(*projection.select(CHAMPS_ACTES_DOSES, graphique=charts.ACTES_DOSES_REGION.champs))
     
     if region:
-        query = query.filter(ActesDosesRegion.region.like(f"%{region}%"))
+        query = query.filter(ActesDosesRegion.region == normaliser_region(region))
     
-    results = query.all()
-    
-    data = []
-    for row in results:
-        data.append({
-            "region": row.region,
-            "acte_vgp": row.acte_vgp,
-            "doses_j07e1": row.doses_j07e1
-        })
+    data = [row._asdict() for row in query.all()]
     
     # Format Chart.js (Barres groupées)
-    chartjs_format = {
-        "type": "bar",
-        "data": {
-            "labels": [d["region"] for d in data],
-            "datasets": [
-                {
-                    "label": "Actes de vaccination",
-                    "data": [d["acte_vgp"] for d in data],
-                    "backgroundColor": "rgba(54, 162, 235, 0.7)",
-                    "borderColor": "rgba(54, 162, 235, 1)",
-                    "borderWidth": 1
-                },
-                {
-                    "label": "Doses distribuées",
-                    "data": [d["doses_j07e1"] for d in data],
-                    "backgroundColor": "rgba(255, 99, 132, 0.7)",
-                    "borderColor": "rgba(255, 99, 132, 1)",
-                    "borderWidth": 1
-                }
-            ]
-        },
-        "options": {
-            "responsive": True,
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Actes vs Doses par région"
-                },
-                "legend": {
-                    "position": "top"
-                }
-            },
-            "scales": {
-                "y": {
-                    "beginAtZero": True,
-                    "title": {
-                        "display": True,
-                        "text": "Nombre"
-                    }
-                }
-            }
-        }
-    }
-    
-    return {
+    chartjs_format = charts.ACTES_DOSES_REGION.render(data) if projection.avec_graphique else None
+    
+    return projection.reponse({
         "question": "Comparaison actes de vaccination vs doses distribuées",
         "graphique": "Barres groupées",
         "data": data,
         "total": len(data),
         "chartjs": chartjs_format
-    }
+    })
+
 
+# Date lue telle que stockée (texte AAAA-MM-JJ), comparée comme texte aux bornes
+DATE_PHARMACIES = type_coerce(NombrePharmaciesPeriode.date, String)
+CHAMPS_NOMBRE_PHARMACIES = {
+    "date": DATE_PHARMACIES,
+    "variable_pharmacie": NombrePharmaciesPeriode.variable_pharmacie,
+    "valeur": NombrePharmaciesPeriode.valeur,
+}
 
-@router.get("/nombre-pharmacies-periode", response_model=NombrePharmaciesPeriodeResponse)
+@router.get("/nombre-pharmacies-periode", response_model=NombrePharmaciesPeriodeResponse, dependencies=[Depends(require_tables("nombre_pharmacies_periode"))])
 async def get_nombre_pharmacies_periode(
     db: Session = Depends(get_db),
     date_debut: Optional[str] = Query(None, description="Date de début (YYYY-MM-DD)"),
     date_fin: Optional[str] = Query(None, description="Date de fin (YYYY-MM-DD)"),
-    variable_pharmacie: Optional[str] = Query(None, description="Variable spécifique")
+    variable_pharmacie: Optional[str] = Query(None, description="Variable spécifique"),
+    projection: Projection = Depends(projection(*NombrePharmaciesPeriodeData.model_fields))
 ):
     """
     Nombre de pharmacie sur une période/campagne de vaccination
     
     Graphique: Line chart (évolution temporelle)
     """
-    query = "SELECT * FROM nombre_pharmacies_periode WHERE 1=1"
+    query = db.query(*projection.select(CHAMPS_NOMBRE_PHARMACIES, graphique=charts.NOMBRE_PHARMACIES_PERIODE.champs))
     
     if date_debut:
-        query += f" AND date >= '{date_debut}'"
+        query = query.filter(DATE_PHARMACIES >= date_debut)
     if date_fin:
-        query += f" AND date <= '{date_fin}'"
+        query = query.filter(DATE_PHARMACIES <= date_fin)
     if variable_pharmacie:
-        query += f" AND variable_pharmacie = '{variable_pharmacie}'"
+        query = query.filter(NombrePharmaciesPeriode.variable_pharmacie == variable_pharmacie)
+    
+    data = [row._asdict() for row in query.order_by(NombrePharmaciesPeriode.date.asc()).all()]
+    
+    # Format Chart.js (Line chart)
+    chartjs_format = charts.NOMBRE_PHARMACIES_PERIODE.render(data) if projection.avec_graphique else None
+    
+    return projection.reponse({
+        "question": "Nombre de pharmacie sur une période/campagne de vaccination",
+        "graphique": "Line chart",
+        "data": data,
+        "total": len(data),
+        "chartjs": chartjs_format
+    })
+
+
+@router.get("/allocation-doses", response_model=AllocationDosesResponse, dependencies=[Depends(require_tables("evolution_actes_region", "evolution_doses_region", "actes_doses_region", "evolution_actes_age"))])
+async def get_allocation_doses(
+    budget: Optional[int] = Query(None, ge=0, description="Budget national de doses (défaut: actes projetés)"),
+    couverture_min: float = Query(0.8, ge=0, le=1, description="Part minimale des actes projetés couverte dans chaque région"),
+    gaspillage_max: float = Query(0.25, ge=0, lt=1, description="Part maximale de doses non utilisées par région"),
+    priorite_65_plus: float = Query(1.0, ge=0, le=10, description="Poids supplémentaire des actes des 65 ans et plus"),
+    projection: Projection = Depends(projection(*AllocationDosesData.model_fields))
+):
+    """
+    Répartition optimale d'un budget national de doses entre régions
+    
+    Demande = tendance des actes 2021-2024 projetée sur la campagne suivante.
+    Contraintes : couverture minimale et gaspillage maximal par région ;
+    les actes sont servis par priorité (part des 65 ans et plus).
+    Optimum exact du programme linéaire (sac à dos continu), vectorisé.
+    
+    Graphique: Barres groupées
+    """
+    entrees = get_allocation_inputs()
+    if entrees is None:
+        raise service_unavailable("Séries des actes par région non disponibles")
     
-    query += " ORDER BY date ASC"
+    demande = entrees["actes_projetes"].to_numpy()
+    part_65 = entrees["part_65_plus"].to_numpy(dtype=np.float64)
+    priorite = 1 + priorite_65_plus * np.nan_to_num(part_65, nan=np.nanmean(part_65) if np.isfinite(part_65).any() else 0.0)
+    if budget is None:
+        budget = int(round(demande.sum()))
     
-    results = db.execute(text(query)).fetchall()
+    try:
+        resultat = optimize_allocation(demande, priorite, budget, couverture_min, gaspillage_max)
+    except AllocationImpossible as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    allocation, servis = resultat["allocation"], resultat["servis"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        couverture = np.where(demande > 0, servis / demande * 100, 100.0)
+        gaspillage = np.where(allocation > 0, (allocation - servis) / allocation * 100, 0.0)
     
     data = []
-    for row in results:
+    for i, row in enumerate(entrees.to_dict(orient="records")):
         data.append({
-            "date": str(row[1]),
-            "variable_pharmacie": row[2],
-            "valeur": row[3]
+            "region": row["region"],
+            "actes_historiques": int(row["actes_historiques"]),
+            "actes_projetes": int(round(demande[i])),
+            "ratio_doses_actes_historique": None if np.isnan(row["ratio_doses_actes"]) else round(row["ratio_doses_actes"], 3),
+            "part_65_plus": None if np.isnan(row["part_65_plus"]) else round(row["part_65_plus"], 4),
+            "priorite": round(float(priorite[i]), 4),
+            "doses_allouees": int(round(allocation[i])),
+            "couverture_pct": round(float(couverture[i]), 2),
+            "gaspillage_pct": round(float(gaspillage[i]), 2)
         })
     
-    # Format Chart.js (Line chart)
-    chartjs_format = {
-        "type": "line",
-        "data": {
-            "labels": [d["date"] for d in data],
-            "datasets": [{
-                "label": "Nombre de pharmacies",
-                "data": [d["valeur"] for d in data],
-                "borderColor": "rgba(75, 192, 192, 1)",
-                "backgroundColor": "rgba(75, 192, 192, 0.2)",
-                "tension": 0.4,
-                "fill": True
-            }]
+    # Format Chart.js (Barres groupées)
+    chartjs_format = None
+    if projection.avec_graphique:
+        chartjs_format = charts.ALLOCATION_DOSES.render(data, titre=f"Allocation de {budget:,} doses".replace(",", " "))
+    
+    total_projete = float(demande.sum())
+    return projection.reponse({
+        "question": "Comment répartir les doses entre régions ?",
+        "graphique": "Barres groupées",
+        "resume": {
+            "budget": budget,
+            "doses_allouees": int(round(allocation.sum())),
+            "reserve": int(round(resultat["reserve"])),
+            "actes_projetes": int(round(total_projete)),
+            "actes_couverts": int(round(servis.sum())),
+            "couverture_pct": round(servis.sum() / total_projete * 100, 2) if total_projete else 100.0,
+            "couverture_min": couverture_min,
+            "gaspillage_max": gaspillage_max
         },
-        "options": {
-            "responsive": True,
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Évolution du nombre de pharmacies"
-                }
-            },
-            "scales": {
-                "y": {
-                    "beginAtZero": True
-                },
-                "x": {
-                    "type": "time",
-                    "time": {
-                        "unit": "day"
-                    }
-                }
-            }
-        }
-    }
-    
-    return {
-        "question": "Nombre de pharmacie sur une période/campagne de vaccination",
-        "graphique": "Line chart",
         "data": data,
         "total": len(data),
         "chartjs": chartjs_format
-    }
\ No newline at end of file
+    })
+
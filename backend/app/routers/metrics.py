@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Response
+from app.services.metrics import CONTENT_TYPE, render_metrics
+
+
+router = APIRouter()
+
+# ============================================
+# MÉTRIQUES - Export Prometheus
+# ============================================
+
+@router.get("/metrics", response_class=Response)
+async def metrics():
+    """
+    Métriques au format texte Prometheus : requêtes et latences par route,
+    tailles des réponses, requêtes SQL, caches, tâches de fond, version des données
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
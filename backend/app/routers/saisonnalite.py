@@ -1,31 +1,49 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from app.dependencies import require_tables, projection, Projection, negocier_encodage, service_unavailable
 from app.database import get_db
+from app.services.profiling import ProfiledRoute
+from app.services import charts
+from app.services.columnar import query_columns, arrow_types
 from typing import Optional
-from app.models.response_models import DonneesMeteoResponse
+import numpy as np
+from app.services.analytics import (
+    get_correlation_meteo_grippe as compute_correlation_meteo_grippe,
+    VARIABLES_METEO, VARIABLES_GRIPPE, MAX_DECALAGE, DEFAULT_DECALAGE
+)
+from app.services.data_loader import get_dataset_version
+from app.services.forecast import get_forecast_models, forecast_models_ready, forecast, MAX_HORIZON, STATION_ENSEMBLE
+from app.services.scheduler import scheduler
+from app.models.schemas import DonneesMeteo
+from app.models.response_models import (
+    DonneesMeteoData, DonneesMeteoResponse, CorrelationMeteoGrippeData, CorrelationMeteoGrippeResponse,
+    PrevisionGrippeData, PrevisionGrippeResponse
+)
+import json
 
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 # ============================================
 # SAISONNALITÉ - Routes spécifiques
 # ============================================
 
-@router.get("/donnees-meteo", response_model=DonneesMeteoResponse)
+CHAMPS_METEO = {champ: getattr(DonneesMeteo, champ) for champ in DonneesMeteoData.model_fields}
+
+@router.get("/donnees-meteo", response_model=DonneesMeteoResponse, dependencies=[Depends(require_tables("donnees_meteo"))])
 async def get_donnees_meteo(
     db: Session = Depends(get_db),
     nom_usuel: Optional[str] = Query(None, description="Station météo"),
     annee: Optional[int] = Query(None, description="Année"),
-    mois: Optional[int] = Query(None, description="Mois (1-12)")
+    mois: Optional[int] = Query(None, description="Mois (1-12)"),
+    projection: Projection = Depends(projection(*DonneesMeteoData.model_fields)),
+    encodage: str = Depends(negocier_encodage)
     # ← Plus de limit du tout !
 ):
     """
     Données météo + grippe pour analyse de la saisonnalité
     """
-    from app.models.schemas import DonneesMeteo
-    
-    query = db.query(DonneesMeteo)
+    query = db.query(*projection.select(CHAMPS_METEO, graphique=charts.DONNEES_METEO.champs))
     
     if nom_usuel:
         query = query.filter(DonneesMeteo.NOM_USUEL.like(f"%{nom_usuel}%"))
@@ -35,114 +53,157 @@ async def get_donnees_meteo(
         query = query.filter(DonneesMeteo.mois == mois)
     
     # PAS de .limit() ici !
-    results = query.all()
-    
-    data = []
-    for row in results:
-        data.append({
-            "NOM_USUEL": row.NOM_USUEL,
-            "TNTXM": row.TNTXM,
-            "TNSOL": row.TNSOL,
-            "TMM": row.TMM,
-            "annees": row.annees,
-            "mois": row.mois,
-            "taux_grippe": row.taux_grippe,
-            "incidence_sg_hebdo": row.incidence_sg_hebdo
-        })
-    
-    # Format Chart.js (Multi-line chart)
-    chartjs_format = {
-        "type": "line",
-        "data": {
-            "labels": [f"{d['annees']}-{d['mois']:02d}" for d in data],
-            "datasets": [
-                {
-                    "label": "Température moyenne (TMM)",
-                    "data": [d["TMM"] for d in data],
-                    "borderColor": "rgba(255, 99, 132, 1)",
-                    "backgroundColor": "rgba(255, 99, 132, 0.2)",
-                    "yAxisID": "y",
-                    "tension": 0.4
-                },
-                {
-                    "label": "Taux grippe",
-                    "data": [d["taux_grippe"] for d in data],
-                    "borderColor": "rgba(54, 162, 235, 1)",
-                    "backgroundColor": "rgba(54, 162, 235, 0.2)",
-                    "yAxisID": "y1",
-                    "tension": 0.4
-                },
-                {
-                    "label": "Incidence hebdo",
-                    "data": [d["incidence_sg_hebdo"] for d in data],
-                    "borderColor": "rgba(75, 192, 192, 1)",
-                    "backgroundColor": "rgba(75, 192, 192, 0.2)",
-                    "yAxisID": "y1",
-                    "tension": 0.4
-                }
-            ]
-        },
-        "options": {
-            "responsive": True,
-            "interaction": {
-                "mode": "index",
-                "intersect": False
-            },
-            "plugins": {
-                "title": {
-                    "display": True,
-                    "text": "Corrélation Température / Grippe"
-                }
-            },
-            "scales": {
-                "y": {
-                    "type": "linear",
-                    "display": True,
-                    "position": "left",
-                    "title": {
-                        "display": True,
-                        "text": "Température (°C)"
-                    }
-                },
-                "y1": {
-                    "type": "linear",
-                    "display": True,
-                    "position": "right",
-                    "title": {
-                        "display": True,
-                        "text": "Taux grippe / Incidence"
-                    },
-                    "grid": {
-                        "drawOnChartArea": False
-                    }
-                }
-            }
-        }
-    }
+    resultats = query.all()
     
-    return {
+    contenu = {
         "question": "Analyse de la saisonnalité - Corrélation température/grippe",
         "graphique": "Aires / Courbes",
-        "data": data,
-        "total": len(data),
-        "chartjs": chartjs_format
+        "data": None,
+        "total": len(resultats),
+        "chartjs": None
     }
+    if encodage != "lignes":
+        return projection.reponse_colonnes(
+            contenu, query_columns(query, resultats), encodage, charts.DONNEES_METEO, arrow_types(query)
+        )
+    
+    contenu["data"] = [row._asdict() for row in resultats]
+    # Format Chart.js (Multi-line chart)
+    if projection.avec_graphique:
+        contenu["chartjs"] = charts.DONNEES_METEO.render(contenu["data"])
+    
+    return projection.reponse(contenu)
 
 
-@router.get("/correlation-meteo-grippe")
+CORRELATION_NIVEAUX = ["global", "annee", "station"]
+
+@router.get("/correlation-meteo-grippe", response_model=CorrelationMeteoGrippeResponse, dependencies=[Depends(require_tables("donnees_meteo"))])
 async def get_correlation_meteo_grippe(
-    db: Session = Depends(get_db)
+    niveau: str = Query("global", description="Niveau: global, annee, station"),
+    max_decalage: int = Query(DEFAULT_DECALAGE, ge=0, le=MAX_DECALAGE, description="Décalage maximal météo → grippe (mois)"),
+    station: Optional[str] = Query(None, description="Station météo (niveau station)"),
+    annee: Optional[int] = Query(None, description="Année (niveau annee)"),
+    meteo: Optional[str] = Query(None, description="Variable météo: TMM, TNTXM, TNSOL"),
+    grippe: Optional[str] = Query(None, description="Variable grippe: taux_grippe, incidence_sg_hebdo"),
+    projection: Projection = Depends(projection(*CorrelationMeteoGrippeData.model_fields))
 ):
     """
     Corrélation entre données météo et cas de grippe
     
-    Endpoint bonus pour croiser données météo + passages urgences
+    Pearson et Spearman entre température (mois t) et grippe (mois t + décalage),
+    par station, par année et globalement. Calcul vectorisé sur la matrice
+    station × mois, mis en cache par version du jeu de données.
+    
+    Graphique: Courbes (corrélation globale selon le décalage)
     """
-    # TODO: Jointure entre donnees_meteo et autre table quand les données seront là
+    if niveau not in CORRELATION_NIVEAUX:
+        raise HTTPException(status_code=400, detail=f"Niveau inconnu: {niveau} ({', '.join(CORRELATION_NIVEAUX)})")
+    if meteo is not None and meteo not in VARIABLES_METEO:
+        raise HTTPException(status_code=400, detail=f"Variable météo inconnue: {meteo} ({', '.join(VARIABLES_METEO)})")
+    if grippe is not None and grippe not in VARIABLES_GRIPPE:
+        raise HTTPException(status_code=400, detail=f"Variable grippe inconnue: {grippe} ({', '.join(VARIABLES_GRIPPE)})")
+    
+    correlations = compute_correlation_meteo_grippe(max_decalage)
+    if correlations is None:
+        raise service_unavailable("Données météo non disponibles")
+    
+    if meteo:
+        correlations = correlations[correlations["meteo"] == meteo]
+    if grippe:
+        correlations = correlations[correlations["grippe"] == grippe]
+    
+    resultat = correlations[correlations["niveau"] == niveau]
+    if station:
+        resultat = resultat[resultat["station"].str.contains(station, case=False, regex=False, na=False)]
+    if annee:
+        resultat = resultat[resultat["annee"] == annee]
+    
+    data = []
+    if projection.avec_data:
+        resultat = resultat[projection.colonnes(list(CorrelationMeteoGrippeData.model_fields))]
+        data = resultat.astype(object).where(resultat.notna(), None).to_dict(orient="records")
+    
+    chartjs_format = None
+    if projection.avec_graphique:
+        # Format Chart.js : corrélation globale (Pearson) en fonction du décalage
+        spec = charts.CORRELATION_METEO_GRIPPE
+        globales = correlations[correlations["niveau"] == "global"]
+        datasets = []
+        for i, ((variable_meteo, variable_grippe), serie) in enumerate(globales.groupby(["meteo", "grippe"], sort=False)):
+            serie = serie.sort_values("decalage_mois")
+            datasets.append(spec.dataset(
+                "couple", [None if np.isnan(r) else r for r in serie["pearson"]],
+                label=f"{variable_meteo} / {variable_grippe}", borderColor=charts.palette(i)
+            ))
+        chartjs_format = spec.render(labels=[f"+{d} mois" for d in range(max_decalage + 1)], datasets=datasets)
     
-    return {
+    return projection.reponse({
         "question": "Corrélation température / cas de grippe",
-        "graphique": "Scatter plot + Line chart",
-        "data": [],
-        "message": "À implémenter avec les données réelles"
-    }
\ No newline at end of file
+        "graphique": "Courbes",
+        "version": get_dataset_version(),
+        "data": data,
+        "total": len(resultat),
+        "chartjs": chartjs_format
+    })
+
+
+@router.get("/prevision-grippe", response_model=PrevisionGrippeResponse, dependencies=[Depends(require_tables("donnees_meteo"))])
+async def get_prevision_grippe(
+    station: Optional[str] = Query(None, description=f"Station météo, '{STATION_ENSEMBLE}' pour la moyenne (défaut: toutes)"),
+    cible: str = Query("taux_grippe", description="Cible: taux_grippe, incidence_sg_hebdo"),
+    horizon: int = Query(6, ge=1, le=MAX_HORIZON, description="Nombre de mois à prévoir"),
+    niveau_confiance: float = Query(0.95, gt=0.5, lt=1, description="Niveau des intervalles de prévision"),
+    projection: Projection = Depends(projection(*PrevisionGrippeData.model_fields))
+):
+    """
+    Prévision de la grippe pour les prochains mois
+    
+    Modèle saisonnier avec la température (anomalie de TMM) en covariable,
+    ajusté en tâche de fond après chaque chargement des données : la requête
+    ne fait que lire les paramètres persistés et dérouler la prévision.
+    
+    Graphique: Courbes (prévision par station)
+    """
+    if cible not in VARIABLES_GRIPPE:
+        raise HTTPException(status_code=400, detail=f"Cible inconnue: {cible} ({', '.join(VARIABLES_GRIPPE)})")
+    
+    # Modèles de la version servie uniquement : jamais de paramètres périmés
+    version = get_dataset_version()
+    modeles = get_forecast_models(cible, station, version)
+    if not modeles:
+        if station and forecast_models_ready(version):
+            raise HTTPException(status_code=404, detail=f"Aucun modèle de prévision pour la station: {station}")
+        # Pas encore ajustés sur cette version : (re)lance l'ajustement s'il ne tourne pas déjà
+        scheduler.trigger("precalcul_analytique")
+        raise service_unavailable("Modèles de prévision non disponibles (ajustement en cours)")
+    
+    data = []
+    series = {}
+    for modele in modeles:
+        previsions = forecast(json.loads(modele.parametres), horizon, niveau_confiance)
+        series[modele.station] = previsions
+        data.extend({"station": modele.station, **p} for p in previsions)
+    
+    chartjs_format = None
+    if projection.avec_graphique:
+        # Format Chart.js (une courbe par station)
+        # Axe des mois commun : les stations n'ont pas toutes le même dernier mois observé
+        spec = charts.PREVISION_GRIPPE
+        mois = sorted({p["mois"] for previsions in series.values() for p in previsions})
+        datasets = []
+        for i, (nom, previsions) in enumerate(series.items()):
+            par_mois = {p["mois"]: p["prevision"] for p in previsions}
+            datasets.append(spec.dataset(
+                "station", [par_mois.get(m) for m in mois], label=nom, borderColor=charts.palette(i)
+            ))
+        chartjs_format = spec.render(labels=mois, datasets=datasets, titre=f"Prévision {cible} ({horizon} mois)")
+    
+    return projection.reponse({
+        "question": "Quelle évolution de la grippe dans les prochains mois ?",
+        "graphique": "Courbes",
+        "version": version,
+        "data": data,
+        "total": len(data),
+        "chartjs": chartjs_format
+    })
+
@@ -0,0 +1,139 @@
+"""
+Allocation des doses de vaccin entre régions (ou départements) sous budget
+
+Pour chaque zone i :
+- demande d_i : actes projetés pour la prochaine campagne (tendance linéaire
+  des actes 2021-2024)
+- plancher : x_i ≥ couverture_min · d_i (couverture minimale)
+- plafond : x_i ≤ d_i / (1 - gaspillage_max) (doses non utilisées limitées)
+- valeur : p_i par acte servi, p_i = 1 + priorite_65_plus · part des 65 ans et plus
+
+Le problème (max Σ p_i · min(x_i, d_i) sous Σ x_i ≤ budget) est un sac à dos
+continu : l'optimum du programme linéaire s'obtient exactement en servant les
+planchers, puis les demandes par priorité décroissante (tri + sommes cumulées),
+le reliquat étant réparti en stock de sécurité dans la limite des plafonds.
+"""
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.analytics_engine import SQLiteAnalytics, get_analytics
+from app.services.data_loader import get_dataset_version
+
+logger = logging.getLogger(__name__)
+
+ANNEES_ACTES = [2021, 2022, 2023, 2024]
+
+
+class AllocationImpossible(ValueError):
+    """Budget inférieur à la somme des planchers de couverture"""
+
+    def __init__(self, budget_minimum: float):
+        self.budget_minimum = budget_minimum
+        super().__init__(f"Budget insuffisant : {budget_minimum:,.0f} doses nécessaires pour la couverture minimale")
+
+
+def optimize_allocation(
+    demande: np.ndarray, priorite: np.ndarray, budget: float,
+    couverture_min: float = 0.8, gaspillage_max: float = 0.3
+) -> dict:
+    """
+    Allocation optimale (vectorisée, O(n log n)).
+    Retourne des tableaux alignés sur les zones : allocation, servis,
+    plus "reserve" (doses non allouées faute de capacité).
+    """
+    demande = np.maximum(np.asarray(demande, dtype=np.float64), 0.0)
+    priorite = np.asarray(priorite, dtype=np.float64)
+    plancher = couverture_min * demande
+    plafond = demande / (1 - gaspillage_max)
+
+    reste = budget - plancher.sum()
+    if reste < -1e-9 * max(budget, 1.0):
+        raise AllocationImpossible(plancher.sum())
+    allocation = plancher.copy()
+
+    # 1. Demande restante, par priorité décroissante (sac à dos continu)
+    ordre = np.argsort(-priorite, kind="stable")
+    besoins = (demande - plancher)[ordre]
+    cumul = np.cumsum(besoins)
+    servis = np.clip(reste - (cumul - besoins), 0.0, besoins)
+    allocation[ordre] += servis
+    reste -= servis.sum()
+
+    # 2. Reliquat : stock de sécurité proportionnel à la marge sous le plafond
+    marge = plafond - allocation
+    if reste > 0 and marge.sum() > 0:
+        ajout = marge * min(reste / marge.sum(), 1.0)
+        allocation += ajout
+        reste -= ajout.sum()
+
+    return {
+        "allocation": allocation,
+        "servis": np.minimum(allocation, demande),
+        "reserve": max(reste, 0.0),
+    }
+
+
+def project_demand(actes: np.ndarray, annees: np.ndarray, annee_cible: int) -> np.ndarray:
+    """Tendance linéaire (moindres carrés, vectorisée sur les zones) évaluée à `annee_cible`"""
+    t = annees - annees.mean()
+    moyenne = actes.mean(axis=1)
+    pente = (actes - moyenne[:, None]) @ t / (t @ t)
+    return np.maximum(moyenne + pente * (annee_cible - annees.mean()), 0.0)
+
+
+# ============================================
+# Données d'entrée (mises en cache par version du jeu de données)
+# ============================================
+
+def build_allocation_inputs(moteur: SQLiteAnalytics) -> Optional[pd.DataFrame]:
+    """Entrées de l'allocation lues par le moteur d'analyse (voir get_allocation_inputs)"""
+    actes = moteur.read_table("evolution_actes_region")
+    if actes is None:
+        return None
+
+    colonnes = [f"Actes_{annee}" for annee in ANNEES_ACTES]
+    df = actes[["region"] + colonnes].dropna().copy()
+    historique = df[colonnes].to_numpy(dtype=np.float64)
+    df["actes_historiques"] = historique[:, -1]
+    df["actes_projetes"] = project_demand(historique, np.array(ANNEES_ACTES, dtype=np.float64), ANNEES_ACTES[-1] + 1)
+
+    # Doses par acte : série des doses si disponible, sinon comparatif actes / doses
+    doses = moteur.read_table("evolution_doses_region")
+    comparatif = moteur.read_table("actes_doses_region")
+    if doses is not None:
+        ratio = doses.set_index("region")[f"Doses_{ANNEES_ACTES[-1]}"] / actes.set_index("region")[colonnes[-1]]
+    elif comparatif is not None:
+        comparatif = comparatif.set_index("region")
+        ratio = comparatif["doses_j07e1"] / comparatif["acte_vgp"]
+    else:
+        ratio = pd.Series(dtype=np.float64)
+    df["ratio_doses_actes"] = df["region"].map(ratio)
+
+    # Répartition par âge : part des 65 ans et plus dans les actes de la dernière année
+    ages = moteur.read_table("evolution_actes_age")
+    annee = ANNEES_ACTES[-1]
+    if ages is not None and f"{annee}_65_ans_et_plus" in ages.columns:
+        plus_65 = ages[f"{annee}_65_ans_et_plus"].astype(float)
+        total = plus_65 + ages[f"{annee}_moins_de_65_ans"].astype(float)
+        df["part_65_plus"] = df["region"].map(pd.Series((plus_65 / total).to_numpy(), index=ages["region"]))
+    else:
+        df["part_65_plus"] = np.nan
+
+    return df.drop(columns=colonnes).reset_index(drop=True)
+
+
+@lru_cache(maxsize=4)
+def _allocation_inputs(version: str) -> Optional[pd.DataFrame]:
+    return build_allocation_inputs(get_analytics())
+
+
+def get_allocation_inputs() -> Optional[pd.DataFrame]:
+    """
+    Une ligne par région : actes_historiques, actes_projetes,
+    ratio_doses_actes (historique), part_65_plus. None si les actes ne sont pas chargés.
+    """
+    return _allocation_inputs(get_dataset_version())
@@ -0,0 +1,435 @@
+"""
+Statistiques météo / grippe : corrélations de Pearson et de Spearman
+
+Les relevés (station × mois) sont rangés dans des cubes NumPy
+[variable, station, mois] ; pour chaque décalage, toutes les corrélations
+(par station, par année, globales) sont calculées en une passe vectorisée,
+les valeurs manquantes étant exclues par masque (paires complètes).
+
+Régression pauvreté / passages aux urgences (moindres carrés pondérés) avec
+intervalles de confiance bootstrap : les rééchantillonnages sont des poids
+multinomiaux (matrice rééchantillons × régions), ajustés par lots matriciels.
+
+Les résultats sont mis en cache par version du jeu de données.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import get_settings
+from app.services.analytics_engine import SQLiteAnalytics, get_analytics
+from app.services.data_loader import get_dataset_version
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+VARIABLES_METEO = ["TMM", "TNTXM", "TNSOL"]
+VARIABLES_GRIPPE = ["taux_grippe", "incidence_sg_hebdo"]
+MAX_DECALAGE = 12
+DEFAULT_DECALAGE = 3
+
+# Effectif minimal pour qu'une corrélation soit renvoyée
+MIN_OBSERVATIONS = 3
+
+
+# ============================================
+# Noyaux vectorisés (dernier axe = échantillon)
+# ============================================
+
+def sort_series(a: np.ndarray) -> tuple:
+    """
+    Tri le long du dernier axe, à réutiliser pour plusieurs masques :
+    (ordre, début / fin des groupes d'ex-aequo dans l'ordre trié)
+    """
+    order = np.argsort(a, axis=-1)  # NaN en fin de tri
+    s = np.take_along_axis(a, order, axis=-1)
+    debut_groupe = np.ones(a.shape, dtype=bool)
+    debut_groupe[..., 1:] = s[..., 1:] != s[..., :-1]
+    fin_groupe = np.ones(a.shape, dtype=bool)
+    fin_groupe[..., :-1] = debut_groupe[..., 1:]
+    return order, debut_groupe, fin_groupe
+
+
+def _flat_indices(order: np.ndarray, shape: tuple) -> np.ndarray:
+    """Indices à plat (dans un tableau de forme `shape`) d'un ordre par ligne diffusé"""
+    n = shape[-1]
+    lignes = np.arange(int(np.prod(shape[:-1])), dtype=np.int64).reshape(shape[:-1] + (1,)) * n
+    return (lignes + np.broadcast_to(order, shape)).ravel()
+
+
+def masked_ranks(tri: tuple, masque: np.ndarray) -> np.ndarray:
+    """
+    Rangs (1..n, ex-aequo moyennés) parmi les seuls éléments du masque,
+    à partir d'un tri `sort_series` (diffusable vers la forme du masque).
+    Un même tri sert ainsi à toutes les paires de variables et tous les décalages.
+    """
+    order, debut_groupe, fin_groupe = tri
+    shape = masque.shape
+    n = shape[-1]
+    indices = _flat_indices(order, shape)
+
+    valides = masque.ravel()[indices].reshape(shape)
+    cumul = np.cumsum(valides, axis=-1, dtype=np.int64)
+    # Le cumul est croissant : valeur au début (resp. à la fin) de chaque groupe
+    # d'ex-aequo propagée vers l'avant (resp. l'arrière)
+    avant = np.maximum.accumulate(np.where(debut_groupe, cumul - valides, 0), axis=-1)
+    jusqua = np.minimum.accumulate(np.where(fin_groupe, cumul, n)[..., ::-1], axis=-1)[..., ::-1]
+    rangs_tries = np.where(valides, (avant + 1 + jusqua) / 2, np.nan)
+
+    rangs = np.empty(masque.size)
+    rangs[indices] = rangs_tries.ravel()
+    return rangs.reshape(shape)
+
+
+def rank_last_axis(a: np.ndarray) -> np.ndarray:
+    """
+    Rangs (1..n, ex-aequo moyennés) le long du dernier axe ; les NaN restent NaN
+    """
+    return masked_ranks(sort_series(a), ~np.isnan(a))
+
+
+def pearson_last_axis(x: np.ndarray, y: np.ndarray, masque: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson le long du dernier axe sur les paires complètes (ou celles du masque).
+    Retourne (r, effectif) ; r = NaN si variance nulle ou effectif insuffisant.
+    """
+    if masque is None:
+        masque = ~(np.isnan(x) | np.isnan(y))
+    n = masque.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mx = np.where(masque, x, 0.0).sum(axis=-1) / n
+        my = np.where(masque, y, 0.0).sum(axis=-1) / n
+        dx = np.where(masque, x - mx[..., None], 0.0)
+        dy = np.where(masque, y - my[..., None], 0.0)
+        r = (dx * dy).sum(axis=-1) / np.sqrt((dx * dx).sum(axis=-1) * (dy * dy).sum(axis=-1))
+    r = np.clip(r, -1.0, 1.0)
+    r[n < MIN_OBSERVATIONS] = np.nan
+    return r, n
+
+
+def _standardize(a: np.ndarray, masque: np.ndarray) -> np.ndarray:
+    """Centre et norme à 1 chaque série (dernier axe) sur le masque ; 0 hors masque"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        moyenne = np.where(masque, a, 0.0).sum(axis=-1) / masque.sum(axis=-1)
+        centre = np.where(masque, a - moyenne[..., None], 0.0)
+        return centre / np.sqrt((centre * centre).sum(axis=-1))[..., None]
+
+
+def _pearson_common_mask(x: np.ndarray, y: np.ndarray, masque: np.ndarray) -> np.ndarray:
+    """Pearson de toutes les paires x (V, G, n) × y (W, G, n) sur un masque commun (G, n)"""
+    with np.errstate(invalid="ignore"):
+        r = np.einsum("vgn,wgn->vwg", _standardize(x, masque), _standardize(y, masque))
+    r = np.clip(r, -1.0, 1.0)
+    r[..., masque.sum(axis=-1) < MIN_OBSERVATIONS] = np.nan
+    return r
+
+
+def correlations(
+    x: np.ndarray, y: np.ndarray, tri_x: Optional[tuple] = None, tri_y: Optional[tuple] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (pearson, spearman, effectif) de toutes les paires de variables
+    x (V, G, n) × y (W, G, n), pour chaque groupe G, sur les paires complètes.
+    Résultats de forme (V, W, G). Les tris peuvent être fournis pour être réutilisés.
+    """
+    tri_x = tri_x if tri_x is not None else sort_series(x)
+    tri_y = tri_y if tri_y is not None else sort_series(y)
+    valides_x, valides_y = ~np.isnan(x), ~np.isnan(y)
+
+    if (valides_x == valides_x[:1]).all() and (valides_y == valides_y[:1]).all():
+        # Cas courant : mêmes valeurs manquantes pour toutes les variables, un seul
+        # masque par groupe → un rang par variable et un produit scalaire par paire
+        masque = valides_x[0] & valides_y[0]
+        pearson = _pearson_common_mask(x, y, masque)
+        spearman = _pearson_common_mask(
+            masked_ranks(tri_x, np.broadcast_to(masque, x.shape)),
+            masked_ranks(tri_y, np.broadcast_to(masque, y.shape)),
+            masque,
+        )
+        n = np.broadcast_to(masque.sum(axis=-1), pearson.shape).copy()
+        return pearson, spearman, n
+
+    # Masque propre à chaque paire (valeurs manquantes différentes selon la variable)
+    xb, yb = x[:, None], y[None]
+    masque = valides_x[:, None] & valides_y[None]
+    pearson, n = pearson_last_axis(xb, yb, masque)
+    rangs_x = masked_ranks(tuple(t[:, None] for t in tri_x), masque)
+    rangs_y = masked_ranks(tuple(t[None] for t in tri_y), masque)
+    spearman, _ = pearson_last_axis(rangs_x, rangs_y, masque)
+    return pearson, spearman, n
+
+
+# ============================================
+# Cubes station × mois
+# ============================================
+
+def build_cubes(df: pd.DataFrame):
+    """
+    Range les relevés dans des cubes [variable, station, mois] (moyenne si doublons).
+    Retourne (stations, annees, meteo[V, S, T], grippe[W, S, T]) avec T = 12 × années.
+    """
+    df = df.dropna(subset=["NOM_USUEL", "annees", "mois"])
+    df = df[df["mois"].between(1, 12)]
+    codes, stations = pd.factorize(df["NOM_USUEL"], sort=True)
+    annees_releves = df["annees"].to_numpy(dtype=np.int64)
+    annee_min = int(annees_releves.min())
+    annees = np.arange(annee_min, int(annees_releves.max()) + 1)
+
+    n_mois = len(annees) * 12
+    cellules = codes * n_mois + (annees_releves - annee_min) * 12 + df["mois"].to_numpy(dtype=np.int64) - 1
+    taille = len(stations) * n_mois
+
+    def cube(variables):
+        result = np.empty((len(variables), len(stations), n_mois))
+        for i, variable in enumerate(variables):
+            valeurs = pd.to_numeric(df[variable], errors="coerce").to_numpy(dtype=np.float64)
+            ok = ~np.isnan(valeurs)
+            sommes = np.bincount(cellules[ok], weights=valeurs[ok], minlength=taille)
+            effectifs = np.bincount(cellules[ok], minlength=taille)
+            with np.errstate(invalid="ignore"):
+                result[i] = (sommes / effectifs).reshape(len(stations), n_mois)
+        return result
+
+    return np.asarray(stations), annees, cube(VARIABLES_METEO), cube(VARIABLES_GRIPPE)
+
+
+def compute_correlations(meteo: np.ndarray, grippe: np.ndarray, n_annees: int, max_decalage: int) -> dict:
+    """
+    Corrélations météo (mois t) / grippe (mois t + décalage) pour chaque décalage.
+
+    Retourne des tableaux [décalage, variable météo, variable grippe, ...] :
+    "station" (..., S), "annee" (..., années), "global" (...) ; chacun
+    sous forme (pearson, spearman, effectif).
+    """
+    _, S, T = meteo.shape
+
+    # Regroupements : l'échantillon (dernier axe) est la série d'une station,
+    # les stations × 12 mois d'une année (du relevé météo), ou tout le cube
+    niveaux = {
+        "station": lambda a: a,
+        "annee": lambda a: a.reshape(*a.shape[:-2], S, n_annees, 12).swapaxes(-3, -2)
+                            .reshape(*a.shape[:-2], n_annees, S * 12),
+        "global": lambda a: a.reshape(*a.shape[:-2], 1, S * T),
+    }
+
+    # La météo n'est pas décalée : un seul tri par variable et par niveau
+    groupes_x = {niveau: regrouper(meteo) for niveau, regrouper in niveaux.items()}
+    tris_x = {niveau: sort_series(groupe) for niveau, groupe in groupes_x.items()}
+
+    resultats = {niveau: [] for niveau in niveaux}
+    for decalage in range(max_decalage + 1):
+        decale = np.full_like(grippe, np.nan)
+        decale[..., :T - decalage] = grippe[..., decalage:]
+        for niveau, regrouper in niveaux.items():
+            groupe_y = regrouper(decale)
+            resultats[niveau].append(correlations(
+                groupes_x[niveau], groupe_y, tris_x[niveau], sort_series(groupe_y)
+            ))
+
+    resultats = {
+        niveau: tuple(np.stack(mesure) for mesure in zip(*valeurs))
+        for niveau, valeurs in resultats.items()
+    }
+    resultats["global"] = tuple(mesure[..., 0] for mesure in resultats["global"])
+    return resultats
+
+
+def _to_frame(niveau: str, mesures: tuple, labels: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """Tableaux [décalage, météo, grippe(, groupe)] → lignes (format long)"""
+    pearson, spearman, n = mesures
+    indices = np.indices(pearson.shape).reshape(pearson.ndim, -1)
+    frame = pd.DataFrame({
+        "niveau": niveau,
+        "decalage_mois": indices[0],
+        "meteo": np.asarray(VARIABLES_METEO)[indices[1]],
+        "grippe": np.asarray(VARIABLES_GRIPPE)[indices[2]],
+        "station": labels[indices[3]] if niveau == "station" else None,
+        "annee": labels[indices[3]] if niveau == "annee" else None,
+        "pearson": pearson.ravel().round(4),
+        "spearman": spearman.ravel().round(4),
+        "n": n.ravel(),
+    })
+    return frame
+
+
+# ============================================
+# Cache par version du jeu de données
+# ============================================
+
+def load_meteo(moteur: Optional[SQLiteAnalytics] = None) -> pd.DataFrame:
+    """
+    Relevés mensuels station × mois (moyenne des doublons), agrégés par le
+    moteur d'analyse
+    """
+    moteur = moteur or get_analytics()
+    if not moteur.has_table("donnees_meteo"):
+        return pd.DataFrame(columns=["NOM_USUEL", "annees", "mois"] + VARIABLES_METEO + VARIABLES_GRIPPE)
+    moyennes = ", ".join(f'AVG("{v}") AS "{v}"' for v in VARIABLES_METEO + VARIABLES_GRIPPE)
+    return moteur.query(
+        f'SELECT "NOM_USUEL", "annees", "mois", {moyennes} FROM donnees_meteo '
+        f'GROUP BY "NOM_USUEL", "annees", "mois"'
+    )
+
+
+@lru_cache(maxsize=8)
+def _correlation_meteo_grippe(version: str, max_decalage: int) -> Optional[pd.DataFrame]:
+    df = load_meteo()
+    if df.empty:
+        return None
+
+    debut = time.perf_counter()
+    stations, annees, meteo, grippe = build_cubes(df)
+    resultats = compute_correlations(meteo, grippe, len(annees), max_decalage)
+    frame = pd.concat([
+        _to_frame("global", resultats["global"]),
+        _to_frame("annee", resultats["annee"], annees),
+        _to_frame("station", resultats["station"], stations),
+    ], ignore_index=True)
+    logger.info(
+        f"📈 Corrélations météo/grippe ({len(stations)} stations, {len(annees)} années, "
+        f"décalage ≤ {max_decalage} mois) en {(time.perf_counter() - debut) * 1e3:.0f} ms"
+    )
+    return frame
+
+
+def get_correlation_meteo_grippe(max_decalage: int = DEFAULT_DECALAGE) -> Optional[pd.DataFrame]:
+    """
+    Corrélations météo / grippe (format long : niveau, décalage, variables,
+    station / année, pearson, spearman, n). None si la table est vide.
+    """
+    return _correlation_meteo_grippe(get_dataset_version(), max_decalage)
+
+
+# ============================================
+# Régression pauvreté / passages aux urgences
+# ============================================
+
+TABLES_PAUVRETE_URGENCES = {
+    "complet": "tableau_pauvrete_urgences_population_complet",
+    "metropole": "tableau_pauvrete_urgences_metropole",
+    "domtom": "tableau_pauvrete_urgences_domtom",
+}
+# Colonnes des tables dynamiques (noms nettoyés par le data_loader)
+COLONNE_PAUVRETE = "taux_pauvrete_%"
+COLONNE_PASSAGES = "taux_passages_pour_100k_hab"
+COLONNE_POPULATION = "population_totale"
+
+DEFAULT_BOOTSTRAP = 10000
+BOOTSTRAP_SEED = 2024
+
+
+def weighted_least_squares(x: np.ndarray, y: np.ndarray, poids: np.ndarray) -> np.ndarray:
+    """
+    Droite y = a + b·x par moindres carrés pondérés, pour chaque ligne de poids.
+    poids (..., n) → (..., 3) : ordonnée à l'origine, pente, R² (pondéré).
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        total = poids.sum(axis=-1)
+        mx = (poids @ x) / total
+        my = (poids @ y) / total
+        dx = x - mx[..., None]
+        dy = y - my[..., None]
+        sxx = (poids * dx * dx).sum(axis=-1)
+        syy = (poids * dy * dy).sum(axis=-1)
+        sxy = (poids * dx * dy).sum(axis=-1)
+        pente = sxy / sxx
+        r2 = sxy * sxy / (sxx * syy)
+    return np.stack([my - pente * mx, pente, r2], axis=-1)
+
+
+def _bootstrap_chunk(args):
+    """Exécutée éventuellement dans un processus fils : un lot de rééchantillonnages"""
+    x, y, poids, n_resamples, seed = args
+    rng = np.random.default_rng(seed)
+    # Nombre de tirages de chaque observation dans chaque rééchantillon
+    tirages = rng.multinomial(len(x), np.full(len(x), 1 / len(x)), size=n_resamples)
+    return weighted_least_squares(x, y, tirages * poids)
+
+
+def bootstrap_regression(
+    x: np.ndarray, y: np.ndarray, poids: np.ndarray,
+    n_bootstrap: int = DEFAULT_BOOTSTRAP, workers: int = 1, seed: int = BOOTSTRAP_SEED
+) -> np.ndarray:
+    """
+    Coefficients (ordonnée, pente, R²) de `n_bootstrap` rééchantillonnages,
+    par lots répartis sur `workers` processus (graines indépendantes).
+    """
+    lots = np.array_split(np.arange(n_bootstrap), max(workers, 1))
+    graines = np.random.SeedSequence(seed).spawn(len(lots))
+    tasks = [(x, y, poids, len(lot), graine) for lot, graine in zip(lots, graines) if len(lot)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_bootstrap_chunk, tasks))
+    else:
+        results = [_bootstrap_chunk(task) for task in tasks]
+    return np.concatenate(results)
+
+
+def fit_regression(
+    x: np.ndarray, y: np.ndarray, poids: Optional[np.ndarray] = None,
+    n_bootstrap: int = DEFAULT_BOOTSTRAP, confiance: float = 0.95, workers: int = 1
+) -> dict:
+    """
+    Ajustement + intervalles de confiance bootstrap (percentiles).
+    Retourne {coefficient: {"estimation", "bas", "haut"}} pour
+    ordonnee_origine, pente et r2.
+    """
+    poids = np.ones(len(x)) if poids is None else poids
+    estimation = weighted_least_squares(x, y, poids)
+    echantillons = bootstrap_regression(x, y, poids, n_bootstrap, workers)
+
+    alpha = (1 - confiance) / 2
+    with np.errstate(invalid="ignore"):
+        bornes = np.nanpercentile(echantillons, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    return {
+        nom: {"estimation": estimation[i], "bas": bornes[0, i], "haut": bornes[1, i]}
+        for i, nom in enumerate(["ordonnee_origine", "pente", "r2"])
+    }
+
+
+def load_pauvrete_urgences(perimetre: str, moteur: Optional[SQLiteAnalytics] = None) -> Optional[pd.DataFrame]:
+    return (moteur or get_analytics()).read_table(TABLES_PAUVRETE_URGENCES[perimetre])
+
+
+@lru_cache(maxsize=32)
+def _regression_pauvrete_urgences(
+    version: str, perimetre: str, pondere: bool, n_bootstrap: int, confiance: float
+) -> Optional[Tuple[pd.DataFrame, dict]]:
+    df = load_pauvrete_urgences(perimetre)
+    if df is None:
+        return None
+
+    colonnes = [COLONNE_PAUVRETE, COLONNE_PASSAGES, COLONNE_POPULATION]
+    for colonne in colonnes:
+        df[colonne] = pd.to_numeric(df[colonne], errors="coerce")
+    df = df.dropna(subset=colonnes).reset_index(drop=True)
+    if len(df) < MIN_OBSERVATIONS:
+        return df, None
+
+    debut = time.perf_counter()
+    x = df[COLONNE_PAUVRETE].to_numpy(dtype=np.float64)
+    y = df[COLONNE_PASSAGES].to_numpy(dtype=np.float64)
+    poids = df[COLONNE_POPULATION].to_numpy(dtype=np.float64) if pondere else None
+    regression = fit_regression(x, y, poids, n_bootstrap, confiance, workers=settings.bootstrap_workers)
+    logger.info(
+        f"📉 Régression pauvreté/urgences ({perimetre}, {len(df)} régions, "
+        f"{n_bootstrap} rééchantillonnages) en {(time.perf_counter() - debut) * 1e3:.0f} ms"
+    )
+    return df, regression
+
+
+def get_regression_pauvrete_urgences(
+    perimetre: str = "complet", pondere: bool = False,
+    n_bootstrap: int = DEFAULT_BOOTSTRAP, confiance: float = 0.95
+) -> Optional[Tuple[pd.DataFrame, dict]]:
+    """
+    (régions utilisées, régression) ; régression None si moins de 3 régions
+    exploitables, résultat None si la table n'est pas chargée.
+    """
+    return _regression_pauvrete_urgences(get_dataset_version(), perimetre, pondere, n_bootstrap, round(confiance, 4))
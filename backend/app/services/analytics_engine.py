@@ -0,0 +1,154 @@
+"""
+Moteur des requêtes d'agrégation (lectures complètes de tables, GROUP BY)
+
+Par défaut, le pool SQLite en lecture seule. Avec ANALYTICS_URL=duckdb:// et le
+paquet optionnel duckdb, une base DuckDB en mémoire (colonnaire, vectorisée) est
+construite directement à partir des fichiers de données nettoyés (CSV / Parquet
+/ Arrow, mêmes noms de tables et de colonnes, régions canoniques) à chaque
+nouvelle version du jeu de données. Les routes de consultation ponctuelle
+restent servies par SQLite.
+
+Les requêtes doivent rester dans le SQL commun aux deux moteurs
+(identifiants entre guillemets doubles, agrégats standards).
+"""
+import logging
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pandas as pd
+import pyarrow.feather as feather
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+
+from app.config import get_settings
+from app.database import read_engine
+from app.services.data_loader import (
+    clean_column_name, find_data_files, get_dataset_version, table_column_names
+)
+from app.services.regions import normaliser_regions
+
+try:
+    import duckdb
+except ImportError:  # dépendance optionnelle (ANALYTICS_URL=duckdb://)
+    duckdb = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _selection(colonnes: Optional[Sequence[str]]) -> str:
+    return ", ".join(f'"{c}"' for c in colonnes) if colonnes else "*"
+
+
+class SQLiteAnalytics:
+    """Agrégations sur la base SQLite (pool en lecture seule)"""
+
+    nom = "sqlite"
+
+    def __init__(self, engine=read_engine):
+        self.engine = engine
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.engine).has_table(table)
+
+    def query(self, sql: str) -> pd.DataFrame:
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(sql), conn)
+
+    def read_table(self, table: str, colonnes: Optional[Sequence[str]] = None) -> Optional[pd.DataFrame]:
+        """Table complète (ou quelques colonnes) ; None si absente ou vide"""
+        if not self.has_table(table):
+            return None
+        df = self.query(f'SELECT {_selection(colonnes)} FROM "{table}"')
+        return df if not df.empty else None
+
+
+class DuckDBAnalytics(SQLiteAnalytics):
+    """
+    Base DuckDB en mémoire construite à partir des fichiers de données
+    (une connexion par appel, dérivée de la connexion principale : utilisable
+    depuis plusieurs threads)
+    """
+
+    nom = "duckdb"
+
+    def __init__(self, data_path: Path):
+        if duckdb is None:
+            raise RuntimeError("Le moteur DuckDB nécessite le paquet duckdb (pip install duckdb)")
+        self._con = duckdb.connect(":memory:")
+        self.tables = set()
+        for path in find_data_files(Path(data_path)):
+            table = clean_column_name(path.stem)
+            try:
+                self._load(path, table)
+                self.tables.add(table)
+            except Exception as e:
+                logger.error(f"❌ DuckDB : erreur avec {path.name}: {e}")
+
+    def _load(self, path: Path, table: str):
+        chemin = str(path).replace("'", "''")
+        if path.suffix == ".csv":
+            source = f"read_csv_auto('{chemin}', header=true)"
+        elif path.suffix == ".parquet":
+            source = f"read_parquet('{chemin}')"
+        else:
+            source = f"_source_{table}"
+            self._con.register(source, feather.read_table(str(path)))
+
+        colonnes = [ligne[0] for ligne in self._con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+        noms = table_column_names(table, colonnes)
+        selection = ", ".join(f'"{c}" AS "{n}"' for c, n in zip(colonnes, noms))
+        self._con.execute(f'CREATE OR REPLACE TABLE "{table}" AS SELECT {selection} FROM {source}')
+        if source.startswith("_source_"):
+            self._con.unregister(source)
+
+        # Noms de régions canoniques (comme le chargement SQLite)
+        if "region" in noms:
+            bruts = self._con.execute(f'SELECT DISTINCT region FROM "{table}" WHERE region IS NOT NULL').df()["region"]
+            correspondance = pd.DataFrame({"brut": bruts, "canonique": normaliser_regions(bruts)})
+            self._con.register("_regions", correspondance)
+            self._con.execute(
+                f'UPDATE "{table}" SET region = r.canonique FROM _regions r WHERE "{table}".region = r.brut'
+            )
+            self._con.unregister("_regions")
+
+    def has_table(self, table: str) -> bool:
+        return table in self.tables
+
+    def query(self, sql: str) -> pd.DataFrame:
+        return self._con.cursor().execute(sql).df()
+
+
+@lru_cache(maxsize=1)
+def _duckdb_analytics(version: str) -> Optional[DuckDBAnalytics]:
+    debut = time.perf_counter()
+    try:
+        moteur = DuckDBAnalytics(Path(settings.csv_data_path))
+    except RuntimeError as e:
+        logger.error(f"❌ {e} : agrégations servies par SQLite")
+        return None
+    logger.info(
+        f"🦆 Base DuckDB construite : {len(moteur.tables)} tables en "
+        f"{(time.perf_counter() - debut) * 1e3:.0f} ms (version {version})"
+    )
+    return moteur
+
+
+_sqlite_analytics = SQLiteAnalytics()
+# Une seule construction par version : les premières requêtes concurrentes
+# attendent la base en cours de construction au lieu d'en bâtir chacune une
+_verrou_duckdb = threading.Lock()
+
+
+def get_analytics() -> SQLiteAnalytics:
+    """Moteur des agrégations selon ANALYTICS_URL (DuckDB si configuré et disponible)"""
+    if settings.analytics_url and make_url(settings.analytics_url).get_backend_name() == "duckdb":
+        version = get_dataset_version()
+        with _verrou_duckdb:
+            moteur = _duckdb_analytics(version)
+        if moteur is not None:
+            return moteur
+    return _sqlite_analytics
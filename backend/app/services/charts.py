@@ -0,0 +1,325 @@
+"""
+Registre des graphiques Chart.js des routes thématiques
+
+Chaque graphique est décrit une seule fois, à l'import : type, titre, options
+(échelles, légende, ...) et séries (champ des lignes de data, libellé,
+couleurs). Options et styles sont figés et validés contre les modèles de
+réponse au démarrage ; par requête, seuls les libellés et les tableaux de
+valeurs sont construits, le reste est partagé entre les réponses.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.models.response_models import ChartJSDataset, ChartJSOptions
+
+# ============================================
+# Couleurs
+# ============================================
+
+COULEURS = {
+    "rouge": "255, 99, 132",
+    "bleu": "54, 162, 235",
+    "jaune": "255, 206, 86",
+    "vert": "75, 192, 192",
+    "orange": "255, 159, 64",
+    "violet": "153, 102, 255",
+    "gris": "201, 203, 207",
+}
+# Séries en nombre variable (stations, couples de variables), dans cet ordre
+PALETTE = tuple(f"rgba({COULEURS[c]}, 1)" for c in ("rouge", "bleu", "vert", "orange", "violet", "gris"))
+
+ANNEES = ("2021", "2022", "2023", "2024")
+_Y_DEPUIS_ZERO = {"y": {"beginAtZero": True}}
+
+
+def rgba(couleur: str, alpha: float) -> str:
+    return f"rgba({COULEURS[couleur]}, {alpha})"
+
+
+def palette(i: int) -> str:
+    return PALETTE[i % len(PALETTE)]
+
+
+class _Figee(dict):
+    """Dictionnaire en lecture seule (options partagées entre les requêtes)"""
+
+    def _lecture_seule(self, *args, **kwargs):
+        raise TypeError("Options de graphique figées : copier avant de modifier")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _lecture_seule
+
+
+def figer(valeur):
+    if isinstance(valeur, dict):
+        return _Figee({cle: figer(v) for cle, v in valeur.items()})
+    if isinstance(valeur, (list, tuple)):
+        return tuple(figer(v) for v in valeur)
+    return valeur
+
+
+# ============================================
+# Spécification d'un graphique
+# ============================================
+
+class Serie:
+    """Série d'un graphique : champ des lignes de data et style du dataset"""
+
+    def __init__(self, champ: Optional[str], label: str = "", **style):
+        self.champ = champ
+        self.style = figer({"label": label, **style})
+        ChartJSDataset(data=[], **self.style)
+
+
+class ChartSpec:
+    """
+    Graphique défini à l'import. `labels` : champ des lignes donnant les
+    libellés de l'axe (ou champs passés, dans l'ordre, à `libelle`) ;
+    `series` : nom → Serie.
+    `champs` liste les champs des lignes lus par render() : colonnes à
+    sélectionner quand le graphique est demandé (Projection.colonnes).
+    """
+
+    def __init__(
+        self, type: str, titre: str, labels: Union[str, Tuple[str, ...], None] = None,
+        series: Optional[Dict[str, Serie]] = None, champs: Optional[Sequence[str]] = None,
+        libelle: Optional[Callable[..., Any]] = None, **options
+    ):
+        self.type = type
+        # Champs des libellés, passés dans l'ordre à `libelle` (défaut : valeur du champ)
+        self.labels = (labels,) if isinstance(labels, str) else tuple(labels or ())
+        self.libelle = libelle
+        self.series = series or {}
+        plugins = {"title": {"display": True, "text": titre}, **options.pop("plugins", {})}
+        self.options = figer(ChartJSOptions(responsive=True, plugins=plugins, **options).model_dump(exclude_none=True))
+        if champs is None:
+            champs = list(self.labels) + [s.champ for s in self.series.values() if s.champ is not None]
+        self.champs = tuple(dict.fromkeys(champs))
+
+    def dataset(self, serie: str, valeurs: List[Any], **extra) -> dict:
+        """Dataset de la série `serie` (extra : libellé ou couleur propre à la requête)"""
+        return {**self.series[serie].style, **extra, "data": valeurs}
+
+    def render(
+        self, lignes: Sequence[dict] = (), labels: Optional[List[Any]] = None,
+        datasets: Optional[List[dict]] = None, titre: Optional[str] = None
+    ) -> dict:
+        """
+        Configuration Chart.js : par défaut un libellé et une valeur par série
+        pour chaque ligne ; `labels` / `datasets` pour les graphiques construits
+        autrement (une série par station, ...), `titre` pour un titre propre à
+        la requête.
+        """
+        if labels is None:
+            if self.libelle is None:
+                labels = [ligne[self.labels[0]] for ligne in lignes]
+            else:
+                labels = [self.libelle(*(ligne[c] for c in self.labels)) for ligne in lignes]
+        if datasets is None:
+            datasets = [
+                self.dataset(nom, [ligne[serie.champ] for ligne in lignes]) for nom, serie in self.series.items()
+            ]
+        return self._config(labels, datasets, titre)
+
+    def render_colonnes(self, colonnes: Dict[str, Sequence], titre: Optional[str] = None) -> dict:
+        """Comme render(), à partir des colonnes (champ → valeurs) au lieu des lignes"""
+        if self.libelle is None:
+            labels = list(colonnes[self.labels[0]])
+        else:
+            labels = list(map(self.libelle, *(colonnes[c] for c in self.labels)))
+        datasets = [self.dataset(nom, list(colonnes[serie.champ])) for nom, serie in self.series.items()]
+        return self._config(labels, datasets, titre)
+
+    def _config(self, labels: List[Any], datasets: List[dict], titre: Optional[str]) -> dict:
+        options = self.options
+        if titre is not None:
+            plugins = options["plugins"]
+            options = {**options, "plugins": {**plugins, "title": {**plugins["title"], "text": titre}}}
+        return {"type": self.type, "data": {"labels": labels, "datasets": datasets}, "options": options}
+
+
+class ChartSpecParAge(ChartSpec):
+    """Courbes 2021-2024, deux par région (champs <prefixe>_<année>_65_plus / _moins_65)"""
+
+    AGES = {"65_plus": "65 ans et plus", "moins_65": "Moins de 65 ans"}
+
+    def __init__(self, titre: str, prefixe: str):
+        super().__init__(
+            "line", titre,
+            series={
+                "65_plus": Serie(None, borderColor=rgba("rouge", 1), backgroundColor=rgba("rouge", 0.2), tension=0.4),
+                "moins_65": Serie(None, borderColor=rgba("bleu", 1), backgroundColor=rgba("bleu", 0.2), tension=0.4),
+            },
+            champs=["region"] + [f"{prefixe}_{annee}_{age}" for annee in ANNEES for age in self.AGES],
+            plugins={"legend": {"display": True}}, scales=_Y_DEPUIS_ZERO
+        )
+        self.prefixe = prefixe
+
+    def render(self, lignes: Sequence[dict] = (), **kwargs) -> dict:
+        datasets = [
+            self.dataset(
+                age, [ligne[f"{self.prefixe}_{annee}_{age}"] for annee in ANNEES],
+                label=f"{ligne['region']} - {libelle}"
+            )
+            for ligne in lignes for age, libelle in self.AGES.items()
+        ]
+        return super().render(labels=list(ANNEES), datasets=datasets, **kwargs)
+
+
+# ============================================
+# Graphiques des routes
+# ============================================
+
+_COULEURS_ANNEES = ("rouge", "bleu", "jaune", "vert")
+_LEGENDE_HAUT = {"legend": {"position": "top"}}
+
+
+def _par_annee(titre: str, prefixe: str) -> ChartSpec:
+    """Barres par région, une série par année (champs <prefixe>_<année>)"""
+    return ChartSpec(
+        "bar", titre, labels="region",
+        series={
+            annee: Serie(f"{prefixe}_{annee}", annee, backgroundColor=rgba(couleur, 0.5))
+            for annee, couleur in zip(ANNEES, _COULEURS_ANNEES)
+        },
+        scales=_Y_DEPUIS_ZERO
+    )
+
+
+# Géographie
+ACCESSIBILITE_PHARMACIES = ChartSpec(
+    "bar", "Accessibilité des pharmacies par code postal", labels="code_postal",
+    series={"ratio": Serie(
+        "ratio", "Population par pharmacie",
+        backgroundColor=rgba("bleu", 0.5), borderColor=rgba("bleu", 1), borderWidth=1
+    )},
+    indexAxis="y"
+)
+
+DESERTS_VACCINAUX = ChartSpec(
+    "bar", "Déserts vaccinaux", labels="nom",
+    series={"distance": Serie(
+        "distance_km", "Distance à la pharmacie la plus proche (km)",
+        backgroundColor=rgba("rouge", 0.5), borderColor=rgba("rouge", 1), borderWidth=1
+    )},
+    indexAxis="y"
+)
+
+PAUVRETE_URGENCES = ChartSpec(
+    "scatter", "Passages aux urgences pour grippe selon le taux de pauvreté", labels="region",
+    series={
+        "regions": Serie(None, "Régions", backgroundColor=rgba("bleu", 0.8)),
+        "regression": Serie(None, "Régression", borderColor=rgba("rouge", 1), showLine=True, fill=False),
+    },
+    champs=("region", "taux_pauvrete", "taux_passages_100k"),
+    scales={
+        "x": {"title": {"display": True, "text": "Taux de pauvreté (%)"}},
+        "y": {"title": {"display": True, "text": "Passages pour 100k habitants"}},
+    }
+)
+
+EVOLUTION_ACTES_AGE = ChartSpecParAge("Évolution des actes de vaccination par âge", "actes")
+EVOLUTION_DOSES_AGE = ChartSpecParAge("Évolution des doses de vaccination par âge", "doses")
+EVOLUTION_ACTES_REGION = _par_annee("Évolution des actes de vaccination par région (2021-2024)", "actes")
+EVOLUTION_DOSES_REGION = _par_annee("Évolution des doses de vaccination par région (2021-2024)", "doses")
+
+REPARTITION_LIEU_VACCINATION = ChartSpec(
+    "bar", "Répartition du lieu de vaccination par tranche d'âge", labels="tranche_age",
+    scales={"x": {"stacked": True}, "y": {"stacked": True, "beginAtZero": True}}
+)
+
+# Logistique
+ACTES_DOSES_REGION = ChartSpec(
+    "bar", "Actes vs Doses par région", labels="region",
+    series={
+        "actes": Serie(
+            "acte_vgp", "Actes de vaccination",
+            backgroundColor=rgba("bleu", 0.7), borderColor=rgba("bleu", 1), borderWidth=1
+        ),
+        "doses": Serie(
+            "doses_j07e1", "Doses distribuées",
+            backgroundColor=rgba("rouge", 0.7), borderColor=rgba("rouge", 1), borderWidth=1
+        ),
+    },
+    plugins=_LEGENDE_HAUT,
+    scales={"y": {"beginAtZero": True, "title": {"display": True, "text": "Nombre"}}}
+)
+
+NOMBRE_PHARMACIES_PERIODE = ChartSpec(
+    "line", "Évolution du nombre de pharmacies", labels="date",
+    series={"valeur": Serie(
+        "valeur", "Nombre de pharmacies",
+        borderColor=rgba("vert", 1), backgroundColor=rgba("vert", 0.2), tension=0.4, fill=True
+    )},
+    scales={"y": {"beginAtZero": True}, "x": {"type": "time", "time": {"unit": "day"}}}
+)
+
+ALLOCATION_DOSES = ChartSpec(
+    "bar", "Allocation des doses", labels="region",
+    series={
+        "actes": Serie(
+            "actes_projetes", "Actes projetés",
+            backgroundColor=rgba("bleu", 0.7), borderColor=rgba("bleu", 1), borderWidth=1
+        ),
+        "doses": Serie(
+            "doses_allouees", "Doses allouées",
+            backgroundColor=rgba("vert", 0.7), borderColor=rgba("vert", 1), borderWidth=1
+        ),
+    },
+    plugins=_LEGENDE_HAUT, scales=_Y_DEPUIS_ZERO
+)
+
+# Saisonnalité
+DONNEES_METEO = ChartSpec(
+    "line", "Corrélation Température / Grippe",
+    labels=("annees", "mois"), libelle=lambda annees, mois: f"{annees}-{mois:02d}",
+    series={
+        "tmm": Serie(
+            "TMM", "Température moyenne (TMM)",
+            borderColor=rgba("rouge", 1), backgroundColor=rgba("rouge", 0.2), yAxisID="y", tension=0.4
+        ),
+        "taux_grippe": Serie(
+            "taux_grippe", "Taux grippe",
+            borderColor=rgba("bleu", 1), backgroundColor=rgba("bleu", 0.2), yAxisID="y1", tension=0.4
+        ),
+        "incidence": Serie(
+            "incidence_sg_hebdo", "Incidence hebdo",
+            borderColor=rgba("vert", 1), backgroundColor=rgba("vert", 0.2), yAxisID="y1", tension=0.4
+        ),
+    },
+    interaction={"mode": "index", "intersect": False},
+    scales={
+        "y": {
+            "type": "linear", "display": True, "position": "left",
+            "title": {"display": True, "text": "Température (°C)"}
+        },
+        "y1": {
+            "type": "linear", "display": True, "position": "right",
+            "title": {"display": True, "text": "Taux grippe / Incidence"},
+            "grid": {"drawOnChartArea": False}
+        },
+    }
+)
+
+CORRELATION_METEO_GRIPPE = ChartSpec(
+    "line", "Corrélation température / grippe selon le décalage",
+    series={"couple": Serie(None, fill=False, tension=0.3)},
+    scales={"y": {"min": -1, "max": 1, "title": {"display": True, "text": "Pearson r"}}}
+)
+
+PREVISION_GRIPPE = ChartSpec(
+    "line", "Prévision de la grippe",
+    series={"station": Serie(None, fill=False, tension=0.3)}
+)
+
+# Cube OLAP
+CUBE = ChartSpec(
+    "bar", "Total national",
+    series={
+        "actes": Serie("actes", "Actes", backgroundColor=rgba("bleu", 0.7), borderWidth=1),
+        "doses": Serie("doses", "Doses", backgroundColor=rgba("orange", 0.7), borderWidth=1),
+    },
+    plugins=_LEGENDE_HAUT, scales=_Y_DEPUIS_ZERO
+)
+
+CHARTS: Dict[str, ChartSpec] = {
+    nom: spec for nom, spec in globals().items() if isinstance(spec, ChartSpec)
+}
@@ -0,0 +1,74 @@
+"""
+Encodages colonnaires de `data` (routes à nombreuses lignes)
+
+- colonnes : {"columns": [...], "values": {colonne: [...]}}, chaque nom de
+  champ une seule fois au lieu d'une fois par ligne ;
+- Arrow (application/vnd.apache.arrow.stream) : flux IPC d'une table typée
+  (types des colonnes SQL), question et graphique en métadonnées du schéma.
+
+Les colonnes sont extraites des tuples du curseur (zip), sans dictionnaire
+par ligne ; les colonnes numériques sont converties d'un bloc en tableaux
+Arrow.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import pyarrow as pa
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, String
+
+MEDIA_ARROW = "application/vnd.apache.arrow.stream"
+ENCODAGES = ("lignes", "colonnes", "arrow")
+
+# Type SQLAlchemy → type Arrow (premier correspondant ; inféré sinon)
+_TYPES_ARROW = (
+    (Boolean, pa.bool_()),
+    (Integer, pa.int64()),
+    (Float, pa.float64()),
+    (Numeric, pa.float64()),
+    (String, pa.string()),
+    (DateTime, pa.timestamp("us")),
+    (Date, pa.date32()),
+)
+
+
+def query_columns(query, lignes: Sequence[tuple]) -> Dict[str, tuple]:
+    """Colonnes (nom → valeurs) des résultats d'une requête ORM, dans l'ordre du SELECT"""
+    noms = [description["name"] for description in query.column_descriptions]
+    valeurs = list(zip(*lignes)) if lignes else [()] * len(noms)
+    return dict(zip(noms, valeurs))
+
+
+def arrow_type(type_sql) -> Optional[pa.DataType]:
+    """Type Arrow d'un type de colonne SQLAlchemy (None : à inférer des valeurs)"""
+    for classe, type_arrow in _TYPES_ARROW:
+        if isinstance(type_sql, classe):
+            return type_arrow
+    return None
+
+
+def arrow_types(query) -> Dict[str, pa.DataType]:
+    """Types Arrow des colonnes du SELECT d'une requête ORM"""
+    types = {}
+    for description in query.column_descriptions:
+        type_arrow = arrow_type(description["type"])
+        if type_arrow is not None:
+            types[description["name"]] = type_arrow
+    return types
+
+
+def arrow_stream(
+    colonnes: Dict[str, Sequence], types: Optional[Dict[str, pa.DataType]] = None,
+    metadonnees: Optional[Dict[str, str]] = None
+) -> bytes:
+    """Flux IPC Arrow (un seul lot) des colonnes"""
+    types = types or {}
+    table = pa.table({nom: pa.array(valeurs, type=types.get(nom)) for nom, valeurs in colonnes.items()})
+    if metadonnees:
+        table = table.replace_schema_metadata(metadonnees)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def columnar_json(colonnes: Dict[str, Sequence], champs: List[str]) -> dict:
+    return {"columns": champs, "values": {champ: colonnes[champ] for champ in champs}}
@@ -0,0 +1,130 @@
+"""
+Couverture vaccinale en pharmacie : détection des déserts vaccinaux
+
+Pour chaque centroïde de commune :
+- distance à la pharmacie vaccinante la plus proche
+- nombre de pharmacies et population (communes voisines) dans un rayon de X km
+
+Calcul par lot vectorisé sur l'index spatial en grille (une matrice de
+distances par cellule), réparti sur plusieurs processus si demandé.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.config import get_settings
+from app.services.pharmacies import file_signature, get_sites_index, refresh_sites
+from app.services.spatial import GridIndex
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DEFAULT_RAYON_KM = 10
+
+
+def get_communes() -> Optional[pd.DataFrame]:
+    """
+    Centroïdes des communes (code_insee, nom, code_postal, dep_code, region,
+    population, latitude, longitude). None si le fichier n'a pas été généré.
+    Relu si le fichier change (cache indexé par sa signature).
+    """
+    return _communes(file_signature(settings.communes_path))
+
+
+@lru_cache(maxsize=1)
+def _communes(signature: Optional[str]) -> Optional[pd.DataFrame]:
+    path = Path(settings.communes_path)
+    if signature is None:
+        logger.warning(f"⚠️  Fichier des communes introuvable: {path}")
+        logger.info("💡 Ajoutez communes-france-2025.csv dans data/dataset puis lancez le pipeline (étape communes)")
+        return None
+    return pd.read_parquet(path)
+
+
+def _coverage_chunk(args):
+    """Exécutée éventuellement dans un processus fils : un lot de communes"""
+    sites_index, communes_index, population, lat, lon, rayon_km = args
+    _, distances = sites_index.batch_nearest(lat, lon)
+    pharmacies, _ = sites_index.batch_within(lat, lon, rayon_km)
+    _, population_rayon = communes_index.batch_within(lat, lon, rayon_km, weights=population)
+    return distances, pharmacies, population_rayon
+
+
+def compute_coverage(
+    communes: pd.DataFrame, sites_index: GridIndex, rayon_km: float = 10.0, workers: int = 1
+) -> pd.DataFrame:
+    """
+    Calcule les indicateurs de couverture pour toutes les communes.
+
+    Colonnes ajoutées : distance_km, pharmacies_rayon, population_rayon,
+    habitants_par_pharmacie, score (population × distance, en habitants·km)
+    """
+    lat = communes["latitude"].to_numpy(dtype=np.float64)
+    lon = communes["longitude"].to_numpy(dtype=np.float64)
+    population = communes["population"].to_numpy(dtype=np.float64)
+    communes_index = GridIndex(lat, lon)
+
+    # Lots spatialement cohérents (tri par cellule) pour limiter les candidats
+    order = np.argsort(communes_index.cell_keys(lat, lon), kind="stable")
+    chunks = np.array_split(order, max(workers, 1))
+    tasks = [(sites_index, communes_index, population, lat[c], lon[c], rayon_km) for c in chunks]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_coverage_chunk, tasks))
+    else:
+        results = [_coverage_chunk(task) for task in tasks]
+
+    distances = np.empty(len(communes))
+    pharmacies = np.empty(len(communes), dtype=np.int64)
+    population_rayon = np.empty(len(communes))
+    for chunk, (d, p, pop) in zip(chunks, results):
+        distances[chunk], pharmacies[chunk], population_rayon[chunk] = d, p, pop
+
+    result = communes.copy()
+    result["distance_km"] = distances.round(2)
+    result["pharmacies_rayon"] = pharmacies
+    result["population_rayon"] = population_rayon.astype(np.int64)
+    with np.errstate(divide="ignore"):
+        result["habitants_par_pharmacie"] = np.where(
+            pharmacies > 0, np.round(population_rayon / np.maximum(pharmacies, 1), 1), np.nan
+        )
+    result["score"] = (population * distances).round(0)
+    return result
+
+
+def get_coverage(rayon_km: int = DEFAULT_RAYON_KM) -> Optional[pd.DataFrame]:
+    """
+    Couverture nationale pour un rayon donné, calculée une fois par processus
+    et par version des fichiers : recalculée si communes.parquet change ou si
+    les sites sont rechargés (nouvel index spatial)
+    """
+    refresh_sites()
+    return _coverage(rayon_km, file_signature(settings.communes_path), get_sites_index())
+
+
+@lru_cache(maxsize=8)
+def _coverage(rayon_km: int, signature_communes: Optional[str], sites_index: Optional[GridIndex]) -> Optional[pd.DataFrame]:
+    communes = _communes(signature_communes)
+    if communes is None or sites_index is None:
+        return None
+
+    debut = time.perf_counter()
+    result = compute_coverage(communes, sites_index, rayon_km, workers=settings.coverage_workers)
+    logger.info(
+        f"🏜️  Couverture calculée ({len(result)} communes, rayon {rayon_km} km) "
+        f"en {time.perf_counter() - debut:.2f}s"
+    )
+    return result
+
+
+def reload_coverage():
+    """Oublie communes et couvertures (appelée par pharmacies.reload_sites)"""
+    _communes.cache_clear()
+    _coverage.cache_clear()
@@ -0,0 +1,176 @@
+"""
+Cube OLAP région × année × tranche d'âge × variable (actes, doses)
+
+Construit au chargement des données à partir des tables evolution_actes_age et
+evolution_doses_age. Tous les agrégats (les 2³ combinaisons de dimensions :
+national, région, année, région × âge, ...) sont précalculés dans des tableaux
+NumPy compacts, chacun à partir du plus petit parent déjà calculé.
+
+Une requête (slice, dice, drill-down, roll-up) choisit l'agrégat qui contient
+exactement les dimensions demandées et filtrées, puis l'indexe : le coût est
+proportionnel à la taille du résultat (× valeurs retenues pour un dice sur une
+dimension agrégée).
+"""
+import logging
+import re
+from functools import lru_cache
+from itertools import combinations, product
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.services.analytics_engine import get_analytics
+from app.services.data_loader import get_dataset_version
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("region", "annee", "age")
+# Variable du cube → table source (colonnes "<année>_<tranche d'âge>")
+TABLES_CUBE = {
+    "actes": "evolution_actes_age",
+    "doses": "evolution_doses_age",
+}
+COLONNE_AGE = re.compile(r"^(\d{4})_(.+)$")
+
+
+class RequeteCubeInvalide(ValueError):
+    """Dimension ou valeur de filtre inconnue"""
+
+
+class Cube:
+    """
+    Agrégats précalculés : cuboides[dimensions] est un tableau d'entiers de forme
+    (*tailles des dimensions, nb variables), dimensions dans l'ordre de DIMENSIONS.
+    """
+
+    def __init__(self, valeurs: np.ndarray, membres: Dict[str, list], variables: List[str]):
+        self.membres = membres
+        self.variables = variables
+        self._positions = {
+            dim: {membre: i for i, membre in enumerate(liste)} for dim, liste in membres.items()
+        }
+        self._positions["variable"] = {v: i for i, v in enumerate(variables)}
+
+        self.cuboides = {DIMENSIONS: valeurs}
+        # Du plus fin au plus agrégé : chaque agrégat est la somme d'un seul axe
+        # de son plus petit parent
+        for taille in range(len(DIMENSIONS) - 1, -1, -1):
+            for dims in combinations(DIMENSIONS, taille):
+                parents = [
+                    tuple(d for d in DIMENSIONS if d in dims or d == retire)
+                    for retire in DIMENSIONS if retire not in dims
+                ]
+                parent = min(parents, key=lambda p: self.cuboides[p].size)
+                axe = next(i for i, d in enumerate(parent) if d not in dims)
+                self.cuboides[dims] = self.cuboides[parent].sum(axis=axe)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.cuboides.values())
+
+    def _indices(self, dim: str, valeurs: Optional[Sequence]) -> np.ndarray:
+        positions = self._positions[dim]
+        if valeurs is None:
+            return np.arange(len(positions))
+        if len(valeurs) == 0:
+            raise RequeteCubeInvalide(f"Sélection vide pour {dim}")
+        inconnues = [v for v in valeurs if v not in positions]
+        if inconnues:
+            raise RequeteCubeInvalide(
+                f"Valeur(s) inconnue(s) pour {dim}: {', '.join(map(str, inconnues))}. "
+                f"Valeurs possibles: {', '.join(map(str, positions))}"
+            )
+        return np.array([positions[v] for v in dict.fromkeys(valeurs)], dtype=np.int64)
+
+    def query(
+        self, dimensions: Sequence[str] = (), filtres: Optional[Dict[str, Sequence]] = None,
+        variables: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        """
+        Une ligne par combinaison des `dimensions` (ordre de DIMENSIONS), avec une
+        valeur par variable. `filtres` : dimension → membres retenus (slice si un
+        seul, dice sinon) ; une dimension filtrée mais non demandée est sommée
+        sur les membres retenus.
+        """
+        filtres = {d: v for d, v in (filtres or {}).items() if v is not None}
+        for dim in list(dimensions) + list(filtres):
+            if dim not in DIMENSIONS:
+                raise RequeteCubeInvalide(f"Dimension inconnue: {dim}. Dimensions: {', '.join(DIMENSIONS)}")
+
+        indices = {dim: self._indices(dim, valeurs) for dim, valeurs in filtres.items()}
+        # Dimensions filtrées sur une partie de leurs membres : à garder dans l'agrégat
+        partielles = {d for d, idx in indices.items() if len(idx) < len(self.membres[d])}
+        dims = tuple(d for d in DIMENSIONS if d in dimensions or d in partielles)
+        colonnes = self._indices("variable", variables)
+
+        selection = self.cuboides[dims][np.ix_(
+            *[indices.get(d, np.arange(len(self.membres[d]))) for d in dims], colonnes
+        )]
+        somme = tuple(i for i, d in enumerate(dims) if d not in dimensions)
+        if somme:
+            selection = selection.sum(axis=somme)
+
+        gardees = [d for d in dims if d in dimensions]
+        membres = [
+            [self.membres[d][i] for i in indices.get(d, range(len(self.membres[d])))] for d in gardees
+        ]
+        noms = [self.variables[i] for i in colonnes]
+        lignes = selection.reshape(-1, len(noms)).tolist()
+        return [
+            {**dict(zip(gardees, cle)), **dict(zip(noms, valeurs))}
+            for cle, valeurs in zip(product(*membres), lignes)
+        ]
+
+
+def build_cube(tables: Dict[str, pd.DataFrame]) -> Optional[Cube]:
+    """
+    tables : variable → DataFrame (region, colonnes "<année>_<tranche d'âge>").
+    Les cellules absentes comptent pour 0.
+    """
+    tables = {v: df.dropna(subset=["region"]) for v, df in tables.items() if df is not None}
+    if not tables:
+        return None
+
+    # Colonnes (année, âge) et membres de chaque dimension, dans l'ordre de lecture
+    cellules = {}
+    for df in tables.values():
+        for col in df.columns:
+            match = COLONNE_AGE.match(str(col))
+            if match:
+                cellules[col] = (int(match.group(1)), match.group(2))
+    regions = list(dict.fromkeys(r for df in tables.values() for r in df["region"]))
+    annees = sorted({a for a, _ in cellules.values()})
+    ages = list(dict.fromkeys(g for _, g in cellules.values()))
+    variables = list(tables)
+
+    valeurs = np.zeros((len(regions), len(annees), len(ages), len(variables)), dtype=np.int64)
+    pos_region = {r: i for i, r in enumerate(regions)}
+    for v, (variable, df) in enumerate(tables.items()):
+        lignes = df["region"].map(pos_region).to_numpy()
+        for col, (annee, age) in cellules.items():
+            if col in df.columns:
+                colonne = pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy()
+                # Régions en double : sommées
+                np.add.at(valeurs[:, annees.index(annee), ages.index(age), v], lignes, np.rint(colonne).astype(np.int64))
+
+    return Cube(valeurs, {"region": regions, "annee": annees, "age": ages}, variables)
+
+
+@lru_cache(maxsize=2)
+def _cube(version: str) -> Optional[Cube]:
+    moteur = get_analytics()
+    cube = build_cube({variable: moteur.read_table(table) for variable, table in TABLES_CUBE.items()})
+    if cube is None:
+        logger.warning("⚠️  Tables par âge absentes : cube OLAP non construit")
+    else:
+        logger.info(
+            f"🧊 Cube OLAP construit : {len(cube.cuboides)} agrégats, "
+            f"{cube.nbytes / 1024:.1f} Ko (version {version})"
+        )
+    return cube
+
+
+def get_cube() -> Optional[Cube]:
+    """Cube de la version courante des données (None si les tables par âge manquent)"""
+    return _cube(get_dataset_version())
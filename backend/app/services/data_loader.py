@@ -1,9 +1,11 @@
+import hashlib
 import pandas as pd
 from pathlib import Path
 from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Boolean
 from sqlalchemy.types import TypeDecorator
 from app.config import get_settings
 from app.database import SessionLocal, Base, engine
+from app.services.regions import normaliser_regions
 from datetime import datetime
 import logging
 
@@ -21,6 +23,138 @@ PANDAS_TO_SQL_TYPES = {
     'datetime64[ns]': DateTime,
 }
 
+# Formats de fichiers acceptés, par ordre de préférence pour une même table :
+# Parquet / Arrow conservent les types et se lisent sans parsing texte
+COLUMNAR_EXTENSIONS = ['.parquet', '.arrow', '.feather']
+DATA_EXTENSIONS = COLUMNAR_EXTENSIONS + ['.csv']
+
+def find_data_files(folder: Path) -> list:
+    """
+    Liste les fichiers de données du dossier, un seul par table :
+    si `table.parquet` et `table.csv` coexistent, le Parquet est retenu
+    """
+    by_table = {}
+    for path in sorted(folder.iterdir()):
+        if path.suffix not in DATA_EXTENSIONS:
+            continue
+        current = by_table.get(path.stem)
+        if current is None or DATA_EXTENSIONS.index(path.suffix) < DATA_EXTENSIONS.index(current.suffix):
+            by_table[path.stem] = path
+    return list(by_table.values())
+
+# Version du jeu de données chargé (hash des fichiers) : clé des caches d'analyse
+_dataset_version = None
+
+# Progression du chargement, par table (lue par /health/ready et les routes de données)
+_chargement = {"etat": "en_attente", "debut": None, "fin": None, "tables": {}}
+
+def _set_table_progress(table_name: str, **champs):
+    progression = _chargement["tables"].setdefault(
+        table_name, {"etat": "en_attente", "lignes": 0, "total": None, "prete": False}
+    )
+    progression.update(champs)
+    if progression["etat"] == "pret":
+        progression["prete"] = True
+
+def get_load_progress() -> dict:
+    """
+    État du chargement : etat (en_attente, en_cours, termine), debut, fin et,
+    pour chaque table, etat / lignes insérées / total / prete
+    """
+    return {**_chargement, "tables": {t: dict(p) for t, p in _chargement["tables"].items()}}
+
+def mark_load_waiting():
+    """Un autre worker charge les données : en attente de sa version publiée"""
+    _chargement.update(etat="attente")
+
+def scan_dataset_version() -> str:
+    """
+    Version des fichiers actuellement présents (recalculée, sans la publier)
+    """
+    csv_path = Path(settings.csv_data_path)
+    return compute_dataset_version(find_data_files(csv_path)) if csv_path.exists() else "vide"
+
+def adopt_dataset_version(version: str):
+    """
+    Adopte une version chargée en base par un autre worker (même fichiers) :
+    les tables sont prêtes sans rechargement
+    """
+    global _dataset_version
+    csv_path = Path(settings.csv_data_path)
+    for path in (find_data_files(csv_path) if csv_path.exists() else []):
+        _set_table_progress(clean_column_name(path.stem), etat="pret")
+    now = datetime.now().astimezone().isoformat(timespec="seconds")
+    _chargement.update(etat="termine", debut=_chargement["debut"] or now, fin=now)
+    _dataset_version = version
+    logger.info(f"🏷️  Version {version} déjà chargée par un autre worker")
+
+def is_table_ready(table_name: str) -> bool:
+    """
+    True si la table a été chargée au moins une fois (un rechargement ne la rend
+    pas indisponible), ou si elle ne fait pas partie des fichiers à charger.
+    False tant que le chargement initial n'a pas recensé les fichiers.
+    """
+    progression = _chargement["tables"].get(table_name)
+    if progression is None:
+        return _chargement["fin"] is not None
+    return progression["prete"] or progression["etat"] == "erreur"
+
+def compute_dataset_version(files: list) -> str:
+    """
+    Hash (court) du nom et du contenu des fichiers de données
+    """
+    h = hashlib.sha256()
+    for path in sorted(files):
+        h.update(path.name.encode())
+        with open(path, 'rb') as f:
+            for bloc in iter(lambda: f.read(1 << 20), b''):
+                h.update(bloc)
+    return h.hexdigest()[:12]
+
+def get_dataset_version() -> str:
+    """
+    Version du jeu de données chargé (calculée à la volée si le chargement n'a pas eu lieu)
+    """
+    global _dataset_version
+    if _dataset_version is None:
+        csv_path = Path(settings.csv_data_path)
+        _dataset_version = compute_dataset_version(find_data_files(csv_path)) if csv_path.exists() else "vide"
+    return _dataset_version
+
+def read_data_file(path: Path, nrows: int = None, **csv_kwargs) -> pd.DataFrame:
+    """
+    Lit un fichier de données selon son extension (Parquet, Arrow IPC ou CSV)
+    """
+    if path.suffix == '.parquet':
+        df = pd.read_parquet(path)
+    elif path.suffix in ('.arrow', '.feather'):
+        df = pd.read_feather(path)
+    else:
+        return pd.read_csv(path, nrows=nrows, **csv_kwargs)
+    return df.head(nrows) if nrows is not None else df
+
+# Liste des tables qui ont déjà un modèle défini dans schemas.py
+PREDEFINED_TABLES = [
+    "accessibilite_pharmacies",
+    "evolution_actes_age",
+    "evolution_doses_age",
+    "evolution_actes_region",
+    "evolution_doses_region",
+    "repartition_lieu_vaccination",
+    "actes_doses_region",
+    "nombre_pharmacies_periode",
+    "donnees_meteo"
+]
+
+def table_column_names(table_name: str, columns) -> list:
+    """
+    Noms des colonnes d'un fichier tels qu'ils sont stockés en base :
+    noms du CSV (tables prédéfinies) ou noms nettoyés (tables dynamiques)
+    """
+    if table_name in PREDEFINED_TABLES:
+        return [str(c).replace('\ufeff', '').replace('(', '_').replace(')', '') for c in columns]
+    return [clean_column_name(str(c)) for c in columns]
+
 def clean_column_name(col_name: str) -> str:
     """
     Nettoie les noms de colonnes pour SQLite
@@ -69,7 +203,7 @@ def create_table_from_csv(csv_path: Path, table_name: str = None):
     
     # Lire le CSV avec pandas
     try:
-        df = pd.read_csv(csv_path, nrows=100)  # Lire seulement 100 lignes pour l'analyse
+        df = read_data_file(csv_path, nrows=100)  # Lire seulement 100 lignes pour l'analyse
     except Exception as e:
         logger.error(f"❌ Erreur lecture CSV {csv_path.name}: {e}")
         return None
@@ -84,6 +218,15 @@ def create_table_from_csv(csv_path: Path, table_name: str = None):
     logger.info(f"📊 Table: {table_name}")
     logger.info(f"📋 Colonnes détectées: {', '.join(df.columns)}")
     
+    # Rechargement dans le même processus : réutiliser le modèle s'il est inchangé
+    existing = Base.metadata.tables.get(table_name)
+    if existing is not None:
+        if [c.name for c in existing.columns if c.name not in ('id', 'created_at')] == list(df.columns):
+            for mapper in Base.registry.mappers:
+                if mapper.local_table is existing:
+                    return mapper.class_, df.columns.tolist()
+        Base.metadata.remove(existing)
+    
     # Créer la classe dynamiquement
     attrs = {
         '__tablename__': table_name,
@@ -109,8 +252,10 @@ def load_csv_to_table(csv_path: Path, table_class, columns: list):
     
     # Lire tout le CSV
     try:
-        df = pd.read_csv(csv_path)
+        df = read_data_file(csv_path)
         df.columns = [clean_column_name(col) for col in df.columns]
+        if 'region' in df.columns:
+            df['region'] = normaliser_regions(df['region'])
     except Exception as e:
         logger.error(f"❌ Erreur lecture complète du CSV: {e}")
         return 0
@@ -121,6 +266,9 @@ def load_csv_to_table(csv_path: Path, table_class, columns: list):
     # Insérer dans la DB
     db = SessionLocal()
     try:
+        # Vider la table d'abord (rechargement)
+        db.query(table_class).delete()
+        
         # Insertion par batch de 1000
         batch_size = 1000
         total_inserted = 0
@@ -130,6 +278,7 @@ def load_csv_to_table(csv_path: Path, table_class, columns: list):
             db.bulk_insert_mappings(table_class, batch)
             db.commit()
             total_inserted += len(batch)
+            _set_table_progress(table_class.__tablename__, lignes=total_inserted, total=len(records))
             logger.info(f"   ✅ {total_inserted}/{len(records)} lignes insérées")
         
         logger.info(f"✅ {total_inserted} lignes chargées avec succès")
@@ -144,56 +293,59 @@ def load_csv_to_table(csv_path: Path, table_class, columns: list):
 
 def load_all_csv_data():
     """
-    Charge tous les fichiers CSV du dossier data/raw
+    Charge tous les fichiers CSV (ou Parquet / Arrow, prioritaires) du dossier data/raw
     """
+    _chargement.update(etat="en_cours", debut=datetime.now().astimezone().isoformat(timespec="seconds"))
+    try:
+        _load_all_csv_data()
+    finally:
+        _chargement.update(etat="termine", fin=datetime.now().astimezone().isoformat(timespec="seconds"))
+
+def _load_all_csv_data():
     csv_path = Path(settings.csv_data_path)
     
     if not csv_path.exists():
         logger.warning(f"⚠️  Dossier CSV non trouvé: {csv_path}")
-        logger.info(f"💡 Créez le dossier et ajoutez vos fichiers CSV")
+        logger.info("💡 Créez le dossier et ajoutez vos fichiers CSV")
         csv_path.mkdir(parents=True, exist_ok=True)
         return
     
-    logger.info(f"📁 Recherche de CSV dans: {csv_path}")
-    csv_files = list(csv_path.glob("*.csv"))
+    logger.info(f"📁 Recherche de CSV / Parquet dans: {csv_path}")
+    csv_files = find_data_files(csv_path)
     
     if not csv_files:
         logger.warning("⚠️  Aucun fichier CSV trouvé")
         logger.info(f"💡 Ajoutez vos fichiers CSV dans {csv_path}")
         return
     
-    logger.info(f"📊 {len(csv_files)} fichiers CSV trouvés")
-    
-    # Liste des tables qui ont déjà un modèle défini dans schemas.py
-    PREDEFINED_TABLES = [
-        "accessibilite_pharmacies",
-        "evolution_actes_age",
-        "evolution_doses_age",
-        "evolution_actes_region",
-        "evolution_doses_region",
-        "repartition_lieu_vaccination",
-        "actes_doses_region",
-        "nombre_pharmacies_periode",
-        "donnees_meteo"
-    ]
+    logger.info(f"📊 {len(csv_files)} fichiers de données trouvés")
+    
+    global _dataset_version
+    version = compute_dataset_version(csv_files)
+    logger.info(f"🏷️  Version du jeu de données: {version}")
     
     total_loaded = 0
+    for csv_file in csv_files:
+        _set_table_progress(clean_column_name(csv_file.stem), etat="en_attente", lignes=0, total=None)
     
     for csv_file in csv_files:
         try:
             table_name = clean_column_name(csv_file.stem)
+            _set_table_progress(table_name, etat="en_cours")
             
             # Si la table a déjà un modèle défini, utiliser le chargement direct
             if table_name in PREDEFINED_TABLES:
                 logger.info(f"📄 Chargement du CSV prédéfini: {csv_file.name} → {table_name}")
                 rows_loaded = load_predefined_csv(csv_file, table_name)
                 total_loaded += rows_loaded
+                _set_table_progress(table_name, etat="pret" if rows_loaded else "erreur")
                 logger.info(f"✅ {csv_file.name} → {rows_loaded} lignes chargées")
             else:
                 # Sinon, créer la table dynamiquement (pour les CSV non prévus)
                 logger.info(f"📄 Analyse du fichier: {csv_file.name}")
                 result = create_table_from_csv(csv_file)
                 if result is None:
+                    _set_table_progress(table_name, etat="erreur")
                     continue
                     
                 table_class, columns = result
@@ -204,14 +356,19 @@ def load_all_csv_data():
                 # Charger les données
                 rows_loaded = load_csv_to_table(csv_file, table_class, columns)
                 total_loaded += rows_loaded
+                _set_table_progress(table_name, etat="pret" if rows_loaded else "erreur")
                 
                 logger.info(f"✅ {csv_file.name} → Table '{table_class.__tablename__}' créée et remplie")
             
         except Exception as e:
+            _set_table_progress(clean_column_name(csv_file.stem), etat="erreur")
             logger.error(f"❌ Erreur avec {csv_file.name}: {e}")
             continue
     
 
+    # Publiée seulement une fois les tables remplies : les caches d'analyse
+    # ne sont jamais calculés sous la nouvelle version avec des tables partielles
+    _dataset_version = version
     logger.info(f"🎉 Chargement terminé ! {total_loaded} lignes totales chargées")
 
 def load_predefined_csv(csv_path: Path, table_name: str):
@@ -240,11 +397,17 @@ def load_predefined_csv(csv_path: Path, table_name: str):
         return 0
     
     # Lire le CSV SANS modifier les noms de colonnes
+    # (Parquet / Arrow : types conservés, pas de détection du séparateur)
     try:
-        df = pd.read_csv(csv_path, sep=None, engine='python')
-        df.columns = df.columns.str.replace('\ufeff', '', regex=False)
-        df.columns = df.columns.str.replace('(', '_', regex=False)
-        df.columns = df.columns.str.replace(')', '', regex=False)
+        if csv_path.suffix in COLUMNAR_EXTENSIONS:
+            df = read_data_file(csv_path)
+        else:
+            df = pd.read_csv(csv_path, sep=None, engine='python')
+        df.columns = table_column_names(table_name, df.columns)
+        
+        # Noms de régions canoniques pour aligner les jointures entre tables
+        if 'region' in df.columns:
+            df['region'] = normaliser_regions(df['region'])
 
     except Exception as e:
         logger.error(f"❌ Erreur lecture du CSV: {e}")
@@ -314,6 +477,7 @@ def load_predefined_csv(csv_path: Path, table_name: str):
             db.add_all(objects_to_insert)
             db.commit()
             total_inserted += len(objects_to_insert)
+            _set_table_progress(table_name, lignes=total_inserted, total=len(records))
             logger.info(f"   ✅ {total_inserted}/{len(records)} lignes insérées")
         
         logger.info(f"✅ {total_inserted} lignes chargées avec succès dans {table_name}")
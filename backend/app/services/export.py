@@ -0,0 +1,289 @@
+"""
+Export des tables en CSV / Parquet par flux (/api/export/{table}.csv|.parquet)
+
+Mémoire constante quelle que soit la taille de la table :
+- tables SQL : curseur côté serveur (yield_per), lignes lues par paquets de
+  settings.export_chunk_rows, chaque paquet converti en record batch Arrow ;
+  les tables créées dynamiquement depuis les fichiers de données (sans modèle
+  déclaré) sont exportées d'après leur définition réfléchie en base ;
+- sites des pharmacies : tranches sans copie du fichier Arrow mappé en
+  mémoire (pharmacies.sites_batches), jamais de lecture complète.
+Chaque record batch est encodé (CSVWriter ou un row group Parquet) dans un
+tampon vidé aussitôt vers la réponse : rien n'est accumulé entre deux paquets.
+La taille finale n'étant pas connue d'avance, la réponse est envoyée en
+Transfer-Encoding: chunked (pas de Content-Length).
+
+L'en-tête Server-Timing part avant le premier paquet : il ne compte pas les
+requêtes SQL du flux, journalisées avec la durée de l'export à sa fin.
+"""
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy import MetaData, String, Table, literal_column, select, type_coerce
+from sqlalchemy.exc import NoSuchTableError
+
+from app.config import get_settings
+from app.database import Base, read_engine
+from app.models.schemas import (
+    AccessibilitePharmacies, ActesDosesRegion, DonneesMeteo, EvolutionActesAge,
+    EvolutionActesRegion, EvolutionDosesAge, EvolutionDosesRegion,
+    NombrePharmaciesPeriode, RepartitionLieuVaccination,
+)
+from app.services.columnar import arrow_type
+from app.services.data_loader import get_dataset_version, get_load_progress
+from app.services.pharmacies import get_sites_table, sites_batches
+from app.services.profiling import current_profile
+from app.services.regions import normaliser_region
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+FORMATS_EXPORT = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Colonnes techniques non exportées
+COLONNES_EXCLUES = ("id", "created_at")
+
+# Table Arrow des sites de vaccination en pharmacie (hors base SQL)
+TABLE_SITES = "pharmacies_sites"
+
+
+# ============================================
+# Tables SQL exportables et leurs filtres
+# ============================================
+
+class TableExport:
+    """
+    Table SQL exportable : colonnes (noms des attributs d'un modèle, comme les
+    champs des routes JSON, ou noms des colonnes d'une Table réfléchie) et
+    filtres acceptés (nom → clause SQL). Tri par `tri`, sinon par clé primaire.
+    """
+
+    def __init__(self, modele, filtres: Dict[str, Callable[[Any], Any]], tri=None):
+        mapper = getattr(modele, "__mapper__", None)
+        if mapper is not None:
+            colonnes = {attribut.key: attribut.columns[0] for attribut in mapper.column_attrs}
+            table = mapper.local_table
+        else:
+            colonnes = {colonne.name: colonne for colonne in modele.columns}
+            table = modele
+        self.nom = table.name
+        self.filtres = filtres
+        self.tri = [tri] if tri is not None else list(table.primary_key.columns) or [literal_column("rowid")]
+        self.colonnes = {nom: colonne for nom, colonne in colonnes.items() if nom not in COLONNES_EXCLUES}
+        self.schema = pa.schema([
+            pa.field(nom, arrow_type(colonne.type) or pa.string())
+            for nom, colonne in self.colonnes.items()
+        ])
+
+    def statement(self, filtres: Dict[str, Any]):
+        """SELECT filtré (ValueError si un filtre ne s'applique pas à la table)"""
+        inconnus = [nom for nom in filtres if nom not in self.filtres]
+        if inconnus:
+            raise ValueError(
+                f"Filtre(s) non applicable(s) à {self.nom}: {', '.join(inconnus)} "
+                f"(filtres: {', '.join(self.filtres) or 'aucun'})"
+            )
+        stmt = select(*[colonne.label(nom) for nom, colonne in self.colonnes.items()])
+        for nom, valeur in filtres.items():
+            stmt = stmt.where(self.filtres[nom](valeur))
+        return stmt.order_by(*self.tri)
+
+
+def _filtre_region(colonne):
+    return lambda region: colonne == normaliser_region(region)
+
+
+_DATE_PHARMACIES = type_coerce(NombrePharmaciesPeriode.date, String)
+
+# Mêmes filtres que les routes JSON correspondantes
+EXPORTS: Dict[str, TableExport] = {
+    "accessibilite_pharmacies": TableExport(AccessibilitePharmacies, {
+        "code_postal": lambda code: AccessibilitePharmacies.code_postal == code,
+    }),
+    "evolution_actes_age": TableExport(EvolutionActesAge, {"region": _filtre_region(EvolutionActesAge.region)}),
+    "evolution_doses_age": TableExport(EvolutionDosesAge, {"region": _filtre_region(EvolutionDosesAge.region)}),
+    "evolution_actes_region": TableExport(EvolutionActesRegion, {"region": _filtre_region(EvolutionActesRegion.region)}),
+    "evolution_doses_region": TableExport(EvolutionDosesRegion, {"region": _filtre_region(EvolutionDosesRegion.region)}),
+    "repartition_lieu_vaccination": TableExport(RepartitionLieuVaccination, {
+        "type_lieu": lambda type_lieu: RepartitionLieuVaccination.type_lieu_vaccination == type_lieu,
+        "tranche_age": lambda tranche: RepartitionLieuVaccination.tranche_age == tranche,
+    }),
+    "actes_doses_region": TableExport(ActesDosesRegion, {"region": _filtre_region(ActesDosesRegion.region)}),
+    "nombre_pharmacies_periode": TableExport(NombrePharmaciesPeriode, {
+        "date_debut": lambda date: _DATE_PHARMACIES >= date,
+        "date_fin": lambda date: _DATE_PHARMACIES <= date,
+        "variable_pharmacie": lambda variable: NombrePharmaciesPeriode.variable_pharmacie == variable,
+    }, tri=NombrePharmaciesPeriode.date.asc()),
+    "donnees_meteo": TableExport(DonneesMeteo, {
+        "nom_usuel": lambda nom: DonneesMeteo.NOM_USUEL.like(f"%{nom}%"),
+        "annee": lambda annee: DonneesMeteo.annees == annee,
+        "mois": lambda mois: DonneesMeteo.mois == mois,
+    }),
+}
+
+FILTRES_SITES = ("code_postal", "sans_rendez_vous")
+
+
+def _tables_chargees() -> List[str]:
+    """Tables créées à partir des fichiers de données (déclarées ou dynamiques)"""
+    return list(get_load_progress()["tables"])
+
+
+def export_tables() -> List[str]:
+    """Noms des tables exportables : tables déclarées, tables dynamiques chargées et sites"""
+    return list(dict.fromkeys([*EXPORTS, *_tables_chargees(), TABLE_SITES]))
+
+
+@lru_cache(maxsize=32)
+def _export_reflechi(table: str, version: str) -> Optional[TableExport]:
+    """
+    Export d'une table dynamique, d'après le modèle créé au chargement dans ce
+    processus, sinon la définition réfléchie en base (chargée par un autre
+    worker). Clé sur la version du jeu de données : un rechargement peut
+    changer ses colonnes. Seul filtre : la région, si la table en a une.
+    """
+    definition = Base.metadata.tables.get(table)
+    if definition is None:
+        try:
+            definition = Table(table, MetaData(), autoload_with=read_engine)
+        except NoSuchTableError:
+            return None
+    filtres = {}
+    if "region" in definition.c:
+        filtres["region"] = _filtre_region(definition.c.region)
+    return TableExport(definition, filtres)
+
+
+def get_export(table: str) -> Optional[TableExport]:
+    """Export d'une table SQL (None si la table n'est pas exportable ou pas encore en base)"""
+    if table in EXPORTS:
+        return EXPORTS[table]
+    if table not in _tables_chargees():
+        return None
+    return _export_reflechi(table, get_dataset_version())
+
+
+# ============================================
+# Sources : record batches de taille fixe
+# ============================================
+
+def sql_batches(export: TableExport, stmt, taille: int) -> Iterator[pa.RecordBatch]:
+    """
+    Record batches d'au plus `taille` lignes lus par curseur côté serveur
+    (connexion de lecture propre au flux, rendue au pool à la fin ou à
+    l'abandon du client ; Core sans ORM : pas d'objet par ligne)
+    """
+    with read_engine.connect() as conn:
+        resultat = conn.execute(stmt.execution_options(yield_per=taille))
+        for lignes in resultat.partitions():
+            colonnes = list(zip(*lignes))
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(valeurs, type=champ.type) for valeurs, champ in zip(colonnes, export.schema)],
+                schema=export.schema
+            )
+
+
+def sites_schema(format: str) -> pa.Schema:
+    """Schéma exporté des sites (les horaires structurés n'ont pas d'équivalent CSV)"""
+    schema = get_sites_table().schema
+    if format == "csv":
+        schema = schema.remove(schema.get_field_index("horaires"))
+    return schema.remove_metadata()
+
+
+def sites_export_batches(schema: pa.Schema, filtres: Dict[str, Any], taille: int) -> Iterator[pa.RecordBatch]:
+    """Tranches filtrées de la table des sites (ValueError si un filtre ne s'y applique pas)"""
+    inconnus = [nom for nom in filtres if nom not in FILTRES_SITES]
+    if inconnus:
+        raise ValueError(
+            f"Filtre(s) non applicable(s) à {TABLE_SITES}: {', '.join(inconnus)} (filtres: {', '.join(FILTRES_SITES)})"
+        )
+
+    def tranches():
+        for tranche in sites_batches(taille):
+            masque = None
+            if "code_postal" in filtres:
+                masque = pc.equal(tranche.column("code_postal"), filtres["code_postal"].zfill(5))
+            if "sans_rendez_vous" in filtres:
+                condition = pc.equal(tranche.column("sans_rendez_vous"), int(filtres["sans_rendez_vous"]))
+                masque = condition if masque is None else pc.and_(masque, condition)
+            if masque is not None:
+                tranche = tranche.filter(masque)
+            yield tranche.select(schema.names)
+    return tranches()
+
+
+# ============================================
+# Encodage par flux
+# ============================================
+
+class _Tampon:
+    """Fichier en écriture seule dont le contenu est récupéré (et oublié) après chaque paquet"""
+
+    def __init__(self):
+        self.morceaux: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, donnees) -> int:
+        donnees = bytes(donnees)
+        self.morceaux.append(donnees)
+        self.position += len(donnees)
+        return len(donnees)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vider(self) -> bytes:
+        donnees = b"".join(self.morceaux)
+        self.morceaux.clear()
+        return donnees
+
+
+def encode_stream(batches: Iterator[pa.RecordBatch], schema: pa.Schema, format: str) -> Iterator[bytes]:
+    """Octets CSV ou Parquet produits au fil des batches"""
+    tampon = _Tampon()
+    sink = pa.PythonFile(tampon, mode="w")
+    if format == "csv":
+        writer = pa_csv.CSVWriter(sink, schema)
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression="snappy")  # un row group par batch
+    lignes = 0
+    debut = time.perf_counter()
+    try:
+        for batch in batches:
+            if batch.num_rows:
+                writer.write_batch(batch)
+                lignes += batch.num_rows
+            donnees = tampon.vider()
+            if donnees:
+                yield donnees
+    except Exception as e:
+        # En-têtes déjà envoyés : le client reçoit un fichier tronqué
+        logger.error(f"❌ Export interrompu après {lignes} lignes: {e}")
+        raise
+    writer.close()
+    # En-tête CSV d'une table vide, pied de page Parquet
+    donnees = tampon.vider()
+    if donnees:
+        yield donnees
+    # Mesures du flux, absentes de l'en-tête Server-Timing déjà envoyé
+    profil = current_profile()
+    sql = f", SQL {profil.duree_sql * 1e3:.1f} ms ({profil.requetes_sql} requêtes)" if profil is not None else ""
+    logger.info(f"📤 Export {format}: {lignes} lignes en {(time.perf_counter() - debut) * 1e3:.1f} ms{sql}")
+
@@ -0,0 +1,221 @@
+"""
+Prévision saisonnière de la grippe (donnees_meteo)
+
+Modèle par station et par cible (taux_grippe, incidence_sg_hebdo) :
+
+    y_t = saison[mois(t)] + gamma · anomalie_TMM_t + phi · y_(t-1) + e_t
+
+où anomalie_TMM = TMM - normale mensuelle de la station. Pour prévoir, l'anomalie
+de température décroît selon son propre AR(1) (coefficient rho) et la variance
+d'erreur cumule sigma² · phi^(2k).
+
+Les modèles sont ajustés en tâche de fond après chaque chargement des données
+(une résolution batchée pour toutes les stations), et seuls leurs paramètres
+compacts sont persistés dans la table modeles_prevision : une requête de
+prévision se limite à lire une ligne et à dérouler la récurrence.
+"""
+import json
+import logging
+import time
+import warnings
+from statistics import NormalDist
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import func
+
+from app.database import SessionLocal, ReadSessionLocal
+from app.models.schemas import ModelePrevision
+from app.services.analytics import VARIABLES_GRIPPE, build_cubes, load_meteo
+from app.services.data_loader import get_dataset_version
+
+logger = logging.getLogger(__name__)
+
+# Série moyenne de toutes les stations
+STATION_ENSEMBLE = "ensemble"
+MAX_HORIZON = 24
+# Observations minimales (mois complets) pour ajuster un modèle
+MIN_OBSERVATIONS = 24
+
+
+# ============================================
+# Ajustement (tâche de fond)
+# ============================================
+
+def fit_seasonal_models(temperature: np.ndarray, cible: np.ndarray) -> List[Optional[dict]]:
+    """
+    Ajuste un modèle par ligne : temperature, cible (S, T) avec T = 12 × années
+    (janvier de la première année en colonne 0). Résolution batchée des
+    équations normales pour toutes les séries.
+    Retourne, pour chaque série, les paramètres compacts (None si trop peu de données).
+    """
+    S, T = cible.shape
+    mois = np.arange(T) % 12
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # mois sans aucun relevé
+        normales = np.stack([np.nanmean(temperature[:, mois == m], axis=1) for m in range(12)], axis=1)
+    anomalies = temperature - normales[:, mois]
+
+    # Lignes t = 1..T-1 : [12 indicatrices de mois, anomalie_t, y_(t-1)] → y_t
+    X = np.zeros((S, T - 1, 14))
+    X[:, np.arange(T - 1), mois[1:]] = 1.0
+    X[..., 12] = anomalies[:, 1:]
+    X[..., 13] = cible[:, :-1]
+    y = cible[:, 1:]
+    valides = ~(np.isnan(X).any(axis=-1) | np.isnan(y))
+    X = np.where(valides[..., None], X, 0.0)
+    y = np.where(valides, y, 0.0)
+
+    # pinv : robuste aux mois jamais observés ou aux séries constantes
+    beta = np.einsum("skl,sl->sk", np.linalg.pinv(np.einsum("stk,stl->skl", X, X)), np.einsum("stk,st->sk", X, y))
+    residus = np.where(valides, y - np.einsum("stk,sk->st", X, beta), 0.0)
+    n = valides.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma = np.sqrt((residus ** 2).sum(axis=1) / np.maximum(n - 14, 1))
+        # Persistance des anomalies de température (AR(1))
+        a0, a1 = anomalies[:, :-1], anomalies[:, 1:]
+        paires = ~(np.isnan(a0) | np.isnan(a1))
+        rho = np.clip(
+            np.where(paires, a0 * a1, 0).sum(axis=1) / np.where(paires, a0 * a0, 0).sum(axis=1), -1.0, 1.0
+        )
+
+    modeles = []
+    for s in range(S):
+        observes = np.flatnonzero(~np.isnan(cible[s]))
+        if n[s] < MIN_OBSERVATIONS or len(observes) == 0:
+            modeles.append(None)
+            continue
+        dernier = observes[-1]
+        anomalie = anomalies[s, dernier]
+        modeles.append({
+            "saison": np.round(beta[s, :12], 6).tolist(),
+            "gamma": round(float(beta[s, 12]), 6),
+            "phi": round(float(beta[s, 13]), 6),
+            "rho": 0.0 if np.isnan(rho[s]) else round(float(rho[s]), 6),
+            "sigma": round(float(sigma[s]), 6),
+            "derniere_valeur": float(cible[s, dernier]),
+            "derniere_anomalie": 0.0 if np.isnan(anomalie) else round(float(anomalie), 4),
+            "dernier_mois": int(dernier),
+            "n": int(n[s]),
+        })
+    return modeles
+
+
+def fit_forecast_models(force: bool = False) -> int:
+    """
+    Ajuste et persiste les modèles de toutes les stations (et de leur moyenne)
+    pour la version courante des données. Ne fait rien si cette version est
+    déjà ajustée, sauf `force`. Retourne le nombre de modèles écrits.
+    """
+    version = get_dataset_version()
+    db = SessionLocal()
+    try:
+        if not force and db.query(ModelePrevision).filter(ModelePrevision.version == version).first():
+            logger.info(f"🔮 Modèles de prévision déjà ajustés (version {version})")
+            return 0
+
+        df = load_meteo()
+        if df.empty:
+            logger.warning("⚠️  Pas de données météo : aucun modèle de prévision ajusté")
+            return 0
+
+        debut = time.perf_counter()
+        stations, annees, meteo, grippe = build_cubes(df)
+        # Série « ensemble » : moyenne des stations pour chaque mois
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)  # mois sans aucun relevé
+            meteo = np.concatenate([meteo, np.nanmean(meteo, axis=1, keepdims=True)], axis=1)
+            grippe = np.concatenate([grippe, np.nanmean(grippe, axis=1, keepdims=True)], axis=1)
+        stations = list(stations) + [STATION_ENSEMBLE]
+        temperature = meteo[0]  # TMM
+
+        lignes = []
+        for i, cible in enumerate(VARIABLES_GRIPPE):
+            for station, modele in zip(stations, fit_seasonal_models(temperature, grippe[i])):
+                if modele is None:
+                    continue
+                modele["premiere_annee"] = int(annees[0])
+                lignes.append(ModelePrevision(
+                    station=station, cible=cible, version=version,
+                    parametres=json.dumps(modele, separators=(",", ":"))
+                ))
+
+        db.query(ModelePrevision).delete()
+        db.add_all(lignes)
+        db.commit()
+        logger.info(
+            f"🔮 {len(lignes)} modèles de prévision ajustés (version {version}) "
+            f"en {(time.perf_counter() - debut) * 1e3:.0f} ms"
+        )
+        return len(lignes)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Erreur lors de l'ajustement des modèles de prévision: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+# ============================================
+# Évaluation (requêtes)
+# ============================================
+
+def forecast(modele: dict, horizon: int, confiance: float = 0.95) -> List[dict]:
+    """
+    Déroule la récurrence sur `horizon` mois après le dernier mois observé.
+    Retourne [{"mois": "AAAA-MM", "prevision", "bas", "haut"}] (bornes ≥ 0).
+    """
+    z = NormalDist().inv_cdf(0.5 + confiance / 2)
+    saison, gamma, phi = modele["saison"], modele["gamma"], modele["phi"]
+    rho, sigma = modele["rho"], modele["sigma"]
+
+    valeur, anomalie = modele["derniere_valeur"], modele["derniere_anomalie"]
+    variance, facteur = 0.0, 1.0
+    t = modele["dernier_mois"]
+    resultats = []
+    for _ in range(horizon):
+        t += 1
+        anomalie *= rho
+        valeur = saison[t % 12] + gamma * anomalie + phi * valeur
+        variance += sigma ** 2 * facteur
+        facteur *= phi ** 2
+        ecart = z * variance ** 0.5
+        resultats.append({
+            "mois": f"{modele['premiere_annee'] + t // 12}-{t % 12 + 1:02d}",
+            "prevision": round(max(valeur, 0.0), 6),
+            "bas": round(max(valeur - ecart, 0.0), 6),
+            "haut": round(max(valeur + ecart, 0.0), 6),
+        })
+    return resultats
+
+
+def get_forecast_models(cible: str, station: Optional[str] = None, version: Optional[str] = None) -> List[ModelePrevision]:
+    """
+    Modèles persistés pour une cible (une station, ou toutes hors « ensemble »),
+    ajustés sur la version `version` des données (défaut : version courante)
+    """
+    version = version or get_dataset_version()
+    db = ReadSessionLocal()
+    try:
+        query = db.query(ModelePrevision).filter(
+            ModelePrevision.cible == cible, ModelePrevision.version == version
+        )
+        if station:
+            query = query.filter(func.upper(ModelePrevision.station) == station.upper())
+        else:
+            query = query.filter(ModelePrevision.station != STATION_ENSEMBLE)
+        return query.order_by(ModelePrevision.station).all()
+    finally:
+        db.close()
+
+
+def forecast_models_ready(version: Optional[str] = None) -> bool:
+    """True si des modèles ont été ajustés sur la version `version` (défaut : courante)"""
+    db = ReadSessionLocal()
+    try:
+        return db.query(ModelePrevision.id).filter(
+            ModelePrevision.version == (version or get_dataset_version())
+        ).first() is not None
+    finally:
+        db.close()
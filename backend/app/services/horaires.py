@@ -0,0 +1,111 @@
+"""
+Modalités d'accueil des pharmacies (colonne HTML Modalites_accueil)
+
+Le HTML est analysé une seule fois, à la conversion du fichier des sites :
+- accès : sans rendez-vous (1), avec rendez-vous (0), inconnu (-1)
+- horaires : tableau int16 (7 jours × MAX_PLAGES × [ouverture, fermeture])
+  en minutes depuis minuit, -1 pour une plage absente
+
+Au démarrage, un index par créneau de 15 minutes (bitmap de sites) permet de
+répondre à « ouvert à l'instant T » sans relire les horaires de chaque site.
+"""
+import html
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+
+JOURS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+MAX_PLAGES = 3
+SLOT_MINUTES = 15
+SLOTS_PAR_JOUR = 24 * 60 // SLOT_MINUTES
+
+_ACCES = re.compile(r"Acc[eè]s\s*:\s*</strong>\s*([^<]*)", re.IGNORECASE)
+_JOUR = re.compile(r"<li>\s*([A-Za-zéû]+)\s*:\s*([^<]*)</li>", re.IGNORECASE)
+_PLAGE = re.compile(r"(\d{1,2})h(\d{2})\s*-\s*(\d{1,2})h(\d{2})")
+
+
+def parse_modalites(modalites: Optional[str]) -> Tuple[int, np.ndarray]:
+    """
+    Analyse le HTML des modalités d'accueil.
+    Retourne (sans_rendez_vous, horaires[7, MAX_PLAGES, 2]).
+    """
+    horaires = np.full((7, MAX_PLAGES, 2), -1, dtype=np.int16)
+    if not modalites or not isinstance(modalites, str):
+        return -1, horaires
+    modalites = html.unescape(modalites)
+
+    sans_rdv = -1
+    acces = _ACCES.search(modalites)
+    if acces:
+        texte = acces.group(1).lower()
+        sans_rdv = 1 if "sans" in texte else 0 if "avec" in texte else -1
+
+    for jour, plages in _JOUR.findall(modalites):
+        jour = jour.lower()
+        if jour not in JOURS:
+            continue
+        for i, (h1, m1, h2, m2) in enumerate(_PLAGE.findall(plages)[:MAX_PLAGES]):
+            horaires[JOURS.index(jour), i] = (int(h1) * 60 + int(m1), int(h2) * 60 + int(m2))
+    return sans_rdv, horaires
+
+
+def parse_modalites_column(values) -> Tuple[np.ndarray, np.ndarray]:
+    """Analyse toute une colonne : (sans_rdv[n] int8, horaires[n, 7, MAX_PLAGES, 2] int16)"""
+    n = len(values)
+    sans_rdv = np.empty(n, dtype=np.int8)
+    horaires = np.empty((n, 7, MAX_PLAGES, 2), dtype=np.int16)
+    for i, value in enumerate(values):
+        sans_rdv[i], horaires[i] = parse_modalites(value)
+    return sans_rdv, horaires
+
+
+class HorairesIndex:
+    """
+    Index des horaires d'ouverture : pour chaque créneau de 15 minutes de la
+    semaine, bitmap (compressé) des sites ouverts à un moment du créneau.
+    La vérification exacte à la minute ne porte que sur ces candidats.
+    """
+
+    def __init__(self, horaires: np.ndarray, sans_rdv: np.ndarray):
+        self.horaires = horaires
+        self.n_sites = len(horaires)
+        self.sans_rdv_ids = np.flatnonzero(sans_rdv == 1)
+
+        ouvertures = horaires[..., 0].astype(np.int32)
+        fermetures = horaires[..., 1].astype(np.int32)
+        valides = (ouvertures >= 0) & (fermetures > ouvertures)
+
+        slot_debut = np.arange(SLOTS_PAR_JOUR) * SLOT_MINUTES
+        slot_fin = slot_debut + SLOT_MINUTES
+        self.bitmap = np.zeros((7, SLOTS_PAR_JOUR, (self.n_sites + 7) // 8), dtype=np.uint8)
+        for jour in range(7):
+            ouvert = np.zeros((SLOTS_PAR_JOUR, self.n_sites), dtype=bool)
+            for plage in range(horaires.shape[2]):
+                o, f, v = ouvertures[:, jour, plage], fermetures[:, jour, plage], valides[:, jour, plage]
+                # Site ouvert pendant une partie du créneau [debut, fin)
+                ouvert |= v & (o[None, :] < slot_fin[:, None]) & (f[None, :] > slot_debut[:, None])
+            self.bitmap[jour] = np.packbits(ouvert, axis=1)
+
+    def ouverts_a(self, jour: int, minute: int) -> np.ndarray:
+        """Indices des sites ouverts le `jour` (0 = lundi) à `minute` (depuis minuit)"""
+        slot = np.unpackbits(self.bitmap[jour, minute // SLOT_MINUTES], count=self.n_sites)
+        candidats = np.flatnonzero(slot)
+        plages = self.horaires[candidats, jour].astype(np.int32)
+        ouvert = ((plages[..., 0] <= minute) & (minute < plages[..., 1])).any(axis=1)
+        return candidats[ouvert]
+
+    def sans_rendez_vous(self) -> np.ndarray:
+        """Indices des sites vaccinant sans rendez-vous"""
+        return self.sans_rdv_ids
+
+
+def format_horaires(horaires: np.ndarray) -> dict:
+    """{"lundi": ["08:30-20:30", ...], ...} pour l'affichage"""
+    result = {}
+    for jour, plages in zip(JOURS, horaires):
+        result[jour] = [
+            f"{o // 60:02d}:{o % 60:02d}-{f // 60:02d}:{f % 60:02d}"
+            for o, f in plages.tolist() if o >= 0
+        ]
+    return result
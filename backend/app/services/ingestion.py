@@ -0,0 +1,157 @@
+"""
+Ingestion coordonnée entre workers (uvicorn --workers / gunicorn -w N)
+
+Chaque worker exécute le démarrage, mais un seul charge les données : le
+verrou est la ligne unique de la table etat_ingestion (propriétaire + fin de
+bail, pris par un UPDATE conditionnel atomique, bail renouvelé pendant le
+chargement et repris s'il expire). À la fin du chargement, le détenteur publie
+la version du jeu de données dans la même ligne ; les autres workers attendent
+cette version et l'adoptent sans rien recharger. Le coût du démarrage ne
+dépend donc pas du nombre de workers, et un redémarrage avec les mêmes
+fichiers ne recharge rien.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.config import get_settings
+from app.database import Base, SessionLocal, engine
+from app.models.schemas import EtatIngestion
+from app.services.data_loader import (
+    load_all_csv_data, get_dataset_version, scan_dataset_version,
+    adopt_dataset_version, mark_load_waiting
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+INSTANCE = f"{socket.gethostname()}:{os.getpid()}"
+ETAT_ID = 1
+
+
+def create_tables():
+    """create_all tolérant aux créations concurrentes par d'autres workers"""
+    for tentative in range(5):
+        try:
+            Base.metadata.create_all(bind=engine)
+            return
+        except OperationalError:
+            if tentative == 4:
+                raise
+            time.sleep(0.2)
+
+
+def published_version() -> Optional[str]:
+    db = SessionLocal()
+    try:
+        etat = db.get(EtatIngestion, ETAT_ID)
+        return etat.version if etat else None
+    finally:
+        db.close()
+
+
+def _acquire() -> bool:
+    """Prend le verrou s'il est libre ou si son bail a expiré (UPDATE atomique)"""
+    maintenant = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        try:
+            db.add(EtatIngestion(id=ETAT_ID))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        pris = db.query(EtatIngestion).filter(
+            EtatIngestion.id == ETAT_ID,
+            or_(
+                EtatIngestion.proprietaire.is_(None),
+                EtatIngestion.proprietaire == INSTANCE,
+                EtatIngestion.expire_le < maintenant,
+            )
+        ).update({
+            "proprietaire": INSTANCE,
+            "expire_le": maintenant + timedelta(seconds=settings.ingest_lock_ttl_seconds),
+        }, synchronize_session=False)
+        db.commit()
+        return pris == 1
+    except OperationalError:
+        # Base verrouillée par l'écriture d'un autre worker : verrou non pris
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def _update_lock(**valeurs):
+    db = SessionLocal()
+    try:
+        db.query(EtatIngestion).filter(
+            EtatIngestion.id == ETAT_ID, EtatIngestion.proprietaire == INSTANCE
+        ).update(valeurs, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+@contextmanager
+def _heartbeat():
+    """Renouvelle le bail du verrou pendant le chargement"""
+    arret = threading.Event()
+
+    def renouveler():
+        while not arret.wait(settings.ingest_lock_ttl_seconds / 3):
+            try:
+                _update_lock(expire_le=datetime.utcnow() + timedelta(seconds=settings.ingest_lock_ttl_seconds))
+            except OperationalError as e:
+                logger.warning(f"⚠️  Renouvellement du verrou d'ingestion impossible: {e}")
+
+    thread = threading.Thread(target=renouveler, name="ingestion-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        arret.set()
+        thread.join()
+
+
+def coordinated_ingest() -> str:
+    """
+    Charge les données si aucun autre worker ne l'a fait (ou ne le fait) pour la
+    version courante des fichiers, sinon attend et adopte sa version publiée.
+    """
+    create_tables()
+    attendue = scan_dataset_version()
+    attente_signalee = False
+
+    while True:
+        if published_version() == attendue:
+            adopt_dataset_version(attendue)
+            return f"version {attendue} adoptée"
+
+        if _acquire():
+            try:
+                # Publiée entre-temps par le détenteur précédent ?
+                if published_version() == attendue:
+                    adopt_dataset_version(attendue)
+                    return f"version {attendue} adoptée"
+                with _heartbeat():
+                    load_all_csv_data()
+                version = get_dataset_version()
+                _update_lock(version=version, publie_le=datetime.utcnow())
+                logger.info(f"📣 Version {version} publiée par {INSTANCE}")
+                return f"version {version} chargée et publiée"
+            finally:
+                _update_lock(proprietaire=None, expire_le=None)
+
+        if not attente_signalee:
+            logger.info("⏳ Ingestion en cours dans un autre worker : attente de la version publiée")
+            mark_load_waiting()
+            attente_signalee = True
+        time.sleep(settings.ingest_poll_seconds)
@@ -0,0 +1,302 @@
+"""
+Métriques Prometheus (format texte, GET /metrics)
+
+Compteurs et histogrammes sans verrou : chaque thread écrit dans sa propre
+partition (dictionnaire étiquettes → valeurs, créé une fois par thread) et
+l'export additionne les partitions. Une requête ne coûte qu'un tuple
+d'étiquettes par métrique ; le nombre et la durée de ses requêtes SQL sont lus
+dans son Profil (services/profiling.py, événements SQLAlchemy).
+
+Caches, version du jeu de données et état des tâches sont lus au moment de
+l'export. Avec plusieurs workers, chaque processus expose ses propres
+métriques (à agréger côté Prometheus, étiquette d'instance).
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TAILLE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+REQUETES_SQL_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+TACHE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+NON_ROUTEE = "non_routee"
+
+_familles: List["_Famille"] = []
+_collecteurs: List[Callable[[], List[str]]] = []
+
+
+def _echapper(valeur) -> str:
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquettes(noms: Sequence[str], valeurs: Sequence, extra: str = "") -> str:
+    paires = [f'{n}="{_echapper(v)}"' for n, v in zip(noms, valeurs)]
+    if extra:
+        paires.append(extra)
+    return "{" + ",".join(paires) + "}" if paires else ""
+
+
+def _nombre(valeur: float) -> str:
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+class _Famille:
+    """Métrique étiquetée, partitionnée par thread"""
+
+    type = ""
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = ()):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self._local = threading.local()
+        self._partitions: List[dict] = []
+        _familles.append(self)
+
+    def _partition(self) -> dict:
+        try:
+            return self._local.partition
+        except AttributeError:
+            partition = self._local.partition = {}
+            self._partitions.append(partition)  # list.append : atomique
+            return partition
+
+    def _items(self):
+        """(étiquettes, valeurs) de toutes les partitions"""
+        for partition in list(self._partitions):
+            yield from list(partition.items())
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} {self.type}"] + self._lignes()
+
+
+class Counter(_Famille):
+    type = "counter"
+
+    def inc(self, etiquettes: Tuple = (), valeur: float = 1):
+        partition = self._partition()
+        partition[etiquettes] = partition.get(etiquettes, 0) + valeur
+
+    def _totaux(self) -> dict:
+        totaux = {}
+        for cle, valeur in self._items():
+            totaux[cle] = totaux.get(cle, 0) + valeur
+        return totaux
+
+    def _lignes(self) -> List[str]:
+        return [
+            f"{self.nom}{_etiquettes(self.etiquettes, cle)} {_nombre(valeur)}"
+            for cle, valeur in sorted(self._totaux().items())
+        ]
+
+
+class Gauge(Counter):
+    """Jauge incrémentée / décrémentée (ex. requêtes en cours)"""
+
+    type = "gauge"
+
+    def dec(self, etiquettes: Tuple = (), valeur: float = 1):
+        self.inc(etiquettes, -valeur)
+
+
+class Histogram(_Famille):
+    type = "histogram"
+
+    def __init__(self, nom: str, aide: str, etiquettes: Sequence[str] = (), buckets: Sequence[float] = LATENCE_BUCKETS):
+        super().__init__(nom, aide, etiquettes)
+        self.buckets = tuple(buckets)
+
+    def observe(self, etiquettes: Tuple, valeur: float):
+        partition = self._partition()
+        cellule = partition.get(etiquettes)
+        if cellule is None:
+            # Effectifs par intervalle (+Inf compris), puis somme
+            cellule = partition[etiquettes] = [0] * (len(self.buckets) + 1) + [0.0]
+        cellule[bisect_left(self.buckets, valeur)] += 1
+        cellule[-1] += valeur
+
+    def _lignes(self) -> List[str]:
+        totaux = {}
+        for cle, cellule in self._items():
+            total = totaux.setdefault(cle, [0] * len(cellule[:-1]) + [0.0])
+            for i, valeur in enumerate(cellule):
+                total[i] += valeur
+
+        lignes = []
+        for cle, total in sorted(totaux.items()):
+            cumul = 0
+            for borne, effectif in zip(self.buckets + ("+Inf",), total[:-1]):
+                cumul += effectif
+                le = f'le="{borne}"'
+                lignes.append(f"{self.nom}_bucket{_etiquettes(self.etiquettes, cle, le)} {cumul}")
+            lignes.append(f"{self.nom}_sum{_etiquettes(self.etiquettes, cle)} {_nombre(total[-1])}")
+            lignes.append(f"{self.nom}_count{_etiquettes(self.etiquettes, cle)} {cumul}")
+        return lignes
+
+
+def collector(fonction: Callable[[], List[str]]):
+    """Enregistre une fonction appelée à l'export (valeurs lues à la demande)"""
+    _collecteurs.append(fonction)
+    return fonction
+
+
+def render_metrics() -> str:
+    lignes = []
+    for famille in _familles:
+        lignes += famille.render()
+    for fonction in _collecteurs:
+        lignes += fonction()
+    return "\n".join(lignes) + "\n"
+
+
+# ============================================
+# Requêtes HTTP, SQL et tâches de fond
+# ============================================
+
+HTTP_REQUETES = Counter("http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status"))
+HTTP_LATENCE = Histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP", ("method", "route"), LATENCE_BUCKETS
+)
+HTTP_TAILLE = Histogram(
+    "http_response_size_bytes", "Taille du corps des réponses HTTP", ("method", "route"), TAILLE_BUCKETS
+)
+HTTP_EN_COURS = Gauge("http_requests_in_progress", "Requêtes HTTP en cours de traitement")
+
+SQL_PAR_REQUETE = Histogram(
+    "http_request_db_queries", "Requêtes SQL exécutées par requête HTTP", ("route",), REQUETES_SQL_BUCKETS
+)
+SQL_DUREE_PAR_REQUETE = Histogram(
+    "http_request_db_duration_seconds", "Temps passé en requêtes SQL par requête HTTP", ("route",), LATENCE_BUCKETS
+)
+SQL_REQUETES = Counter("db_queries_total", "Requêtes SQL exécutées (requêtes HTTP et tâches)")
+SQL_DUREE = Counter("db_query_duration_seconds_total", "Temps total passé en requêtes SQL")
+
+TACHE_DUREE = Histogram(
+    "job_duration_seconds", "Durée des tâches de fond (ingestion, préchauffage, ...)", ("job", "etat"), TACHE_BUCKETS
+)
+
+
+def route_template(scope: dict) -> str:
+    """
+    Modèle de chemin de la route (/api/admin/jobs/{nom}) : chemin de la requête
+    dont les paramètres sont remplacés par leur nom (cardinalité bornée)
+    """
+    if scope.get("endpoint") is None:
+        return NON_ROUTEE
+    segments = scope["path"].split("/")
+    for nom, valeur in scope.get("path_params", {}).items():
+        valeur = str(valeur)
+        for i in range(len(segments) - 1, -1, -1):
+            if valeur and valeur in segments[i]:
+                segments[i] = segments[i].replace(valeur, "{" + nom + "}", 1)
+                break
+    return "/".join(segments)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : latence, taille, statut et requêtes SQL par route"""
+
+    def __init__(self, app):
+        # Import différé : profiling importe les compteurs SQL de ce module
+        from app.services.profiling import current_profile
+        self.app = app
+        self._profil = current_profile
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        debut = time.perf_counter()
+        reponse = [500, 0]  # statut, octets
+
+        async def send_mesure(message):
+            if message["type"] == "http.response.start":
+                reponse[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                reponse[1] += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_EN_COURS.inc()
+        try:
+            await self.app(scope, receive, send_mesure)
+        finally:
+            HTTP_EN_COURS.dec()
+            route = route_template(scope)
+            etiquettes = (scope["method"], route)
+            HTTP_REQUETES.inc((scope["method"], route, str(reponse[0])))
+            HTTP_LATENCE.observe(etiquettes, time.perf_counter() - debut)
+            HTTP_TAILLE.observe(etiquettes, reponse[1])
+            profil = self._profil()
+            if profil is not None:
+                SQL_PAR_REQUETE.observe((route,), profil.requetes_sql)
+                SQL_DUREE_PAR_REQUETE.observe((route,), profil.duree_sql)
+
+
+# ============================================
+# Valeurs lues à l'export
+# ============================================
+
+def _caches() -> Dict[str, Callable]:
+    """Caches lru des services (import différé : pas de dépendance circulaire)"""
+    from app.services import allocation, analytics, analytics_engine, coverage, cube, pharmacies
+    return {
+        "cube": cube._cube,
+        "allocation": allocation._allocation_inputs,
+        "correlation_meteo_grippe": analytics._correlation_meteo_grippe,
+        "regression_pauvrete_urgences": analytics._regression_pauvrete_urgences,
+        "duckdb": analytics_engine._duckdb_analytics,
+        "couverture": coverage._coverage,
+        "communes": coverage._communes,
+        "sites": pharmacies.get_sites_table,
+        "index_spatial": pharmacies.get_sites_index,
+        "index_horaires": pharmacies.get_horaires_index,
+        "index_code_postal": pharmacies.get_code_postal_index,
+    }
+
+
+@collector
+def _lignes_caches() -> List[str]:
+    infos = {nom: fonction.cache_info() for nom, fonction in _caches().items()}
+    lignes = [
+        "# HELP cache_hits_total Appels servis par un cache lru",
+        "# TYPE cache_hits_total counter",
+    ]
+    lignes += [f'cache_hits_total{{cache="{nom}"}} {info.hits}' for nom, info in infos.items()]
+    lignes += ["# HELP cache_misses_total Appels calculés (absents du cache)", "# TYPE cache_misses_total counter"]
+    lignes += [f'cache_misses_total{{cache="{nom}"}} {info.misses}' for nom, info in infos.items()]
+    lignes += ["# HELP cache_hit_ratio Part des appels servis par le cache", "# TYPE cache_hit_ratio gauge"]
+    lignes += [
+        f'cache_hit_ratio{{cache="{nom}"}} {info.hits / (info.hits + info.misses) if info.hits + info.misses else 0.0}'
+        for nom, info in infos.items()
+    ]
+    return lignes
+
+
+@collector
+def _lignes_jeu_de_donnees() -> List[str]:
+    from app.services.data_loader import get_load_progress, get_dataset_version
+    pret = get_load_progress()["fin"] is not None
+    lignes = [
+        "# HELP dataset_info Version du jeu de données servie (1 une fois le chargement initial terminé)",
+        "# TYPE dataset_info gauge",
+        f'dataset_info{{version="{_echapper(get_dataset_version()) if pret else ""}"}} {int(pret)}',
+    ]
+    return lignes
+
+
+@collector
+def _lignes_taches() -> List[str]:
+    from app.services.scheduler import scheduler
+    statuts = scheduler.statuts()
+    lignes = ["# HELP job_last_duration_seconds Durée de la dernière exécution de la tâche", "# TYPE job_last_duration_seconds gauge"]
+    lignes += [
+        f'job_last_duration_seconds{{job="{s["nom"]}"}} {s["duree_ms"] / 1e3}'
+        for s in statuts if s["duree_ms"] is not None
+    ]
+    lignes += ["# HELP job_running Tâche en cours d'exécution", "# TYPE job_running gauge"]
+    lignes += [f'job_running{{job="{s["nom"]}"}} {int(s["etat"] == "en_cours")}' for s in statuts]
+    return lignes
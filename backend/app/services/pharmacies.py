@@ -0,0 +1,217 @@
+"""
+Sites de vaccination en pharmacie (santefr-lieux-vaccination-grippe-pharmacie.csv)
+
+Le CSV est converti une seule fois (pipeline ETL) en fichier Arrow IPC non
+compressé, puis ouvert en mémoire mappée : tous les workers uvicorn partagent
+les mêmes pages via le cache de l'OS, sans parsing ni copie par processus.
+Le HTML des modalités d'accueil est analysé à la conversion (colonnes
+sans_rendez_vous et horaires).
+"""
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.config import get_settings
+from app.services.spatial import GridIndex
+from app.services.horaires import HorairesIndex, MAX_PLAGES, parse_modalites_column
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Colonnes du CSV source → colonnes du fichier Arrow
+SITES_COLUMNS = {
+    "Finess": "finess",
+    "Titre": "titre",
+    "Adresse_voie 1": "adresse_voie_1",
+    "Adresse_voie 2": "adresse_voie_2",
+    "Adresse_codepostal": "code_postal",
+    "Adresse_ville": "ville",
+    "Modalites_accueil": "modalites_accueil",
+    "Adresse_latitude": "latitude",
+    "Adresse_longitude": "longitude",
+}
+
+
+def convert_sites_csv(csv_path: Path, arrow_path: Path) -> int:
+    """
+    Convertit le CSV des pharmacies en fichier Arrow IPC (un seul record batch).
+    Retourne le nombre de sites écrits.
+    """
+    df = pd.read_csv(
+        csv_path, sep=";", encoding="utf-8",
+        dtype={"Finess": str, "Adresse_codepostal": str}
+    )
+    df = df.rename(columns=SITES_COLUMNS)[list(SITES_COLUMNS.values())]
+    df["code_postal"] = df["code_postal"].str.zfill(5)
+
+    # Coordonnées en float64 avec NaN (et non null Arrow) : lecture NumPy sans copie
+    arrays = []
+    for col in df.columns:
+        if col in ("latitude", "longitude"):
+            arrays.append(pa.array(df[col].to_numpy(dtype=np.float64), type=pa.float64()))
+        else:
+            arrays.append(pa.array(df[col].astype(object).where(df[col].notna(), None), type=pa.string()))
+    names = list(df.columns)
+
+    # Modalités d'accueil structurées : drapeau rendez-vous + horaires en minutes
+    sans_rdv, horaires = parse_modalites_column(df["modalites_accueil"].tolist())
+    arrays.append(pa.array(sans_rdv, type=pa.int8()))
+    arrays.append(pa.FixedSizeListArray.from_arrays(
+        pa.array(horaires.reshape(-1), type=pa.int16()), 7 * MAX_PLAGES * 2
+    ))
+    names += ["sans_rendez_vous", "horaires"]
+
+    table = pa.Table.from_arrays(arrays, names=names)
+
+    # Écriture atomique : les workers qui mappent l'ancien fichier ne sont pas affectés
+    arrow_path = Path(arrow_path)
+    arrow_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = arrow_path.with_suffix(arrow_path.suffix + ".tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(table), 1))
+    os.replace(tmp_path, arrow_path)
+
+    logger.info(f"✅ {len(table)} sites de vaccination écrits dans {arrow_path}")
+    return len(table)
+
+
+def file_signature(path) -> Optional[str]:
+    """Taille et date de modification d'un fichier (None s'il n'existe pas)"""
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+# Signature du fichier des sites au moment de son ouverture (get_sites_table)
+_signature_sites: Optional[str] = None
+
+
+@lru_cache()
+def get_sites_table() -> Optional[pa.Table]:
+    """
+    Table Arrow des sites, mappée en mémoire (aucune copie, partagée entre workers).
+    Retourne None si le fichier n'a pas encore été généré.
+    """
+    global _signature_sites
+    path = Path(settings.pharmacies_sites_path)
+    _signature_sites = file_signature(path)
+    if _signature_sites is None:
+        logger.warning(f"⚠️  Fichier des sites introuvable: {path}")
+        logger.info("💡 Générez-le avec: python ../data/scripts/pipeline.py pharmacies_sites")
+        return None
+
+    # La table garde une référence sur la zone mappée : ne pas fermer le fichier
+    source = pa.memory_map(str(path), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def reload_sites():
+    """Oublie la table mappée, les index et la couverture (à appeler après régénération du fichier)"""
+    from app.services.coverage import reload_coverage  # import différé : coverage dépend de ce module
+    get_sites_table.cache_clear()
+    get_sites_index.cache_clear()
+    get_horaires_index.cache_clear()
+    get_code_postal_index.cache_clear()
+    reload_coverage()
+
+
+def refresh_sites() -> bool:
+    """Recharge les sites si le fichier a changé depuis son ouverture (True si rechargés)"""
+    if get_sites_table.cache_info().currsize == 0:
+        return False
+    if file_signature(settings.pharmacies_sites_path) == _signature_sites:
+        return False
+    logger.info("🔄 Fichier des sites modifié : rechargement")
+    reload_sites()
+    return True
+
+
+def column_numpy(table: pa.Table, name: str) -> np.ndarray:
+    """Vue NumPy sans copie d'une colonne numérique (fichier écrit en un seul batch)"""
+    column = table.column(name)
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=True)
+    return column.to_numpy()
+
+
+def sites_coordinates() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Latitudes / longitudes des sites (vues NumPy sur le fichier mappé)
+    """
+    table = get_sites_table()
+    if table is None:
+        return np.empty(0), np.empty(0)
+    return column_numpy(table, "latitude"), column_numpy(table, "longitude")
+
+
+@lru_cache()
+def get_sites_index() -> Optional[GridIndex]:
+    """
+    Index spatial des sites, construit une fois par processus (au démarrage)
+    """
+    if get_sites_table() is None:
+        return None
+    lat, lon = sites_coordinates()
+    index = GridIndex(lat, lon)
+    logger.info(f"🗺️  Index spatial construit: {len(index)} sites géolocalisés")
+    return index
+
+
+def sites_batches(taille: int) -> Iterator[pa.RecordBatch]:
+    """
+    Tranches d'au plus `taille` lignes de la table des sites : vues sans copie
+    sur le fichier mappé (seules les pages lues sont chargées par l'OS)
+    """
+    table = get_sites_table()
+    if table is None:
+        return
+    for batch in table.to_batches():
+        for debut in range(0, batch.num_rows, taille):
+            yield batch.slice(debut, taille)
+
+
+def sites_records(indices: np.ndarray, columns: list) -> list:
+    """Lignes de la table des sites (dans l'ordre des indices) en dictionnaires"""
+    table = get_sites_table()
+    return table.select(columns).take(pa.array(indices, type=pa.int64())).to_pylist()
+
+
+def sites_horaires() -> np.ndarray:
+    """Horaires des sites (n, 7, MAX_PLAGES, 2), vue sans copie sur le fichier mappé"""
+    column = get_sites_table().column("horaires")
+    chunk = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    values = chunk.flatten().to_numpy(zero_copy_only=True)
+    return values.reshape(len(chunk), 7, MAX_PLAGES, 2)
+
+
+@lru_cache()
+def get_horaires_index() -> Optional[HorairesIndex]:
+    """
+    Index des horaires / modalités d'accès, construit une fois par processus
+    """
+    table = get_sites_table()
+    if table is None:
+        return None
+    return HorairesIndex(sites_horaires(), column_numpy(table, "sans_rendez_vous"))
+
+
+@lru_cache()
+def get_code_postal_index() -> dict:
+    """code postal → indices (triés) des sites"""
+    table = get_sites_table()
+    if table is None:
+        return {}
+    codes = np.asarray([c or "" for c in table.column("code_postal").to_pylist()], dtype=object)
+    order = np.argsort(codes, kind="stable")
+    uniques, starts = np.unique(codes[order], return_index=True)
+    return {code: np.sort(ids) for code, ids in zip(uniques, np.split(order, starts[1:]))}
+
@@ -0,0 +1,172 @@
+"""
+Profilage par requête : temps SQL, phases de la route et sérialisation
+
+Un objet Profil par requête HTTP (ContextVar), alimenté par :
+- les événements before/after_cursor_execute des moteurs SQLAlchemy
+  (branchés dans database.py) : nombre et durée des requêtes SQL ;
+- with phase("conversion"), with phase("graphique") dans les routes
+  (hors exécution des requêtes, déjà comptée dans sql) ;
+- ProfiledRoute : fin de la fonction de la route, le reste jusqu'à l'envoi
+  de la réponse est la validation / sérialisation de FastAPI.
+
+Le résultat est renvoyé dans l'en-tête Server-Timing (onglet Réseau des
+outils de développement du navigateur). Avec SQL_DEBUG=true, les requêtes plus
+lentes que SLOW_QUERY_MS sont journalisées avec leur EXPLAIN QUERY PLAN.
+"""
+import functools
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi.routing import APIRoute
+
+from app.config import get_settings
+from app.services.metrics import SQL_DUREE, SQL_REQUETES
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class Profil:
+    """Mesures d'une requête HTTP (un objet par requête)"""
+
+    __slots__ = ("debut", "requetes_sql", "duree_sql", "phases", "fin_route")
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.requetes_sql = 0
+        self.duree_sql = 0.0
+        self.phases: Dict[str, float] = {}
+        self.fin_route: Optional[float] = None
+
+
+_profil: ContextVar[Optional[Profil]] = ContextVar("profil", default=None)
+
+
+def current_profile() -> Optional[Profil]:
+    return _profil.get()
+
+
+@contextmanager
+def phase(nom: str):
+    """Chronomètre une partie de la route (sans effet hors requête HTTP)"""
+    profil = _profil.get()
+    if profil is None:
+        yield
+        return
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        profil.phases[nom] = profil.phases.get(nom, 0.0) + time.perf_counter() - debut
+
+
+# ============================================
+# Requêtes SQL (événements des moteurs de database.py)
+# ============================================
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profil_debut = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    debut = getattr(context, "_profil_debut", None)
+    if debut is None:
+        return
+    duree = time.perf_counter() - debut
+    SQL_REQUETES.inc()
+    SQL_DUREE.inc((), duree)
+    profil = _profil.get()
+    if profil is not None:
+        profil.requetes_sql += 1
+        profil.duree_sql += duree
+    if settings.sql_debug and duree * 1e3 >= settings.slow_query_ms and not executemany:
+        _log_slow_query(cursor, statement, parameters, duree)
+
+
+def _log_slow_query(cursor, statement: str, parameters, duree: float):
+    """Journalise une requête lente avec son plan (connexion DBAPI de la requête)"""
+    try:
+        plan = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+        lignes = "\n".join(f"    {ligne[-1]}" for ligne in plan) or "    (pas de plan)"
+    except Exception as e:  # requête non explicable (PRAGMA, DDL, ...)
+        lignes = f"    (plan indisponible: {e})"
+    logger.warning(f"🐢 Requête SQL lente ({duree * 1e3:.1f} ms): {' '.join(statement.split())}\n{lignes}")
+
+
+# ============================================
+# Fin de la route (avant sérialisation de la réponse)
+# ============================================
+
+def _marquer_fin(endpoint):
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def route(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profil = _profil.get()
+                if profil is not None:
+                    profil.fin_route = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def route(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profil = _profil.get()
+                if profil is not None:
+                    profil.fin_route = time.perf_counter()
+    return route
+
+
+class ProfiledRoute(APIRoute):
+    """Route FastAPI qui note la fin de sa fonction (APIRouter(route_class=ProfiledRoute))"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _marquer_fin(endpoint), **kwargs)
+
+
+# ============================================
+# En-tête Server-Timing
+# ============================================
+
+def server_timing(profil: Profil, fin: float) -> str:
+    """Mesures en millisecondes au format Server-Timing"""
+    mesures = [f'sql;dur={profil.duree_sql * 1e3:.2f};desc="{profil.requetes_sql} requetes"']
+    mesures += [f"{nom};dur={duree * 1e3:.2f}" for nom, duree in profil.phases.items()]
+    if profil.fin_route is not None:
+        mesures.append(f"route;dur={(profil.fin_route - profil.debut) * 1e3:.2f}")
+        mesures.append(f"serialisation;dur={(fin - profil.fin_route) * 1e3:.2f}")
+    mesures.append(f"total;dur={(fin - profil.debut) * 1e3:.2f}")
+    return ", ".join(mesures)
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI : crée le Profil de la requête et ajoute l'en-tête Server-Timing"""
+
+    def __init__(self, app, entete: bool = True):
+        self.app = app
+        self.entete = entete
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profil = Profil()
+        jeton = _profil.set(profil)
+
+        async def send_timing(message):
+            if message["type"] == "http.response.start" and self.entete:
+                valeur = server_timing(profil, time.perf_counter()).encode("ascii", "replace")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", valeur)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timing)
+        finally:
+            _profil.reset(jeton)
@@ -0,0 +1,135 @@
+"""
+Normalisation des noms de régions
+
+Module partagé entre les scripts ETL (data/scripts) et le chargement des
+données de l'API : toutes les sources (« 11 - ILE-DE-France »,
+« Ile de France », « Île-de-France »...) sont ramenées au même nom canonique
+pour que les jointures entre jeux de données s'alignent.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# Référentiel des régions (code INSEE → nom canonique)
+# ============================================
+
+REGIONS = {
+    "01": "Guadeloupe",
+    "02": "Martinique",
+    "03": "Guyane",
+    "04": "La Réunion",
+    "06": "Mayotte",
+    "11": "Île-de-France",
+    "24": "Centre-Val de Loire",
+    "27": "Bourgogne-Franche-Comté",
+    "28": "Normandie",
+    "32": "Hauts-de-France",
+    "44": "Grand Est",
+    "52": "Pays de la Loire",
+    "53": "Bretagne",
+    "75": "Nouvelle-Aquitaine",
+    "76": "Occitanie",
+    "84": "Auvergne-Rhône-Alpes",
+    "93": "Provence-Alpes-Côte d'Azur",
+    "94": "Corse",
+}
+
+REGIONS_DOM_TOM = {"01", "02", "03", "04", "06"}
+
+# Variantes rencontrées dans les sources qui ne se réduisent pas au nom canonique
+# par simple repliement des accents / de la casse
+ALIAS = {
+    "24": ["Centre"],
+    "93": ["Provence-Alpes-Côtes-d'Azur", "PACA"],
+    "04": ["Réunion"],
+}
+
+# Mots de liaison ignorés : « Auvergne et Rhône-Alpes » == « Auvergne-Rhône-Alpes »
+_MOTS_IGNORES = {"et", "de", "la", "le", "d", "l"}
+_PREFIXE_CODE = re.compile(r"^\s*(\d{1,3})\s*(?:-|$)")
+_NON_ALPHANUM = re.compile(r"[^a-z0-9]+")
+
+
+def canonicaliser(nom: str) -> str:
+    """
+    Replie accents, casse, ponctuation et mots de liaison d'un nom de région
+    (ex: "Provence-Alpes-Côte d'Azur" → "provence alpes cote azur")
+    """
+    nom = unicodedata.normalize("NFKD", str(nom))
+    nom = "".join(c for c in nom if not unicodedata.combining(c)).lower()
+    mots = _NON_ALPHANUM.sub(" ", nom).split()
+    return " ".join(m for m in mots if m not in _MOTS_IGNORES)
+
+
+# Table d'alias précompilée une seule fois : clé repliée → code région
+_ALIAS_VERS_CODE = {}
+for _code, _nom in REGIONS.items():
+    _ALIAS_VERS_CODE[canonicaliser(_nom)] = _code
+    for _alias in ALIAS.get(_code, []):
+        _ALIAS_VERS_CODE[canonicaliser(_alias)] = _code
+
+
+@lru_cache(maxsize=1024)
+def _code_depuis_texte(nom: str) -> Optional[str]:
+    match = _PREFIXE_CODE.match(nom)
+    if match:
+        code = match.group(1).zfill(2)
+        if code in REGIONS:
+            return code
+    # « 11 - ILE-DE-France » : on retente sans le préfixe numérique
+    return _ALIAS_VERS_CODE.get(canonicaliser(_PREFIXE_CODE.sub("", nom)))
+
+
+def code_region(nom) -> Optional[str]:
+    """
+    Retourne le code INSEE de la région (ex: "11") ou None si inconnue
+    """
+    if nom is None or (isinstance(nom, float) and np.isnan(nom)):
+        return None
+    return _code_depuis_texte(str(nom).strip())
+
+
+def normaliser_region(nom) -> Optional[str]:
+    """
+    Retourne le nom canonique de la région.
+    Les noms inconnus sont renvoyés tels quels (sans espaces superflus).
+    """
+    code = code_region(nom)
+    if code is not None:
+        return REGIONS[code]
+    if nom is None or (isinstance(nom, float) and np.isnan(nom)):
+        return None
+    return str(nom).strip()
+
+
+def normaliser_regions(valeurs, cible: str = "nom"):
+    """
+    Version vectorisée : normalise une Series ou un tableau de noms de régions.
+
+    Chaque valeur distincte n'est résolue qu'une fois (factorisation), puis le
+    résultat est redistribué par indexation NumPy.
+
+    Args:
+        valeurs: pd.Series, np.ndarray ou liste
+        cible: "nom" (nom canonique) ou "code" (code INSEE)
+    """
+    if cible not in ("nom", "code"):
+        raise ValueError(f"Cible inconnue: {cible}")
+
+    fonction = normaliser_region if cible == "nom" else code_region
+    serie = valeurs if isinstance(valeurs, pd.Series) else pd.Series(valeurs, dtype=object)
+    codes, uniques = pd.factorize(serie)
+
+    table = np.empty(len(uniques) + 1, dtype=object)
+    table[:-1] = [fonction(u) for u in uniques]
+    table[-1] = None  # codes == -1 (valeurs manquantes)
+    resultat = table[codes]
+
+    if isinstance(valeurs, pd.Series):
+        return pd.Series(resultat, index=valeurs.index, name=valeurs.name)
+    return resultat
@@ -0,0 +1,249 @@
+"""
+Planificateur de tâches de fond (asyncio, dans le processus de l'application)
+
+Chaque tâche est exécutée hors de la boucle d'événements : dans un thread
+(tâches qui remplissent les caches du processus) ou dans un processus séparé
+(tâches autonomes, sans GIL). Le nombre d'exécutions simultanées est borné par
+type d'exécuteur, et les tâches d'un même groupe ne se chevauchent jamais
+(ex: ingestion et VACUUM sur la même base).
+
+Une tâche peut être périodique (intervalle en secondes) et/ou déclenchée à la
+demande ; une demande pendant qu'elle tourne déjà est ignorée. Les tâches
+« suivantes » sont déclenchées après chaque succès.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.engine import make_url
+
+from app.config import get_settings
+from app.services.allocation import get_allocation_inputs
+from app.services.analytics import get_correlation_meteo_grippe, get_regression_pauvrete_urgences
+from app.services.coverage import get_coverage, DEFAULT_RAYON_KM
+from app.services.cube import get_cube
+from app.services.forecast import fit_forecast_models
+from app.services.ingestion import coordinated_ingest
+from app.services.metrics import TACHE_DUREE
+from app.services.pharmacies import get_sites_index, get_horaires_index, get_code_postal_index, reload_sites
+from app.services.recherche import ensure_search_index
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Tâche planifiée et état de sa dernière exécution"""
+
+    def __init__(
+        self, nom: str, fonction: Callable, description: str,
+        intervalle: Optional[float] = None, processus: bool = False,
+        groupe: Optional[str] = None, suivants: Sequence[str] = ()
+    ):
+        self.nom = nom
+        self.fonction = fonction
+        self.description = description
+        self.intervalle = intervalle
+        self.processus = processus
+        self.groupe = groupe
+        self.suivants = list(suivants)
+
+        self.etat = "jamais_executee"
+        self.executions = 0
+        self.echecs = 0
+        self.debut: Optional[datetime] = None
+        self.fin: Optional[datetime] = None
+        self.duree_ms: Optional[float] = None
+        self.erreur: Optional[str] = None
+        self.resultat: Optional[str] = None
+        self.prochaine: Optional[datetime] = None
+        self.tache: Optional[asyncio.Task] = None
+
+    @property
+    def en_cours(self) -> bool:
+        return self.tache is not None and not self.tache.done()
+
+    def statut(self) -> dict:
+        iso = lambda d: d.isoformat(timespec="seconds") if d else None
+        return {
+            "nom": self.nom,
+            "description": self.description,
+            "etat": self.etat,
+            "mode": "processus" if self.processus else "thread",
+            "groupe": self.groupe,
+            "intervalle_s": self.intervalle,
+            "executions": self.executions,
+            "echecs": self.echecs,
+            "dernier_debut": iso(self.debut),
+            "derniere_fin": iso(self.fin),
+            "duree_ms": self.duree_ms,
+            "derniere_erreur": self.erreur,
+            "resultat": self.resultat,
+            "prochaine_execution": iso(self.prochaine),
+        }
+
+
+class Scheduler:
+    def __init__(self, max_threads: int = 2, max_processus: int = 1):
+        self.jobs: Dict[str, Job] = {}
+        self.max_threads = max_threads
+        self.max_processus = max_processus
+        self._boucles: List[asyncio.Task] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def register(self, job: Job) -> Job:
+        self.jobs[job.nom] = job
+        return job
+
+    async def start(self, immediats: Sequence[str] = ()):
+        """Démarre les boucles périodiques et lance les tâches `immediats`"""
+        # Primitives asyncio créées dans la boucle de l'application
+        self._threads = asyncio.Semaphore(self.max_threads)
+        self._processus = asyncio.Semaphore(self.max_processus)
+        self._groupes = {job.groupe: asyncio.Lock() for job in self.jobs.values() if job.groupe}
+        self._boucles = [
+            asyncio.create_task(self._boucle(job)) for job in self.jobs.values() if job.intervalle
+        ]
+        for nom in immediats:
+            self.trigger(nom)
+        logger.info(f"⏱️  Planificateur démarré : {len(self.jobs)} tâches, {len(self._boucles)} périodiques")
+
+    async def stop(self):
+        """Arrête les boucles périodiques et attend la fin des tâches en cours"""
+        for boucle in self._boucles:
+            boucle.cancel()
+        en_cours = [job.tache for job in self.jobs.values() if job.en_cours]
+        await asyncio.gather(*self._boucles, *en_cours, return_exceptions=True)
+        self._boucles = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def trigger(self, nom: str) -> Optional[asyncio.Task]:
+        """
+        Lance la tâche (à appeler depuis la boucle d'événements).
+        Retourne None si elle est déjà en attente ou en cours. KeyError si inconnue.
+        """
+        job = self.jobs[nom]
+        if job.en_cours:
+            return None
+        job.etat = "en_attente"
+        job.tache = asyncio.create_task(self._run(job))
+        return job.tache
+
+    def statuts(self) -> List[dict]:
+        return [job.statut() for job in self.jobs.values()]
+
+    async def _boucle(self, job: Job):
+        while True:
+            job.prochaine = datetime.now().astimezone() + timedelta(seconds=job.intervalle)
+            await asyncio.sleep(job.intervalle)
+            self.trigger(job.nom)
+
+    async def _run(self, job: Job):
+        verrou = self._groupes[job.groupe] if job.groupe else nullcontext()
+        limite = self._processus if job.processus else self._threads
+        async with verrou, limite:
+            job.etat = "en_cours"
+            job.debut, job.erreur = datetime.now().astimezone(), None
+            debut = time.perf_counter()
+            try:
+                if job.processus:
+                    if self._executor is None:
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_processus)
+                    resultat = await asyncio.get_running_loop().run_in_executor(self._executor, job.fonction)
+                else:
+                    resultat = await asyncio.to_thread(job.fonction)
+            except Exception as e:
+                job.etat, job.erreur = "echec", f"{type(e).__name__}: {e}"
+                job.echecs += 1
+                logger.error(f"❌ Tâche {job.nom} en échec: {job.erreur}")
+            else:
+                job.etat = "succes"
+                job.resultat = None if resultat is None else str(resultat)
+            finally:
+                job.executions += 1
+                job.fin = datetime.now().astimezone()
+                job.duree_ms = round((time.perf_counter() - debut) * 1e3, 1)
+                TACHE_DUREE.observe((job.nom, job.etat), time.perf_counter() - debut)
+
+        if job.etat == "succes":
+            logger.info(f"⏱️  Tâche {job.nom} terminée en {job.duree_ms:.0f} ms")
+            for suivant in job.suivants:
+                self.trigger(suivant)
+
+
+# ============================================
+# Tâches de l'application
+# ============================================
+
+def ingest() -> str:
+    """
+    Crée les tables manquantes, recharge les fichiers de données (un seul worker,
+    les autres adoptent sa version), oublie les sites mappés et reconstruit
+    l'index de recherche des pharmacies si le fichier des sites a changé
+    """
+    resultat = coordinated_ingest()
+    reload_sites()
+    return f"{resultat}, {ensure_search_index()}"
+
+
+def warm_caches() -> str:
+    """Index des sites, couverture nationale et cube OLAP"""
+    get_sites_index()
+    get_horaires_index()
+    get_code_postal_index()
+    get_coverage(DEFAULT_RAYON_KM)
+    get_cube()
+    return "caches prêts"
+
+
+def precompute_analytics() -> str:
+    """Corrélations, régression, entrées d'allocation et modèles de prévision"""
+    get_correlation_meteo_grippe()
+    get_regression_pauvrete_urgences()
+    get_allocation_inputs()
+    return f"{fit_forecast_models()} modèles de prévision ajustés"
+
+
+def maintain_database(database_url: str) -> str:
+    """
+    VACUUM + ANALYZE sur une connexion dédiée (exécutée dans un processus séparé)
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or not url.database:
+        return "base non SQLite : rien à faire"
+    chemin = Path(url.database)
+    avant = chemin.stat().st_size
+    conn = sqlite3.connect(str(chemin), timeout=60)
+    try:
+        conn.execute("VACUUM")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return f"VACUUM + ANALYZE : {avant / 1e6:.1f} Mo → {chemin.stat().st_size / 1e6:.1f} Mo"
+
+
+scheduler = Scheduler(settings.scheduler_threads, settings.scheduler_processes)
+
+scheduler.register(Job(
+    "ingestion", ingest, "Rechargement des fichiers de données et index de recherche",
+    intervalle=settings.ingest_interval_minutes * 60 or None, groupe="base",
+    suivants=["prechauffage", "precalcul_analytique"]
+))
+scheduler.register(Job("prechauffage", warm_caches, "Index des sites, couverture et cube OLAP"))
+scheduler.register(Job(
+    "precalcul_analytique", precompute_analytics,
+    "Corrélations, régression, allocation et modèles de prévision", groupe="base"
+))
+scheduler.register(Job(
+    "maintenance", partial(maintain_database, settings.database_url), "VACUUM et ANALYZE de la base SQLite",
+    intervalle=settings.maintenance_interval_minutes * 60 or None, processus=True, groupe="base"
+))
@@ -0,0 +1,253 @@
+"""
+Index spatial en grille (lat/lon) pour les requêtes de proximité
+
+Les points sont triés par cellule de grille : toutes les cellules d'une même
+ligne de latitude forment un intervalle contigu du tableau trié, retrouvé par
+recherche dichotomique. Une requête ne calcule donc les distances haversine
+que sur les points des cellules couvrant la zone, jamais sur tout le jeu.
+"""
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Distance haversine (km), vectorisée NumPy (scalaires ou tableaux diffusables)
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GridIndex:
+    """
+    Index en grille régulière de `cell_deg` degrés.
+
+    Args:
+        lat, lon: coordonnées des points (les NaN sont ignorés)
+        cell_deg: taille des cellules en degrés (0.25° ≈ 28 km en latitude)
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_deg: float = 0.25):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180 / cell_deg))
+        self.n_cols = int(np.ceil(360 / cell_deg))
+
+        keys = self.cell_keys(lat[valid], lon[valid])
+        order = np.argsort(keys, kind="stable")
+
+        # Indices d'origine (dans le jeu complet) et coordonnées, triés par cellule
+        self.ids = valid[order]
+        self.keys = keys[order]
+        self.lat = lat[self.ids]
+        self.lon = lon[self.ids]
+        # Radians et cosinus précalculés : distances d'une requête sans conversion
+        self._lat_rad = np.radians(self.lat)
+        self._lon_rad = np.radians(self.lon)
+        self._cos_lat = np.cos(self._lat_rad)
+
+        # Rayon initial des kNN : disque contenant en moyenne un point, d'après
+        # la densité des cellules occupées (évite les agrandissements successifs)
+        occupees = len(np.unique(self.keys)) if len(self.keys) else 1
+        cos_moyen = float(self._cos_lat.mean()) if len(self.keys) else 1.0
+        aire_cellule = (cell_deg * 111.2) ** 2 * max(cos_moyen, 0.1)
+        self._rayon_unitaire = math.sqrt(occupees * aire_cellule / max(len(self.ids), 1) / math.pi)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows(self, lat):
+        return np.clip(((np.asarray(lat) + 90) / self.cell_deg).astype(np.int64), 0, self.n_rows - 1)
+
+    def _cols(self, lon):
+        return (np.floor((np.asarray(lon) + 180) / self.cell_deg).astype(np.int64)) % self.n_cols
+
+    def cell_keys(self, lat, lon):
+        return self._rows(lat) * self.n_cols + self._cols(lon)
+
+    def _row(self, lat: float) -> int:
+        return min(max(int((lat + 90) / self.cell_deg), 0), self.n_rows - 1)
+
+    def _col(self, lon: float) -> int:
+        return math.floor((lon + 180) / self.cell_deg) % self.n_cols
+
+    def _distances(self, lat: float, lon: float, positions: np.ndarray) -> np.ndarray:
+        """Distances haversine (km) du point aux points indexés `positions`"""
+        phi, lam = math.radians(lat), math.radians(lon)
+        a = (
+            np.sin((self._lat_rad[positions] - phi) * 0.5) ** 2
+            + math.cos(phi) * self._cos_lat[positions] * np.sin((self._lon_rad[positions] - lam) * 0.5) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Positions (dans les tableaux triés) des points des cellules couvrant le cercle"""
+        # Bornes en scalaires Python : une requête ne fait que quelques appels NumPy
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        lat_min, lat_max = lat - dlat, lat + dlat
+        row_min, row_max = self._row(lat_min), self._row(lat_max)
+
+        # Largeur en longitude au pire parallèle de la zone (ou tout le tour près des pôles)
+        cos_min = math.cos(math.radians(min(max(abs(lat_min), abs(lat_max)), 90.0)))
+        if lat_min <= -90 or lat_max >= 90 or cos_min < 1e-9 or dlat / cos_min >= 180:
+            col_ranges = [(0, self.n_cols - 1)]
+        else:
+            dlon = dlat / cos_min
+            col_min, col_max = self._col(lon - dlon), self._col(lon + dlon)
+            if col_min <= col_max:
+                col_ranges = [(col_min, col_max)]
+            else:  # passage de l'antiméridien
+                col_ranges = [(col_min, self.n_cols - 1), (0, col_max)]
+
+        rows = np.arange(row_min, row_max + 1, dtype=np.int64) * self.n_cols
+        lows = np.concatenate([rows + col_min for col_min, _ in col_ranges])
+        highs = np.concatenate([rows + col_max for _, col_max in col_ranges])
+        starts = np.searchsorted(self.keys, lows, side="left")
+        lengths = np.searchsorted(self.keys, highs, side="right") - starts
+
+        # Concaténation vectorisée des intervalles [start, start + length)
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(total, dtype=np.int64)
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points à moins de `radius_km` du point donné, triés par distance.
+        Retourne (indices d'origine, distances en km).
+        """
+        positions = self._candidates(lat, lon, radius_km)
+        distances = self._distances(lat, lon, positions)
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self.ids[positions[order]], distances[order]
+
+    def query_knn(
+        self, lat: float, lon: float, k: int, max_km: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Les `k` points les plus proches (éventuellement limités à `max_km`).
+        Le rayon de recherche grandit jusqu'à contenir k points : tout point
+        plus proche que le k-ième se trouve forcément dans ce rayon.
+        """
+        if len(self) == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        radius = 2 * self._rayon_unitaire * math.sqrt(k)
+        half_circumference = np.pi * EARTH_RADIUS_KM
+        while True:
+            if max_km is not None:
+                radius = min(radius, max_km)
+            positions = self._candidates(lat, lon, radius)
+            distances = self._distances(lat, lon, positions)
+            inside = distances <= radius
+            if inside.sum() >= k or radius >= half_circumference or radius == max_km:
+                break
+            if len(distances) >= k:
+                # Le k-ième candidat (même hors du cercle) borne la distance cherchée
+                radius = max(float(np.partition(distances, k - 1)[k - 1]), radius)
+            else:
+                # Trop peu de candidats : agrandit d'après le nombre manquant (aire ∝ rayon²)
+                radius *= max(2.0, math.sqrt(k / max(len(distances), 1)))
+
+        positions, distances = positions[inside], distances[inside]
+        if len(distances) > k:
+            nearest = np.argpartition(distances, k - 1)[:k]
+            positions, distances = positions[nearest], distances[nearest]
+        order = np.argsort(distances, kind="stable")
+        return self.ids[positions[order]], distances[order]
+
+    # ============================================
+    # Requêtes par lot (une matrice de distances par cellule de requête)
+    # ============================================
+
+    def _query_groups(self, lat: np.ndarray, lon: np.ndarray):
+        """
+        Regroupe les points de requête par cellule de grille.
+        Produit (indices du groupe, centre, rayon du groupe autour du centre en km).
+        """
+        keys = self.cell_keys(lat, lon)
+        order = np.argsort(keys, kind="stable")
+        bounds = np.flatnonzero(np.diff(keys[order])) + 1
+        for group in np.split(order, bounds):
+            center_lat, center_lon = lat[group].mean(), lon[group].mean()
+            spread = haversine_km(center_lat, center_lon, lat[group], lon[group]).max()
+            yield group, center_lat, center_lon, spread
+
+    def batch_nearest(
+        self, lat: np.ndarray, lon: np.ndarray, search_km: float = 20.0
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Point le plus proche pour chaque point de requête.
+        Retourne (indices d'origine, distances en km) ; -1 / inf si l'index est vide.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        nearest_ids = np.full(len(lat), -1, dtype=np.int64)
+        nearest_dist = np.full(len(lat), np.inf)
+        if len(self) == 0 or len(lat) == 0:
+            return nearest_ids, nearest_dist
+
+        fallback = []
+        for group, center_lat, center_lon, spread in self._query_groups(lat, lon):
+            positions = self._candidates(center_lat, center_lon, search_km + spread)
+            if len(positions) == 0:
+                fallback.extend(group)
+                continue
+            distances = haversine_km(
+                lat[group, None], lon[group, None], self.lat[positions], self.lon[positions]
+            )
+            best = distances.argmin(axis=1)
+            best_dist = distances[np.arange(len(group)), best]
+            # Au-delà de search_km, un point hors du voisinage pourrait être plus proche
+            ok = best_dist <= search_km
+            nearest_ids[group[ok]] = self.ids[positions[best[ok]]]
+            nearest_dist[group[ok]] = best_dist[ok]
+            fallback.extend(group[~ok])
+
+        for i in fallback:
+            ids, distances = self.query_knn(lat[i], lon[i], 1)
+            nearest_ids[i], nearest_dist[i] = ids[0], distances[0]
+        return nearest_ids, nearest_dist
+
+    def batch_within(
+        self, lat: np.ndarray, lon: np.ndarray, radius_km: float, weights: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pour chaque point de requête : nombre de points indexés à moins de
+        `radius_km` et somme de leurs poids (ex: population).
+        `weights` est aligné sur les points d'origine passés au constructeur.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        counts = np.zeros(len(lat), dtype=np.int64)
+        sums = np.zeros(len(lat))
+        if len(self) == 0 or len(lat) == 0:
+            return counts, sums
+
+        sorted_weights = (
+            np.ones(len(self)) if weights is None
+            else np.nan_to_num(np.asarray(weights, dtype=np.float64)[self.ids])
+        )
+        for group, center_lat, center_lon, spread in self._query_groups(lat, lon):
+            positions = self._candidates(center_lat, center_lon, radius_km + spread)
+            if len(positions) == 0:
+                continue
+            inside = haversine_km(
+                lat[group, None], lon[group, None], self.lat[positions], self.lon[positions]
+            ) <= radius_km
+            counts[group] = inside.sum(axis=1)
+            sums[group] = inside @ sorted_weights[positions]
+        return counts, sums
+
@@ -0,0 +1,103 @@
+"""
+Benchmark SQLite / DuckDB sur les lectures et agrégations des routes d'analyse
+
+Les fichiers de données (dossier CSV_DATA_PATH) sont répliqués ×1 et ×100
+(clés région / station suffixées pour multiplier les groupes), puis chargés
+à l'identique dans une base SQLite temporaire et dans DuckDB. Chaque mesure
+est le meilleur temps de la partie « moteur » d'une route (lecture et
+agrégation, sans le calcul NumPy commun aux deux moteurs). Une route dont
+une table manque dans l'un des moteurs est ignorée (elle ne mesurerait rien).
+
+Usage (depuis backend/, paquet duckdb requis):
+    python -m benchmarks.bench_analytics_engine
+    python -m benchmarks.bench_analytics_engine --facteurs 1 10 100 --repetitions 5
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from app.config import get_settings
+from app.services.allocation import build_allocation_inputs
+from app.services.analytics import TABLES_PAUVRETE_URGENCES, load_meteo, load_pauvrete_urgences
+from app.services.analytics_engine import DuckDBAnalytics, SQLiteAnalytics
+from app.services.cube import TABLES_CUBE
+from app.services.data_loader import find_data_files, read_data_file
+
+# Route → (partie moteur, tables requises)
+ROUTES = {
+    "correlation-meteo-grippe": (lambda m: load_meteo(m), ["donnees_meteo"]),
+    "cube": (lambda m: [m.read_table(table) for table in TABLES_CUBE.values()], list(TABLES_CUBE.values())),
+    "allocation-doses": (build_allocation_inputs, ["evolution_actes_region"]),
+    "pauvrete-urgences": (
+        lambda m: load_pauvrete_urgences("complet", m), [TABLES_PAUVRETE_URGENCES["complet"]]
+    ),
+}
+# Colonnes clés suffixées à chaque réplique
+CLES = ["region", "Région", "NOM_USUEL"]
+
+
+def replicate(source: Path, destination: Path, facteur: int):
+    """Copie les fichiers de données en répliquant leurs lignes `facteur` fois"""
+    for path in find_data_files(source):
+        df = read_data_file(path)
+        repliques = []
+        for i in range(facteur):
+            copie = df.copy()
+            for cle in CLES:
+                if i and cle in copie.columns:
+                    copie[cle] = copie[cle].astype(str) + f" copie {i}"
+            repliques.append(copie)
+        pd.concat(repliques, ignore_index=True).to_csv(destination / f"{path.stem}.csv", index=False)
+
+
+def best_time(fonction, moteur, repetitions: int) -> float:
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(moteur)
+        durees.append(time.perf_counter() - debut)
+    return min(durees) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite / DuckDB")
+    parser.add_argument("--donnees", default=get_settings().csv_data_path, help="Dossier des fichiers de données")
+    parser.add_argument("--facteurs", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    for facteur in args.facteurs:
+        with tempfile.TemporaryDirectory() as dossier:
+            dossier = Path(dossier)
+            replicate(Path(args.donnees), dossier, facteur)
+
+            duck = DuckDBAnalytics(dossier)
+            # Mêmes tables (noms, colonnes, régions canoniques) dans SQLite
+            engine = create_engine(f"sqlite:///{dossier / 'bench.db'}")
+            lignes = 0
+            for table in sorted(duck.tables):
+                df = duck.read_table(table)
+                if df is not None:
+                    df.to_sql(table, engine, index=False)
+                    lignes += len(df)
+            sqlite = SQLiteAnalytics(engine)
+
+            print(f"🧪 ×{facteur} : {len(duck.tables)} tables, {lignes} lignes")
+            print(f"  {'route':<28}{'SQLite':>12}{'DuckDB':>12}{'gain':>8}")
+            for route, (fonction, tables) in ROUTES.items():
+                manquantes = [t for t in tables if not (sqlite.has_table(t) and duck.has_table(t))]
+                if manquantes:
+                    print(f"  {route:<28}{'ignorée':>12}  (table(s) absente(s): {', '.join(manquantes)})")
+                    continue
+                t_sqlite = best_time(fonction, sqlite, args.repetitions)
+                t_duck = best_time(fonction, duck, args.repetitions)
+                print(f"  {route:<28}{t_sqlite:>9.2f} ms{t_duck:>9.2f} ms{t_sqlite / t_duck:>7.1f}×")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
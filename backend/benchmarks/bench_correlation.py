@@ -0,0 +1,70 @@
+"""
+Benchmark du moteur de corrélations météo / grippe
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_correlation
+    python -m benchmarks.bench_correlation --stations 5000 --annees 15 --decalage 6
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.analytics import build_cubes, compute_correlations
+
+
+def synthetic_releves(
+    n_stations: int, n_annees: int, rng: np.random.Generator, par_variable: bool = False
+) -> pd.DataFrame:
+    """Relevés mensuels synthétiques : température saisonnière, grippe en retard d'un mois"""
+    stations = np.repeat(np.arange(n_stations), n_annees * 12)
+    t = np.tile(np.arange(n_annees * 12), n_stations)
+    saison = np.cos(2 * np.pi * (t % 12) / 12)
+    tmm = 12 - 8 * saison + rng.normal(0, 1.5, len(t))
+    grippe = np.maximum(0, np.roll(saison, 1) + rng.normal(0, 0.3, len(t)))
+    df = pd.DataFrame({
+        "NOM_USUEL": np.char.add("STATION_", stations.astype(str)),
+        "annees": 2011 + t // 12,
+        "mois": t % 12 + 1,
+        "TMM": tmm,
+        "TNTXM": tmm - 4,
+        "TNSOL": tmm - 5,
+        "taux_grippe": grippe,
+        "incidence_sg_hebdo": grippe / 4,
+    })
+    # ~2 % de relevés météo manquants (toutes variables, ou TMM seule)
+    manquants = ["TMM"] if par_variable else ["TMM", "TNTXM", "TNSOL"]
+    df.loc[rng.random(len(df)) < 0.02, manquants] = np.nan
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des corrélations météo / grippe")
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--annees", type=int, default=15)
+    parser.add_argument("--decalage", type=int, default=3, help="Décalage maximal (mois)")
+    parser.add_argument(
+        "--manquants-par-variable", action="store_true",
+        help="Valeurs manquantes propres à TMM (un masque par paire de variables)"
+    )
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    df = synthetic_releves(args.stations, args.annees, rng, args.manquants_par_variable)
+    print(f"🧪 {args.stations} stations × {args.annees * 12} mois ({len(df)} relevés)")
+
+    debut = time.perf_counter()
+    stations, annees, meteo, grippe = build_cubes(df)
+    print(f"  cubes construits            {(time.perf_counter() - debut) * 1e3:10.1f} ms")
+
+    debut = time.perf_counter()
+    resultats = compute_correlations(meteo, grippe, len(annees), args.decalage)
+    print(f"  corrélations (0..{args.decalage} mois)    {(time.perf_counter() - debut) * 1e3:10.1f} ms")
+
+    pearson = resultats["global"][0][:, 0, 0]
+    print("  TMM / taux_grippe global :", " ".join(f"+{d}:{r:.2f}" for d, r in enumerate(pearson)))
+
+
+if __name__ == "__main__":
+    main()
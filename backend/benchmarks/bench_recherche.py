@@ -0,0 +1,83 @@
+"""
+Benchmark de la recherche plein texte des pharmacies (autocomplétion)
+
+La table des sites est répliquée jusqu'à N sites (villes suffixées pour que
+les répliques ne soient pas des doublons exacts), indexée dans une base SQLite
+temporaire, puis chaque requête est tapée lettre par lettre : une requête FTS5
+par frappe, comme le ferait un champ d'autocomplétion.
+
+Usage (depuis backend/, fichier des sites requis):
+    python -m benchmarks.bench_recherche
+    python -m benchmarks.bench_recherche --sites 1000000 --repetitions 20
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import create_engine
+
+from app.services.pharmacies import get_sites_table
+from app.services.recherche import build_search_index, search_sites
+
+REQUETES = ["paris", "epinay sur seine", "pharmacie de la gare", "rue de charenton", "centrale 75012"]
+
+
+def replicate(table: pa.Table, n_sites: int) -> pa.Table:
+    """Répète la table jusqu'à n_sites lignes (ville suffixée du numéro de réplique)"""
+    repliques = []
+    for i in range(-(-n_sites // table.num_rows)):
+        copie = table
+        if i:
+            ville = pc.binary_join_element_wise(table.column("ville"), pa.scalar(str(i)), " ")
+            copie = table.set_column(table.schema.get_field_index("ville"), "ville", ville)
+        repliques.append(copie)
+    return pa.concat_tables(repliques).slice(0, n_sites)
+
+
+def keystroke_times(moteur, requete: str, repetitions: int) -> np.ndarray:
+    """Meilleur temps (ms) de chaque préfixe de la requête"""
+    durees = []
+    for fin in range(1, len(requete) + 1):
+        saisie = requete[:fin]
+        meilleur = float("inf")
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            search_sites(saisie, moteur=moteur)
+            meilleur = min(meilleur, time.perf_counter() - debut)
+        durees.append(meilleur * 1e3)
+    return np.array(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche des pharmacies")
+    parser.add_argument("--sites", type=int, nargs="+", default=[3744, 100_000])
+    parser.add_argument("--repetitions", type=int, default=10)
+    args = parser.parse_args()
+
+    source = get_sites_table()
+    if source is None:
+        raise SystemExit("Fichier des sites introuvable (python ../data/scripts/pipeline.py pharmacies_sites)")
+
+    for n_sites in args.sites:
+        with tempfile.TemporaryDirectory() as dossier:
+            engine = create_engine(f"sqlite:///{Path(dossier) / 'bench.db'}")
+            table = replicate(source, n_sites)
+
+            debut = time.perf_counter()
+            build_search_index(table, "bench", engine)
+            construction = time.perf_counter() - debut
+
+            print(f"🧪 {n_sites} sites : index construit en {construction * 1e3:.0f} ms")
+            print(f"  {'requête':<24}{'frappes':>8}{'médiane':>12}{'max':>12}")
+            for requete in REQUETES:
+                durees = keystroke_times(engine, requete, args.repetitions)
+                print(f"  {requete:<24}{len(durees):>8}{np.median(durees):>9.3f} ms{durees.max():>9.3f} ms")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark de l'index spatial des pharmacies (k plus proches / rayon)
+
+Usage (depuis backend/):
+    python -m benchmarks.bench_spatial
+    python -m benchmarks.bench_spatial --sites 100000 --requetes 5000
+
+Mesuré sur les 3 743 sites réels (k=10, requêtes uniformes sur la
+métropole) : kNN ~85-105 µs contre ~170-230 µs pour le parcours exhaustif.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.pharmacies import sites_coordinates
+from app.services.spatial import GridIndex, haversine_km
+
+
+def synthetic_sites(n: int, rng: np.random.Generator):
+    """Sites synthétiques répartis sur la métropole (boîte englobante)"""
+    return rng.uniform(41.3, 51.1, n), rng.uniform(-5.2, 9.6, n)
+
+
+def near_sites(lat, lon, n: int, rng: np.random.Generator, ecart_deg: float = 0.05):
+    """Requêtes autour de sites tirés au hasard (± ~5 km) : répartition réaliste des utilisateurs"""
+    valides = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    choix = rng.choice(valides, n)
+    return lat[choix] + rng.normal(0, ecart_deg, n), lon[choix] + rng.normal(0, ecart_deg, n)
+
+
+def timed(label: str, fn, queries, reference: float = None) -> float:
+    debut = time.perf_counter()
+    for q in queries:
+        fn(*q)
+    duree = (time.perf_counter() - debut) / len(queries) * 1e6
+    gain = f"  (×{reference / duree:.1f} vs exhaustif)" if reference else ""
+    print(f"  {label:<28} {duree:10.1f} µs/requête{gain}")
+    return duree
+
+
+def run_queries(index, lat, lon, queries, k: int, rayon_km: float):
+    # Vérification contre un parcours exhaustif : sur les distances, pas les
+    # identifiants (sites aux mêmes coordonnées : ex-aequo au k-ième rang)
+    for qlat, qlon in queries[:50]:
+        _, distances = index.query_knn(qlat, qlon, k)
+        brute = np.sort(haversine_km(qlat, qlon, lat, lon))
+        brute = brute[~np.isnan(brute)][:k]
+        assert np.allclose(np.sort(distances), brute), "kNN incorrect"
+
+    exhaustif = timed("parcours exhaustif (kNN)", lambda a, b: np.argpartition(haversine_km(a, b, lat, lon), k)[:k], queries)
+    timed(f"kNN (k={k})", lambda a, b: index.query_knn(a, b, k), queries, exhaustif)
+    timed(f"rayon ({rayon_km:g} km)", lambda a, b: index.query_radius(a, b, rayon_km), queries, exhaustif)
+
+
+def run(lat, lon, n_queries: int, k: int, rayon_km: float, rng):
+    debut = time.perf_counter()
+    index = GridIndex(lat, lon)
+    print(f"📊 {len(index)} sites - index construit en {(time.perf_counter() - debut) * 1e3:.1f} ms")
+
+    print("  requêtes uniformes sur la métropole :")
+    run_queries(index, lat, lon, list(zip(*synthetic_sites(n_queries, rng))), k, rayon_km)
+    print("  requêtes autour des sites :")
+    run_queries(index, lat, lon, list(zip(*near_sites(lat, lon, n_queries, rng))), k, rayon_km)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'index spatial")
+    parser.add_argument("--sites", type=int, default=100_000, help="Nombre de sites synthétiques")
+    parser.add_argument("--requetes", type=int, default=2000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rayon-km", type=float, default=5.0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    lat, lon = sites_coordinates()
+    if len(lat):
+        print("🏥 Sites réels (pharmacies_sites.arrow)")
+        run(np.asarray(lat), np.asarray(lon), args.requetes, args.k, args.rayon_km, rng)
+    else:
+        print("⚠️  pharmacies_sites.arrow absent : benchmark sur données réelles ignoré")
+
+    print(f"\n🧪 {args.sites} sites synthétiques")
+    run(*synthetic_sites(args.sites, rng), args.requetes, args.k, args.rayon_km, rng)
+
+
+if __name__ == "__main__":
+    main()
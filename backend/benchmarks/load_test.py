@@ -0,0 +1,344 @@
+"""
+Test de charge des routes de l'API (géographie, logistique, saisonnalité, données)
+
+Démarre l'application (uvicorn, sous-processus) sur une base SQLite temporaire
+chargée à partir d'un dossier de données, attend la fin de l'ingestion et des
+précalculs, puis envoie à chaque route GET des thématiques choisies N requêtes
+à concurrence C (connexions HTTP persistantes, une par client), avec des filtres
+tirés au hasard parmi des valeurs réalistes (régions, années, codes postaux,
+coordonnées et noms de pharmacies, stations météo).
+
+Rapport par route : débit (requêtes/s), latences p50 / p95 / p99 / max, erreurs
+(statut ≠ 2xx). Résultats enregistrables en JSON ; avec --reference, code de
+sortie 1 si une route régresse de plus de --seuil (p95 plus lent ou débit plus
+faible) par rapport aux résultats de référence de la même machine.
+
+Usage (depuis backend/):
+    python -m benchmarks.load_test --sortie resultats.json
+    python -m benchmarks.load_test --concurrence 16 --requetes 500 --workers 2
+    python -m benchmarks.load_test --enregistrer-reference benchmarks/reference.json
+    python -m benchmarks.load_test --reference benchmarks/reference.json --seuil 0.2
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.horaires import JOURS
+from app.services.pharmacies import get_sites_table
+from app.services.regions import REGIONS
+
+BACKEND = Path(__file__).resolve().parent.parent
+TAGS = ["Géographie", "Logistique", "Saisonnalité", "Données génériques"]
+# Probabilité qu'un filtre optionnel connu soit présent dans une requête
+PROBA_FILTRE = 0.5
+
+
+# ============================================
+# Valeurs de filtres réalistes
+# ============================================
+
+def filter_values(base: Path, rng: random.Random) -> Dict[str, Callable[[], object]]:
+    """Paramètre de requête → tirage d'une valeur (paramètres inconnus : valeur par défaut de la route)"""
+    sites = get_sites_table()
+    codes_postaux, coordonnees, mots = ["75012"], [(48.85, 2.35)], ["gare"]
+    if sites is not None:
+        codes_postaux = [c for c in sites.column("code_postal").to_pylist() if c]
+        coordonnees = [
+            (lat, lon) for lat, lon in zip(sites.column("latitude").to_pylist(), sites.column("longitude").to_pylist())
+            if lat == lat and lon == lon
+        ]
+        mots = [m for t in sites.column("titre").to_pylist() if t for m in t.split() if len(m) > 3]
+        mots = [m for m in mots if m.lower() not in ("pharmacie", "pharma")] or mots
+
+    # Stations météo de la base chargée par l'application
+    conn = sqlite3.connect(f"file:{base}?mode=ro", uri=True)
+    try:
+        stations = [r[0] for r in conn.execute('SELECT DISTINCT "NOM_USUEL" FROM donnees_meteo WHERE "NOM_USUEL" IS NOT NULL')]
+    except sqlite3.OperationalError:
+        stations = []
+    finally:
+        conn.close()
+
+    point = {}
+
+    def coordonnee(indice: int):
+        # lat puis lon : même site (léger décalage autour de lui)
+        if indice == 0:
+            point["site"] = rng.choice(coordonnees)
+        return round(point["site"][indice] + rng.uniform(-0.02, 0.02), 5)
+
+    return {
+        "region": lambda: rng.choice(list(REGIONS.values())),
+        "annee": lambda: rng.choice([2021, 2022, 2023, 2024]),
+        "mois": lambda: rng.randint(1, 12),
+        "code_postal": lambda: rng.choice(codes_postaux),
+        "lat": lambda: coordonnee(0),
+        "lon": lambda: coordonnee(1),
+        "k": lambda: rng.choice([5, 10, 20]),
+        "q": lambda: (lambda mot: mot[:rng.randint(3, len(mot))])(rng.choice(mots)),
+        "jour": lambda: rng.choice(JOURS),
+        "heure": lambda: f"{rng.randint(8, 19):02d}:{rng.choice([0, 15, 30, 45]):02d}",
+        "sans_rendez_vous": lambda: rng.choice(["true", "false"]),
+        "limit": lambda: rng.choice([10, 50, 100]),
+        "thematique": lambda: rng.choice(["logistique", "geographique", "saisonnalite"]),
+        "perimetre": lambda: rng.choice(["complet", "metropole", "domtom"]),
+        "pondere": lambda: rng.choice(["true", "false"]),
+        "niveau": lambda: rng.choice(["global", "annee", "station"]),
+        "cible": lambda: rng.choice(["taux_grippe", "incidence_sg_hebdo"]),
+        "horizon": lambda: rng.choice([3, 6, 12]),
+        "tri": lambda: rng.choice(["score", "distance", "habitants_par_pharmacie"]),
+        **({"nom_usuel": lambda: rng.choice(stations), "station": lambda: rng.choice(stations)} if stations else {}),
+    }
+
+
+def load_routes(port: int, tags: List[str]) -> List[dict]:
+    """Routes GET (sans paramètre de chemin) des thématiques, d'après le schéma OpenAPI"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/openapi.json")
+    spec = json.loads(conn.getresponse().read())
+    conn.close()
+    routes = []
+    for chemin, operations in spec["paths"].items():
+        operation = operations.get("get")
+        if operation is None or "{" in chemin or not set(operation.get("tags", [])) & set(tags):
+            continue
+        routes.append({
+            "chemin": chemin,
+            "parametres": [(p["name"], p.get("required", False)) for p in operation.get("parameters", [])],
+        })
+    return routes
+
+
+def build_requests(route: dict, n: int, valeurs: Dict[str, Callable], rng: random.Random) -> Optional[List[str]]:
+    """n URLs de la route ; None si un paramètre obligatoire n'a pas de générateur"""
+    urls = []
+    for _ in range(n):
+        params = {}
+        for nom, obligatoire in route["parametres"]:
+            if nom in valeurs and (obligatoire or rng.random() < PROBA_FILTRE):
+                params[nom] = valeurs[nom]()
+            elif obligatoire:
+                return None
+        urls.append(route["chemin"] + (f"?{urlencode(params)}" if params else ""))
+    return urls
+
+
+# ============================================
+# Application et clients
+# ============================================
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_json(port: int, chemin: str):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", chemin)
+        reponse = conn.getresponse()
+        return reponse.status, json.loads(reponse.read() or b"null")
+    finally:
+        conn.close()
+
+
+def start_app(dossier: Path, donnees: Path, port: int, workers: int) -> subprocess.Popen:
+    """uvicorn sur une base SQLite neuve dans `dossier` (données de `donnees`)"""
+    settings = get_settings()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{dossier / 'load_test.db'}",
+        "CSV_DATA_PATH": str(donnees.resolve()),
+        "PHARMACIES_SITES_PATH": str((BACKEND / settings.pharmacies_sites_path).resolve()),
+        "COMMUNES_PATH": str((BACKEND / settings.communes_path).resolve()),
+        "SERVER_TIMING": "false",
+    }
+    journal = open(dossier / "uvicorn.log", "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND, env=env, stdout=journal, stderr=subprocess.STDOUT
+    )
+
+
+def wait_until_ready(port: int, processus: subprocess.Popen, delai: float, journal: Path):
+    """Chargement initial terminé et aucune tâche de fond en cours"""
+    fin = time.monotonic() + delai
+    while time.monotonic() < fin:
+        if processus.poll() is not None:
+            fin_journal = journal.read_text(errors="replace").splitlines()[-20:]
+            raise SystemExit("❌ L'application s'est arrêtée au démarrage :\n" + "\n".join(fin_journal))
+        try:
+            statut, _ = get_json(port, "/health/ready")
+            if statut == 200:
+                _, jobs = get_json(port, "/api/admin/jobs")
+                if all(job["etat"] not in ("en_cours", "en_attente") for job in jobs["jobs"]):
+                    return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"❌ Application non prête après {delai:.0f} s")
+
+
+def run_route(port: int, urls: List[str], concurrence: int) -> dict:
+    """Envoie les URLs à `concurrence` clients ; latences (ms), erreurs, débit"""
+    a_envoyer = iter(urls)
+    latences, statuts = [], []
+    verrou = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        mesures = []
+        try:
+            for url in a_envoyer:  # next() sur un itérateur de liste : sûr entre threads
+                debut = time.perf_counter()
+                try:
+                    conn.request("GET", url)
+                    reponse = conn.getresponse()
+                    reponse.read()
+                    statut = reponse.status
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    statut = 0
+                mesures.append(((time.perf_counter() - debut) * 1e3, statut))
+        finally:
+            conn.close()
+        with verrou:
+            for latence, statut in mesures:
+                latences.append(latence)
+                statuts.append(statut)
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrence) as pool:
+        for _ in range(concurrence):
+            pool.submit(client)
+    duree = time.perf_counter() - debut
+
+    latences = np.array(latences)
+    erreurs = [s for s in statuts if not 200 <= s < 300]
+    p50, p95, p99 = np.percentile(latences, [50, 95, 99])
+    return {
+        "requetes": len(latences),
+        "erreurs": len(erreurs),
+        "statuts_erreur": sorted({str(s) for s in erreurs}),
+        "debit_rps": round(len(latences) / duree, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(latences.max()), 2),
+    }
+
+
+# ============================================
+# Comparaison avec la référence
+# ============================================
+
+def regressions(resultats: dict, reference: dict, seuil: float) -> List[str]:
+    """Routes dont le p95 augmente ou le débit baisse de plus de `seuil` (fraction)"""
+    problemes = []
+    for chemin, mesure in resultats["routes"].items():
+        ref = reference.get("routes", {}).get(chemin)
+        if ref is None:
+            continue
+        if mesure["p95_ms"] > ref["p95_ms"] * (1 + seuil):
+            problemes.append(f"{chemin} : p95 {ref['p95_ms']:.2f} → {mesure['p95_ms']:.2f} ms")
+        if mesure["debit_rps"] < ref["debit_rps"] * (1 - seuil):
+            problemes.append(f"{chemin} : débit {ref['debit_rps']:.1f} → {mesure['debit_rps']:.1f} req/s")
+        if mesure["erreurs"] > ref["erreurs"]:
+            problemes.append(f"{chemin} : {mesure['erreurs']} erreurs (référence {ref['erreurs']})")
+    return problemes
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Test de charge des routes de l'API")
+    parser.add_argument("--donnees", default=str(BACKEND / settings.csv_data_path), help="Dossier des fichiers de données")
+    parser.add_argument("--concurrence", type=int, default=8, help="Clients simultanés")
+    parser.add_argument("--requetes", type=int, default=200, help="Requêtes par route")
+    parser.add_argument("--prechauffage", type=int, default=5, help="Requêtes non mesurées par route")
+    parser.add_argument("--workers", type=int, default=1, help="Workers uvicorn")
+    parser.add_argument("--tags", nargs="+", default=TAGS, help="Thématiques (tags OpenAPI) testées")
+    parser.add_argument("--routes", nargs="*", help="Uniquement ces chemins")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--delai-demarrage", type=float, default=300, help="Attente maximale du chargement (s)")
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    parser.add_argument("--reference", help="Résultats de référence (JSON) à comparer")
+    parser.add_argument("--seuil", type=float, default=0.2, help="Régression tolérée (0.2 = 20 %%)")
+    parser.add_argument("--enregistrer-reference", help="Écrit les résultats comme nouvelle référence")
+    args = parser.parse_args()
+
+    rng = random.Random(args.graine)
+    donnees = Path(args.donnees)
+    with tempfile.TemporaryDirectory() as dossier:
+        dossier = Path(dossier)
+        port = free_port()
+        processus = start_app(dossier, donnees, port, args.workers)
+        try:
+            debut = time.perf_counter()
+            wait_until_ready(port, processus, args.delai_demarrage, dossier / "uvicorn.log")
+            print(f"🚀 Application prête en {time.perf_counter() - debut:.1f} s (port {port}, {args.workers} worker(s))")
+
+            valeurs = filter_values(dossier / "load_test.db", rng)
+            routes = load_routes(port, args.tags)
+            if args.routes:
+                routes = [r for r in routes if r["chemin"] in args.routes]
+
+            resultats = {
+                "date": datetime.now().astimezone().isoformat(timespec="seconds"),
+                "concurrence": args.concurrence,
+                "requetes_par_route": args.requetes,
+                "workers": args.workers,
+                "routes": {},
+            }
+            print(f"  {'route':<52}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'erreurs':>9}")
+            for route in routes:
+                urls = build_requests(route, args.prechauffage + args.requetes, valeurs, rng)
+                if urls is None:
+                    print(f"  {route['chemin']:<52}  ignorée (paramètre obligatoire sans valeur de test)")
+                    continue
+                run_route(port, urls[:args.prechauffage], 1)
+                mesure = run_route(port, urls[args.prechauffage:], args.concurrence)
+                resultats["routes"][route["chemin"]] = mesure
+                print(
+                    f"  {route['chemin']:<52}{mesure['debit_rps']:>9.1f}{mesure['p50_ms']:>8.2f}ms"
+                    f"{mesure['p95_ms']:>8.2f}ms{mesure['p99_ms']:>8.2f}ms{mesure['erreurs']:>9}"
+                )
+        finally:
+            processus.terminate()
+            processus.wait(timeout=30)
+
+    for chemin in (args.sortie, args.enregistrer_reference):
+        if chemin:
+            Path(chemin).write_text(json.dumps(resultats, indent=2, ensure_ascii=False))
+            print(f"💾 Résultats écrits dans {chemin}")
+
+    if args.reference:
+        problemes = regressions(resultats, json.loads(Path(args.reference).read_text()), args.seuil)
+        if problemes:
+            print(f"❌ {len(problemes)} régression(s) au-delà de {args.seuil:.0%} :")
+            for probleme in problemes:
+                print(f"  - {probleme}")
+            sys.exit(1)
+        print(f"✅ Aucune régression au-delà de {args.seuil:.0%} par rapport à {args.reference}")
+
+
+if __name__ == "__main__":
+    main()
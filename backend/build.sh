@@ -10,5 +10,6 @@ pip install pandas
 pip install python-multipart
 pip install pydantic
 pip install python-dotenv
+pip install pyarrow
 
 echo "All dependencies installed successfully!"
\ No newline at end of file
@@ -0,0 +1,19 @@
+from pathlib import Path
+
+# Formats de sortie des tableaux nettoyés, choisis selon l'extension du fichier.
+# Parquet / Arrow conservent les types : le backend n'a plus rien à deviner.
+FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+}
+
+
+def ecrire_tableau(df, chemin):
+    suffixe = Path(chemin).suffix
+    if suffixe == '.parquet':
+        df.to_parquet(chemin, index=False)
+    elif suffixe in ('.arrow', '.feather'):
+        df.reset_index(drop=True).to_feather(chemin)
+    else:
+        df.to_csv(chemin, index=False, encoding='utf-8')
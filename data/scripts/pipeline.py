@@ -0,0 +1,313 @@
+"""
+Pipeline ETL : exécute les scripts de nettoyage avec entrées/sorties déclarées
+
+- Chaque étape déclare ses fichiers d'entrée et de sortie
+- Une étape n'est relancée que si le contenu (hash) de ses entrées ou de son
+  script a changé, ou si une de ses sorties a disparu / été modifiée
+- Les étapes indépendantes tournent en parallèle (un processus par étape)
+- Les sorties finales sont écrites directement dans backend/data/raw
+  (et les fichiers propres au backend, ex: sites Arrow, dans backend/data)
+
+Usage:
+    python data/scripts/pipeline.py                  # tout le pipeline
+    python data/scripts/pipeline.py pharmacies -f    # une étape (et ses dépendances), forcée
+    python data/scripts/pipeline.py --format parquet # sorties Parquet (types conservés)
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from io_tableaux import FORMATS
+
+RACINE = Path(__file__).resolve().parents[2]
+DOSSIER_SCRIPTS = Path(__file__).resolve().parent
+
+SOURCE_DEFAUT = RACINE / 'data' / 'dataset'
+SORTIE_DEFAUT = RACINE / 'backend' / 'data' / 'raw'
+DONNEES_DEFAUT = RACINE / 'backend' / 'data'
+CACHE_DEFAUT = RACINE / 'data' / '.cache'
+
+# Extensions lues par le backend pour une table (un seul fichier par table :
+# une sortie laissée dans un autre format masquerait la nouvelle)
+EXTENSIONS_TABLEAUX = ('.csv', '.parquet', '.arrow', '.feather')
+
+# ============================================
+# Déclaration des étapes
+# Préfixes : "source:" (données brutes), "cache:" (intermédiaires),
+#            "sortie:" (tables chargées par le backend),
+#            "donnees:" (fichiers lus directement par le backend, format fixe)
+# ============================================
+
+ETAPES = {
+    'communes': {
+        'script': 'script_communes.py',
+        'entrees': {
+            'communes': 'source:communes-france-2025.csv',
+        },
+        'sorties': {
+            'population_code_postal': 'cache:population_code_postal.pkl',
+            'population_region': 'cache:population_region.pkl',
+            'centroides': 'donnees:communes.parquet',
+        },
+    },
+    'actes_vaccins': {
+        'script': 'script_actes_vaccins.py',
+        'entrees': {
+            f'couverture_{annee}': f'source:couverture-{annee}.csv'
+            for annee in (2021, 2022, 2023, 2024)
+        },
+        'sorties': {
+            'actes_region': 'sortie:evolution_actes_region.csv',
+            'doses_region': 'sortie:evolution_doses_region.csv',
+            'actes_age': 'sortie:evolution_actes_age.csv',
+            'doses_age': 'sortie:evolution_doses_age.csv',
+            'comparatif': 'sortie:comparatif_ACTES_vs_DOSES_2021-2024.csv',
+        },
+    },
+    'pharmacies': {
+        'script': 'script_nombre_pharmacie.py',
+        'entrees': {
+            'pharmacies': 'source:santefr-lieux-vaccination-grippe-pharmacie.csv',
+            'population_code_postal': 'cache:population_code_postal.pkl',
+        },
+        'sorties': {
+            'pharmacies_par_code_postal': 'sortie:accessibilite_pharmacies.csv',
+        },
+    },
+    'pharmacies_sites': {
+        'script': 'script_pharmacies_sites.py',
+        # Code backend importé par le script : toute modification invalide le cache
+        'modules': ['backend/app/services/pharmacies.py', 'backend/app/services/horaires.py'],
+        'entrees': {
+            'pharmacies': 'source:santefr-lieux-vaccination-grippe-pharmacie.csv',
+        },
+        'sorties': {
+            'sites': 'donnees:pharmacies_sites.arrow',
+        },
+    },
+    'passages_urgences': {
+        'script': 'script_passage-urgences.py',
+        'entrees': {
+            'urgences': 'source:grippe-passages-aux-urgences-et-actes-sos-medecins-departement.csv',
+            'pauvrete': 'source:taux_de_pauvreté.csv',
+            'population_region': 'cache:population_region.pkl',
+        },
+        'sorties': {
+            'complet': 'sortie:tableau_pauvrete_urgences_population_complet.csv',
+            'metropole': 'sortie:tableau_pauvrete_urgences_METROPOLE.csv',
+            'domtom': 'sortie:tableau_pauvrete_urgences_DOMTOM.csv',
+        },
+    },
+}
+
+
+# ============================================
+# Hash de contenu
+# ============================================
+
+def hash_fichier(chemin: Path) -> str:
+    h = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def cle_etape(nom: str, etape: dict, entrees: dict, sorties: dict) -> str:
+    """Clé de cache : script (et modules importés) + contenu des entrées + emplacement des sorties"""
+    h = hashlib.sha256(nom.encode())
+    h.update(hash_fichier(DOSSIER_SCRIPTS / etape['script']).encode())
+    for module in etape.get('modules', []):
+        h.update(hash_fichier(RACINE / module).encode())
+    for role in sorted(entrees):
+        h.update(f"{role}={hash_fichier(Path(entrees[role]))}".encode())
+    for role in sorted(sorties):
+        h.update(f"{role}->{sorties[role]}".encode())
+    return h.hexdigest()
+
+
+# ============================================
+# Exécution
+# ============================================
+
+def _executer_etape(script: str, entrees: dict, sorties: dict) -> float:
+    """Exécutée dans un processus fils : charge le script et appelle executer()"""
+    if str(DOSSIER_SCRIPTS) not in sys.path:
+        sys.path.insert(0, str(DOSSIER_SCRIPTS))
+    spec = importlib.util.spec_from_file_location(Path(script).stem.replace('-', '_'), DOSSIER_SCRIPTS / script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    debut = time.perf_counter()
+    module.executer(entrees, sorties)
+    return time.perf_counter() - debut
+
+
+class Pipeline:
+    def __init__(self, source: Path, sortie: Path, cache: Path, jobs: int = None, force: bool = False,
+                 format: str = 'csv', donnees: Path = DONNEES_DEFAUT):
+        self.dossiers = {
+            'source': Path(source), 'sortie': Path(sortie), 'cache': Path(cache), 'donnees': Path(donnees),
+        }
+        self.jobs = jobs
+        self.force = force
+        self.format = format
+        self.chemin_manifeste = self.dossiers['cache'] / 'manifeste.json'
+
+    def resoudre(self, chemins: dict) -> dict:
+        resolus = {}
+        for role, chemin in chemins.items():
+            prefixe, nom = chemin.split(':', 1)
+            chemin = self.dossiers[prefixe] / nom
+            if prefixe == 'sortie':
+                chemin = chemin.with_suffix(FORMATS[self.format])
+            resolus[role] = str(chemin)
+        return resolus
+
+    def retirer_autres_formats(self, nom: str):
+        """Supprime les sorties finales de l'étape écrites dans un autre format (--format précédent)"""
+        finales = {role: c for role, c in ETAPES[nom]['sorties'].items() if c.startswith('sortie:')}
+        for chemin in self.resoudre(finales).values():
+            chemin = Path(chemin)
+            for suffixe in EXTENSIONS_TABLEAUX:
+                ancien = chemin.with_suffix(suffixe)
+                if suffixe != chemin.suffix and ancien.exists():
+                    ancien.unlink()
+                    print(f"🧹 {nom} : {ancien.name} supprimé (remplacé par {chemin.name})")
+
+    def dependances(self, nom: str) -> set:
+        """Étapes produisant une des entrées de `nom`"""
+        entrees = set(ETAPES[nom]['entrees'].values())
+        return {
+            autre for autre, etape in ETAPES.items()
+            if autre != nom and entrees & set(etape['sorties'].values())
+        }
+
+    def selection(self, noms) -> list:
+        """Étapes demandées + toutes leurs dépendances amont"""
+        if not noms:
+            return list(ETAPES)
+        retenues = set()
+        a_visiter = list(noms)
+        while a_visiter:
+            nom = a_visiter.pop()
+            if nom not in ETAPES:
+                raise ValueError(f"Étape inconnue: {nom} (disponibles: {', '.join(ETAPES)})")
+            if nom not in retenues:
+                retenues.add(nom)
+                a_visiter.extend(self.dependances(nom))
+        return [nom for nom in ETAPES if nom in retenues]
+
+    def a_jour(self, manifeste: dict, nom: str, cle: str, sorties: dict) -> bool:
+        precedent = manifeste.get(nom)
+        if self.force or not precedent or precedent['cle'] != cle:
+            return False
+        return all(
+            Path(chemin).exists() and hash_fichier(Path(chemin)) == precedent['sorties'].get(chemin)
+            for chemin in sorties.values()
+        )
+
+    def executer(self, noms=None) -> bool:
+        for dossier in ('sortie', 'cache', 'donnees'):
+            self.dossiers[dossier].mkdir(parents=True, exist_ok=True)
+
+        manifeste = {}
+        if self.chemin_manifeste.exists():
+            manifeste = json.loads(self.chemin_manifeste.read_text(encoding='utf-8'))
+
+        restantes = self.selection(noms)
+        terminees, echecs = set(), set()
+        en_cours = {}
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            while restantes or en_cours:
+                # Lance tout ce qui est prêt ; une étape à jour (cache) ou en échec
+                # peut en débloquer d'autres : on repasse tant qu'il y a du nouveau
+                progression = True
+                while progression:
+                    progression = False
+                    for nom in list(restantes):
+                        deps = self.dependances(nom) & set(ETAPES)
+                        if deps & echecs:
+                            print(f"⏭️  {nom} : ignorée (dépendance en échec)")
+                            echecs.add(nom)
+                            restantes.remove(nom)
+                            progression = True
+                            continue
+                        if not deps <= terminees:
+                            continue
+                        restantes.remove(nom)
+                        progression = True
+
+                        etape = ETAPES[nom]
+                        entrees = self.resoudre(etape['entrees'])
+                        sorties = self.resoudre(etape['sorties'])
+                        manquantes = [c for c in entrees.values() if not Path(c).exists()]
+                        if manquantes:
+                            print(f"❌ {nom} : entrée(s) manquante(s) {', '.join(manquantes)}")
+                            echecs.add(nom)
+                            continue
+
+                        cle = cle_etape(nom, etape, entrees, sorties)
+                        if self.a_jour(manifeste, nom, cle, sorties):
+                            print(f"✅ {nom} : à jour (cache)")
+                            self.retirer_autres_formats(nom)
+                            terminees.add(nom)
+                            continue
+
+                        print(f"🚀 {nom} : lancement...")
+                        futur = pool.submit(_executer_etape, etape['script'], entrees, sorties)
+                        en_cours[futur] = (nom, cle, sorties)
+
+                if not en_cours:
+                    # Rien ne tourne et plus rien ne peut démarrer
+                    for nom in restantes:
+                        print(f"❌ {nom} : dépendance(s) non exécutable(s)")
+                    echecs.update(restantes)
+                    break
+
+                faits, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                for futur in faits:
+                    nom, cle, sorties = en_cours.pop(futur)
+                    try:
+                        duree = futur.result()
+                    except Exception as e:
+                        print(f"❌ {nom} : {e}")
+                        echecs.add(nom)
+                        continue
+                    manifeste[nom] = {
+                        'cle': cle,
+                        'sorties': {c: hash_fichier(Path(c)) for c in sorties.values()},
+                    }
+                    self.chemin_manifeste.write_text(json.dumps(manifeste, indent=2), encoding='utf-8')
+                    print(f"✅ {nom} : terminée en {duree:.2f}s")
+                    self.retirer_autres_formats(nom)
+                    terminees.add(nom)
+
+        return not echecs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline ETL des données grippe / vaccination")
+    parser.add_argument('etapes', nargs='*', help=f"Étapes à exécuter ({', '.join(ETAPES)})")
+    parser.add_argument('--source', type=Path, default=SOURCE_DEFAUT, help="Dossier des données brutes")
+    parser.add_argument('--sortie', type=Path, default=SORTIE_DEFAUT, help="Dossier de sortie (données du backend)")
+    parser.add_argument('--donnees', type=Path, default=DONNEES_DEFAUT, help="Dossier des fichiers lus directement par le backend")
+    parser.add_argument('--cache', type=Path, default=CACHE_DEFAUT, help="Dossier des intermédiaires et du manifeste")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="Nombre de processus (défaut: nb de cœurs)")
+    parser.add_argument('-f', '--force', action='store_true', help="Ignore le cache et relance les étapes")
+    parser.add_argument('--format', choices=list(FORMATS), default='csv', help="Format des sorties finales")
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(args.source, args.sortie, args.cache, jobs=args.jobs, force=args.force,
+                        format=args.format, donnees=args.donnees)
+    return 0 if pipeline.executer(args.etapes) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+from app.services.regions import normaliser_regions  # noqa: E402
+
+
+# communes-france-2025.csv est partagé par plusieurs scripts : on ne le lit
+# qu'une fois et on n'en garde que les agrégats utiles.
+COLONNES_COMMUNES = [
+    'code_insee', 'nom_standard', 'code_postal', 'codes_postaux', 'dep_code',
+    'reg_nom', 'population', 'latitude_centre', 'longitude_centre',
+]
+
+
+def population_par_code_postal(communes):
+    communes_expanded = communes.assign(
+        code_postal=communes['codes_postaux'].str.split(', ')
+    ).explode('code_postal')
+    communes_expanded['code_postal'] = pd.to_numeric(communes_expanded['code_postal'], errors='coerce')
+
+    return communes_expanded[['code_postal', 'population']].dropna()
+
+
+def population_par_region(communes):
+    communes = communes.assign(reg_nom_clean=normaliser_regions(communes['reg_nom']))
+
+    pop_par_region = communes.groupby('reg_nom_clean')['population'].sum().reset_index()
+    pop_par_region.columns = ['Region', 'Population']
+    return pop_par_region
+
+
+def communes_centroides(communes):
+    # Centroïdes des communes pour l'analyse de couverture (déserts vaccinaux)
+    centroides = pd.DataFrame({
+        'code_insee': communes['code_insee'].astype(str),
+        'nom': communes['nom_standard'],
+        'code_postal': communes['code_postal'].astype(str).str.zfill(5),
+        'dep_code': communes['dep_code'].astype(str),
+        'region': normaliser_regions(communes['reg_nom']),
+        'population': pd.to_numeric(communes['population'], errors='coerce').fillna(0).astype('int64'),
+        'latitude': pd.to_numeric(communes['latitude_centre'], errors='coerce'),
+        'longitude': pd.to_numeric(communes['longitude_centre'], errors='coerce'),
+    })
+    return centroides.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+
+
+def executer(entrees, sorties):
+    communes = pd.read_csv(entrees['communes'], usecols=COLONNES_COMMUNES, encoding='utf-8')
+
+    population_par_code_postal(communes).to_pickle(sorties['population_code_postal'])
+    population_par_region(communes).to_pickle(sorties['population_region'])
+    communes_centroides(communes).to_parquet(sorties['centroides'], index=False)
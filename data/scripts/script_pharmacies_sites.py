@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'backend'))
+from app.services.pharmacies import convert_sites_csv  # noqa: E402
+
+
+def executer(entrees, sorties):
+    # Conversion unique du CSV en Arrow IPC, ouvert en mémoire mappée par le backend
+    convert_sites_csv(entrees['pharmacies'], sorties['sites'])
+
+
+if __name__ == '__main__':
+    convert_sites_csv('santefr-lieux-vaccination-grippe-pharmacie.csv', 'pharmacies_sites.arrow')